@@ -0,0 +1,191 @@
+from collections import Counter, OrderedDict
+from pathlib import Path
+import registry
+import serialization
+from models import Appointment
+
+WEEKDAYS_RU = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+# Шаги записи (состояния BookingStates) и итог
+FUNNEL_STEPS = (
+    ("waiting_photographer", "Выбор фотографа"),
+    ("waiting_service", "Выбор услуги"),
+    ("waiting_date", "Выбор даты"),
+    ("waiting_time", "Выбор времени"),
+    ("confirm", "Подтверждение"),
+    ("booked", "Запись создана"),
+)
+
+# Сколько незавершенных записей помнить для воронки
+FUNNEL_SESSIONS = 10000
+
+
+class AppointmentAggregates:
+    """
+    Сводные показатели по записям, которые обновляются при каждом изменении записи.
+
+    Вклад каждой записи запоминается, поэтому при изменении вычитается старый
+    вклад и добавляется новый - без пересчета по всем записям.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.contributions = {}        # id записи -> вклад
+        self.bookings = Counter()      # photographer_id -> активные записи
+        self.cancelled = Counter()     # photographer_id -> отмененные
+        self.revenue = Counter()       # photographer_id -> выручка по прайсу
+        self.weekday_minutes = Counter()  # день недели -> занятые минуты
+        self.slots = Counter()         # (день недели, час начала) -> записи
+
+    @staticmethod
+    def contribution(appointment: Appointment, inactive_statuses) -> tuple:
+        """Вклад записи: (фотограф, активна, день недели, час, минуты, цена)"""
+        photographer_id = appointment.photographer_id
+        if appointment.status in inactive_statuses:
+            return photographer_id, False, None, None, 0, 0
+        # Дата и время уже разобраны при загрузке записи
+        weekday = appointment.weekday
+        if weekday is None or appointment.start is None:
+            return photographer_id, True, None, None, 0, 0
+        start, end = appointment.interval
+        price = registry.current().prices.get(appointment.get("service"), {}).get("price", 0)
+        return photographer_id, True, weekday, start // 60, end - start, price
+
+    def _add(self, contribution: tuple, sign: int):
+        photographer_id, active, weekday, hour, minutes, price = contribution
+        if not active:
+            self.cancelled[photographer_id] += sign
+            return
+        self.bookings[photographer_id] += sign
+        self.revenue[photographer_id] += sign * price
+        if weekday is not None:
+            self.weekday_minutes[weekday] += sign * minutes
+            self.slots[(weekday, hour)] += sign
+
+    def set(self, appointment: Appointment, inactive_statuses):
+        """Учитывает новую или измененную запись"""
+        old = self.contributions.get(appointment["id"])
+        new = self.contribution(appointment, inactive_statuses)
+        if old == new:
+            return
+        if old is not None:
+            self._add(old, -1)
+        self._add(new, 1)
+        self.contributions[appointment["id"]] = new
+
+
+class ReviewAggregates:
+    """
+    Сводные показатели по отзывам: средняя оценка фотографов и по месяцам.
+
+    Файл читается целиком, только если его изменили в обход add().
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = None
+        self.reset()
+
+    def reset(self):
+        self.count = Counter()    # photographer_id -> отзывы
+        self.total = Counter()    # photographer_id -> сумма оценок
+        self.monthly = {}         # (photographer_id, "ГГГГ-ММ") -> [сумма, число]
+
+    def _file_signature(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _apply(self, review: dict):
+        photographer_id = review.get("photographer_id")
+        rating = review.get("rating", 0)
+        self.count[photographer_id] += 1
+        self.total[photographer_id] += rating
+        month = review.get("date", "")[:7]
+        entry = self.monthly.setdefault((photographer_id, month), [0, 0])
+        entry[0] += rating
+        entry[1] += 1
+
+    def refresh(self):
+        """Перечитывает файл, если он изменился"""
+        signature = self._file_signature()
+        if signature == self.signature:
+            return
+        self.reset()
+        if signature is not None:
+            for review in serialization.records(serialization.read(self.path, [])):
+                self._apply(review)
+        self.signature = signature
+
+    def add(self, review: dict):
+        """Учитывает только что сохраненный отзыв (перед сохранением нужен refresh())"""
+        self._apply(review)
+        self.signature = self._file_signature()
+
+    def average(self, photographer_id: str):
+        """Средняя оценка фотографа (None, если отзывов нет)"""
+        self.refresh()
+        count = self.count[photographer_id]
+        return self.total[photographer_id] / count if count else None
+
+    def trend(self, photographer_id: str, months: int = 3) -> list:
+        """Средние оценки за последние месяцы: [(месяц, средняя, число)]"""
+        self.refresh()
+        rows = [
+            (month, total / count, count)
+            for (pid, month), (total, count) in self.monthly.items()
+            if pid == photographer_id and month
+        ]
+        rows.sort()
+        return rows[-months:]
+
+
+class Funnel:
+    """
+    Воронка записи: сколько пользователей дошло до каждого шага.
+
+    Каждый шаг засчитывается один раз за попытку записи, поэтому возвраты
+    назад не раздувают счетчики. Считается с момента запуска бота.
+    """
+
+    def __init__(self, max_sessions: int = FUNNEL_SESSIONS):
+        self.max_sessions = max_sessions
+        self.counts = Counter()
+        # user_id -> пройденные шаги текущей попытки
+        self.sessions = OrderedDict()
+
+    def start(self, user_id: int):
+        """Начало новой попытки записи"""
+        self.sessions.pop(user_id, None)
+        self.sessions[user_id] = set()
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        self.enter(user_id, "waiting_photographer")
+
+    def enter(self, user_id: int, step: str):
+        """Пользователь дошел до шага (вне попытки записи, например при переносе, не считается)"""
+        steps = self.sessions.get(user_id)
+        if steps is None or step in steps:
+            return
+        steps.add(step)
+        self.counts[step] += 1
+        if step == "booked":
+            del self.sessions[user_id]
+
+    def report(self) -> list:
+        """[(название шага, дошли, доля от предыдущего шага)]"""
+        rows = []
+        previous = None
+        for step, title in FUNNEL_STEPS:
+            count = self.counts[step]
+            rate = count / previous if previous else None
+            rows.append((title, count, rate))
+            previous = count
+        return rows
+
+
+funnel = Funnel()
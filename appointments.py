@@ -0,0 +1,558 @@
+import asyncio
+import os
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+from collections import Counter, OrderedDict
+from datetime import date as Date, datetime, timedelta
+from pathlib import Path
+import events
+import registry
+import serialization
+from analytics import AppointmentAggregates
+from models import Appointment
+from scheduling import (
+    DEFAULT_DURATION, Schedule, SlotUnavailable, appointment_interval, format_minutes,
+    to_minutes, working_hours
+)
+
+# Файл для хранения записей
+APPOINTMENTS_FILE = Path("data/appointments.json")
+
+# После стольких операций в журнале файл записей переписывается целиком
+COMPACT_JOURNAL_LINES = 200
+
+# Прошедшие месяцы хранятся отдельно: data/archive/ГГГГ-ММ.json (после архивации только читаются)
+ARCHIVE_DIR_NAME = "archive"
+
+# Сколько архивных месяцев держать в памяти
+COLD_CACHE_MONTHS = 6
+
+# Как часто проверять, не пора ли убрать прошедший месяц в архив (секунды)
+ARCHIVE_CHECK_INTERVAL = 6 * 60 * 60
+
+# Отмененные записи не занимают время
+INACTIVE_STATUSES = {"cancelled"}
+
+
+class AppointmentStore:
+    """
+    Записи на фотосессии в памяти с индексом занятости фотографов.
+
+    Изменения дописываются одной строкой в журнал рядом с файлом записей,
+    а сам файл переписывается целиком только при сжатии журнала.
+    При загрузке журнал проигрывается поверх файла.
+
+    В файле записей и журнале только текущий и будущие месяцы. Прошедшие
+    месяцы переносятся в архив по файлу на месяц и читаются, только когда
+    нужны (выгрузка за прошлый период).
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.journal_path = path.with_suffix(".journal")
+        self.appointments = []
+        self.by_id = {}
+        self.schedule = Schedule()
+        self.signature = None
+        self.journal_lines = 0
+        # Сводные показатели для /stats, обновляются вместе с записями
+        self.aggregates = AppointmentAggregates()
+        # Записи по датам и версии дат (растут при каждом изменении записей дня)
+        self.by_date = {}
+        self.date_versions = Counter()
+        # Меняется при полной перезагрузке файла - версии дат начинаются заново
+        self.epoch = 0
+        # Временные брони (лист ожидания): ключ -> (photographer_id, дата, начало, конец)
+        self.holds = {}
+        self.archive_dir = path.parent / ARCHIVE_DIR_NAME
+        # {"months": [...], "max_id": ...}, читается при первом обращении
+        self.archive_index = None
+        # Загруженные архивные месяцы: "ГГГГ-ММ" -> {дата: [записи]}
+        self.cold = OrderedDict()
+        # Открытый файл блокировки, пока хранилище занято этим процессом
+        self.lock_file = None
+
+    def lock(self) -> bool:
+        """
+        Занимает хранилище для этого процесса до его завершения: записи меняет
+        только один процесс (бот или migrate.py), иначе их изменения затрут друг друга.
+
+        Returns:
+            False, если хранилище уже занято другим процессом
+        """
+        if self.lock_file is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.path.with_suffix(".lock"), 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def _file_signature(self):
+        signature = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _index(self, appointment: Appointment):
+        self.by_id[appointment["id"]] = appointment
+        if appointment.get("status") in INACTIVE_STATUSES:
+            return
+        try:
+            start, end = appointment_interval(appointment)
+        except (KeyError, ValueError):
+            return
+        self.schedule.add(appointment.photographer_id, appointment.date, start, end, appointment.id)
+
+    def _unindex(self, appointment: Appointment):
+        self.schedule.remove(appointment.photographer_id, appointment.date, appointment.id)
+
+    def _place(self, appointment: dict, old_date: str = None):
+        """Переносит запись в индексе по датам и увеличивает версии затронутых дат"""
+        date = appointment.get("date")
+        if old_date is not None and old_date != date:
+            bucket = self.by_date.get(old_date)
+            if bucket is not None:
+                bucket.pop(appointment["id"], None)
+                if not bucket:
+                    del self.by_date[old_date]
+            self.date_versions[old_date] += 1
+        self.by_date.setdefault(date, {})[appointment["id"]] = appointment
+        self.date_versions[date] += 1
+
+    def _apply(self, record: dict):
+        """Применяет операцию журнала к данным в памяти и индексу"""
+        old_date = None
+        if record["op"] == "add":
+            data = record["appointment"]
+            appointment = self.by_id.get(data["id"])
+            if appointment is not None:
+                # Операция уже попала в файл до сжатия журнала
+                old_date = appointment.date
+                self._unindex(appointment)
+                appointment.update(data)
+            else:
+                appointment = Appointment.from_dict(data)
+                self.appointments.append(appointment)
+        else:  # update
+            appointment = self.by_id.get(record["id"])
+            if appointment is None:
+                return
+            old_date = appointment.date
+            self._unindex(appointment)
+            appointment.update(record["fields"])
+        self._index(appointment)
+        self._place(appointment, old_date)
+        self.aggregates.set(appointment, INACTIVE_STATUSES)
+
+    def refresh(self):
+        """Перечитывает файл и журнал, если они изменились"""
+        signature = self._file_signature()
+        if signature == self.signature:
+            return
+        self.appointments = []
+        self.by_id = {}
+        self.schedule = Schedule()
+        self.aggregates.reset()
+        self.by_date = {}
+        self.date_versions = Counter()
+        self.epoch += 1
+        self.journal_lines = 0
+        if signature[0] is not None:
+            self.appointments = serialization.records(serialization.read(self.path, []), Appointment)
+        for appointment in self.appointments:
+            self._index(appointment)
+            self._place(appointment)
+            self.aggregates.set(appointment, INACTIVE_STATUSES)
+        if signature[1] is not None:
+            valid_size = 0
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    # Строка без перевода строки недописана, даже если разбирается:
+                    # следующая операция приклеилась бы к ней
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = serialization.loads(line)
+                    except ValueError:
+                        # Недописанная строка (сбой во время записи) - операции не было
+                        break
+                    valid_size += len(line)
+                    try:
+                        self._apply(record)
+                    except ValueError as e:
+                        print(f"Пропущена операция журнала записей: {e}")
+                    self.journal_lines += 1
+            if valid_size < signature[1][1]:
+                # Обрезаем хвост, иначе следующие операции окажутся после битой строки
+                print(f"Журнал записей обрезан до последней целой строки: {self.journal_path}")
+                os.truncate(self.journal_path, valid_size)
+                signature = self._file_signature()
+        for key, (photographer_id, date, start, end) in self.holds.items():
+            self.schedule.add(photographer_id, date, start, end, key)
+        self.signature = signature
+
+    def _commit(self, record: dict):
+        """Дописывает операцию в журнал и применяет ее"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'ab') as f:
+            f.write(serialization.dumps(record) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(record)
+        self.journal_lines += 1
+        appointment_id = record["appointment"]["id"] if record["op"] == "add" else record["id"]
+        events.publish("appointment", record["op"], self.by_id[appointment_id].to_dict())
+        if self.journal_lines >= COMPACT_JOURNAL_LINES:
+            self.save()
+        else:
+            self.signature = self._file_signature()
+
+    def save(self):
+        """Атомарно сохраняет все записи в файл и очищает журнал"""
+        serialization.write(self.path, self.appointments)
+        # Если сбой случится здесь, повторное применение журнала ничего не изменит
+        self.journal_path.unlink(missing_ok=True)
+        self.journal_lines = 0
+        self.signature = self._file_signature()
+
+    def _archive_info(self) -> dict:
+        if self.archive_index is None:
+            self.archive_index = serialization.read(
+                self.archive_dir / "index.json", {"months": [], "max_id": 0}
+            )
+        return self.archive_index
+
+    def cold_month(self, month: str) -> dict:
+        """Записи архивного месяца по датам (файл читается при первом обращении)"""
+        partition = self.cold.get(month)
+        if partition is not None:
+            self.cold.move_to_end(month)
+            return partition
+        if month not in self._archive_info()["months"]:
+            return {}
+        appointments = serialization.records(
+            serialization.read(self.archive_dir / f"{month}.json", []), Appointment
+        )
+        partition = {}
+        for appointment in appointments:
+            partition.setdefault(appointment.get("date"), []).append(appointment)
+        self.cold[month] = partition
+        while len(self.cold) > COLD_CACHE_MONTHS:
+            self.cold.popitem(last=False)
+        return partition
+
+    def archive(self, before: Date = None) -> int:
+        """
+        Переносит в архив записи месяцев до before (по умолчанию - до текущего месяца).
+
+        Returns:
+            Сколько записей перенесено
+        """
+        self.refresh()
+        boundary = (before or datetime.now().date()).replace(day=1).isoformat()
+        past = [
+            appointment for appointment in self.appointments
+            if appointment.day is not None and appointment.date < boundary
+        ]
+        if not past:
+            return 0
+
+        by_month = {}
+        for appointment in past:
+            by_month.setdefault(appointment["date"][:7], []).append(appointment)
+
+        # Сначала архив, потом файл записей: при сбое между ними запись окажется
+        # в обоих местах и при следующей архивации просто перезапишется
+        index = self._archive_info()
+        for month, appointments in sorted(by_month.items()):
+            path = self.archive_dir / f"{month}.json"
+            merged = {a.id: a for a in serialization.records(serialization.read(path, []), Appointment)}
+            merged.update((a.id, a) for a in appointments)
+            # Архив читается редко - всегда в компактном формате
+            serialization.write(
+                path, sorted(merged.values(), key=lambda a: (a.date, a.get("time_slot", ""))), pretty=False
+            )
+            self.cold.pop(month, None)
+            if month not in index["months"]:
+                index["months"].append(month)
+        index["months"].sort()
+        index["max_id"] = max(index["max_id"], max(a.id for a in past))
+        serialization.write(self.archive_dir / "index.json", index, pretty=False)
+
+        archived = {appointment.id for appointment in past}
+        self.appointments = [a for a in self.appointments if a.id not in archived]
+        self.save()
+        # Индексы строятся заново по оставшимся записям
+        self.signature = None
+        self.refresh()
+        return len(past)
+
+    def stats(self) -> AppointmentAggregates:
+        """Сводные показатели по записям"""
+        self.refresh()
+        return self.aggregates
+
+    def iter_range(self, date_from: Date, date_to: Date, photographer_id: str = None):
+        """
+        Записи за период (включительно) по порядку дат и времени, без копирования всего списка.
+
+        Args:
+            date_from: первый день
+            date_to: последний день
+            photographer_id: только записи этого фотографа
+        """
+        self.refresh()
+        archived_months = set(self._archive_info()["months"])
+        day = date_from
+        while day <= date_to:
+            date = day.isoformat()
+            bucket = self.by_date.get(date, {})
+            appointments = list(bucket.values())
+            if date[:7] in archived_months:
+                appointments += [a for a in self.cold_month(date[:7]).get(date, ()) if a["id"] not in bucket]
+            for appointment in sorted(appointments, key=lambda a: a.get("time_slot", "")):
+                if photographer_id is None or appointment.get("photographer_id") == photographer_id:
+                    yield appointment
+            day += timedelta(days=1)
+
+    def range_version(self, date_from: Date, date_to: Date) -> tuple:
+        """
+        Версия записей за период: не меняется, пока не менялась ни одна запись периода.
+        """
+        self.refresh()
+        total = 0
+        day = date_from
+        while day <= date_to:
+            total += self.date_versions.get(day.isoformat(), 0)
+            day += timedelta(days=1)
+        return self.epoch, total
+
+    def all(self) -> list:
+        """Все записи"""
+        self.refresh()
+        return self.appointments
+
+    def history(self):
+        """Все записи: сначала архивные месяцы, затем текущие (для миграции и проверок)"""
+        self.refresh()
+        for month in list(self._archive_info()["months"]):
+            for appointments in self.cold_month(month).values():
+                for appointment in appointments:
+                    if appointment.id not in self.by_id:
+                        yield appointment
+        yield from self.appointments
+
+    def next_id(self) -> int:
+        """ID для новой записи (с учетом архива)"""
+        self.refresh()
+        return max(max(self.by_id, default=0), self._archive_info()["max_id"]) + 1
+
+    def import_records(self, appointments: list):
+        """
+        Добавляет готовые записи (с уже назначенными id) одной записью файла,
+        без операции журнала на каждую запись. Файл и журнал переписываются
+        целиком, поэтому другой процесс не должен менять записи (см. lock()).
+        """
+        self.refresh()
+        self.appointments.extend(appointments)
+        self.save()
+        # Индексы строятся заново вместе с новыми записями
+        self.signature = None
+        self.refresh()
+
+    def get(self, appointment_id: int):
+        """Запись по ID"""
+        self.refresh()
+        return self.by_id.get(appointment_id)
+
+    def archived_months(self) -> list:
+        """Месяцы в архиве ("ГГГГ-ММ" по порядку)"""
+        return list(self._archive_info()["months"])
+
+    def user_appointments(self, user_id: int) -> list:
+        """
+        Записи пользователя за текущий и будущие месяцы. Прошедшие месяцы
+        в архиве сюда не попадают - архив не читается ради каждого клиента.
+        """
+        self.refresh()
+        return [appt for appt in self.appointments if appt.get("user_id") == user_id]
+
+    def available_starts(self, photographer_id: str, date: str, duration: int, not_before: int = 0,
+                         ignore: int = None) -> list:
+        """Свободные времена начала сессии (минуты от начала суток); ignore - ID переносимой записи"""
+        self.refresh()
+        day_start, day_end = working_hours(registry.current(), photographer_id)
+        ignored = self.by_id.get(ignore)
+        if ignored is not None:
+            self._unindex(ignored)
+        try:
+            return self.schedule.available_starts(
+                photographer_id, date, duration, day_start, day_end, not_before=not_before
+            )
+        finally:
+            if ignored is not None:
+                self._index(ignored)
+
+    def is_free(self, photographer_id: str, date: str, start: int, end: int) -> bool:
+        """Свободен ли интервал (с учетом временных броней)"""
+        self.refresh()
+        return self.schedule.is_free(photographer_id, date, start, end)
+
+    def hold(self, key, photographer_id: str, date: str, start: int, end: int):
+        """
+        Временно занимает интервал, не создавая записи.
+
+        Raises:
+            SlotUnavailable: интервал уже занят
+        """
+        if not self.is_free(photographer_id, date, start, end):
+            raise SlotUnavailable(f"{photographer_id} {date} {start}")
+        self.holds[key] = (photographer_id, date, start, end)
+        self.schedule.add(photographer_id, date, start, end, key)
+
+    def release_hold(self, key):
+        """Снимает временную бронь"""
+        held = self.holds.pop(key, None)
+        if held is not None:
+            self.schedule.remove(held[0], held[1], key)
+
+    def _check_free(self, snapshot, photographer_id: str, date: str, start: int, end: int):
+        # Устаревшая кнопка календаря может прислать уже прошедший день
+        now = datetime.now()
+        day = Date.fromisoformat(date)
+        if day < now.date() or (day == now.date() and start < now.hour * 60 + now.minute):
+            raise SlotUnavailable(f"{photographer_id} {date} {format_minutes(start)}: время прошло")
+        day_start, day_end = working_hours(snapshot, photographer_id)
+        if start < day_start or end > day_end or not self.schedule.is_free(photographer_id, date, start, end):
+            raise SlotUnavailable(f"{photographer_id} {date} {format_minutes(start)}")
+
+    def cancel(self, appointment_id: int, user_id: int = None):
+        """
+        Отменяет запись и освобождает ее время.
+
+        Args:
+            appointment_id: ID записи
+            user_id: если указан, отменить можно только свою запись
+
+        Returns:
+            Отмененная запись или None, если активной записи нет
+        """
+        self.refresh()
+        appointment = self.by_id.get(appointment_id)
+        if appointment is None or appointment.get("status") in INACTIVE_STATUSES:
+            return None
+        if user_id is not None and appointment.get("user_id") != user_id:
+            return None
+        self._commit({"op": "update", "id": appointment_id, "fields": {"status": "cancelled"}})
+        return appointment
+
+    def move(self, appointment_id: int, user_id: int, date: str, time_slot: str):
+        """
+        Переносит запись: старое время освобождается, новое занимается
+        одной операцией журнала.
+
+        Returns:
+            Перенесенная запись или None, если активной записи пользователя нет
+
+        Raises:
+            SlotUnavailable: новое время занято, уже прошло или вне рабочего времени фотографа
+            ValueError: неверные дата или время
+        """
+        self.refresh()
+        appointment = self.by_id.get(appointment_id)
+        if (appointment is None or appointment.get("status") in INACTIVE_STATUSES
+                or appointment.get("user_id") != user_id):
+            return None
+        start = to_minutes(time_slot)
+        end = start + (appointment.get("duration") or DEFAULT_DURATION)
+
+        # Собственное время записи не мешает переносу внутри него
+        self._unindex(appointment)
+        try:
+            self._check_free(registry.current(), appointment["photographer_id"], date, start, end)
+        finally:
+            self._index(appointment)
+
+        self._commit({"op": "update", "id": appointment_id, "fields": {
+            "date": date,
+            "time_slot": time_slot,
+            "status": "new",
+            "rescheduled_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }})
+        return appointment
+
+    def add(self, user_id: int, user_name: str, photographer_id: str, date: str,
+            time_slot: str, service: str, duration: int) -> Appointment:
+        """
+        Добавляет новую запись.
+
+        Raises:
+            SlotUnavailable: время занято, уже прошло или вне рабочего времени фотографа
+            ValueError: неверные дата, время или длительность
+        """
+        self.refresh()
+        snapshot = registry.current()
+        appointment = Appointment.from_dict({
+            "id": self.next_id(),
+            "user_id": user_id,
+            "user_name": user_name,
+            "photographer_id": photographer_id,
+            "photographer_name": snapshot.photographers.get(photographer_id, {}).get("name", "Unknown"),
+            "date": date,
+            "time_slot": time_slot,
+            "service": service,
+            "duration": duration,
+            "status": "new",
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }, strict=True)
+        start, end = appointment.interval
+        self._check_free(snapshot, photographer_id, date, start, end)
+
+        self._commit({"op": "add", "appointment": appointment.to_dict()})
+        return self.by_id[appointment.id]
+
+
+store = AppointmentStore(APPOINTMENTS_FILE)
+
+
+async def run_archiver(interval: float = ARCHIVE_CHECK_INTERVAL):
+    """
+    Фоновая архивация прошедших месяцев.
+    """
+    while True:
+        try:
+            archived = store.archive()
+            if archived:
+                print(f"📦 В архив перенесено записей: {archived}")
+        except Exception as e:
+            print(f"Ошибка архивации записей: {e}")
+        await asyncio.sleep(interval)
+
+
+_archiver = None
+
+
+def start_archiver():
+    """
+    Запускает фоновую архивацию (один раз).
+    """
+    global _archiver
+    if _archiver is None:
+        _archiver = asyncio.create_task(run_archiver())
@@ -6,12 +6,27 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))
 
+# Служебный чат, куда заранее загружаются фото портфолио (0 - не использовать)
+STORAGE_CHAT_ID = int(os.getenv("STORAGE_CHAT_ID", "0"))
+
+# Веб-панель администратора с обновлениями в реальном времени (0 - выключена)
+DASHBOARD_HOST = os.getenv("DASHBOARD_HOST", "127.0.0.1")
+DASHBOARD_PORT = int(os.getenv("DASHBOARD_PORT", "0"))
+
+# Формат файлов данных: compact - быстрый компактный, pretty - JSON с отступами для отладки.
+# Читаются оба формата, поэтому переключать можно в любой момент
+DATA_FORMAT = os.getenv("DATA_FORMAT", "compact")
+
 # Список администраторов
 ADMINS = [859416796]
 
 # Для обратной совместимости
 PHOTO_ADMIN_ID = ADMIN_ID
 
+# Список фотографов и прайс ниже - значения по умолчанию.
+# Рабочий справочник читается из data/registry.json (см. registry.py)
+# и перечитывается без перезапуска бота.
+
 # Список фотографов
 PHOTOGRAPHERS = {
     "anna": {
@@ -39,3 +54,31 @@ PHOTOGRAPHERS = {
         ]
     }
 }
+
+# Прайс-лист услуг
+PRICES = {
+    "family": {
+        "name": "👨‍👩‍👧 Семейная фотосессия",
+        "short_name": "👨‍👩‍👧 Семейная",
+        "price": 5000,
+        "duration": "1-2 часа",
+        "duration_minutes": 120,
+        "description": "Семейная фотосессия на природе или в студии. 30+ обработанных фото"
+    },
+    "portrait": {
+        "name": "📷 Портретная фотосессия",
+        "short_name": "📷 Портрет",
+        "price": 3000,
+        "duration": "1 час",
+        "duration_minutes": 60,
+        "description": "Индивидуальные портреты в студии или на локации. 20+ обработанных фото"
+    },
+    "wedding": {
+        "name": "💒 Свадебная фотосессия",
+        "short_name": "💒 Свадьба",
+        "price": 15000,
+        "duration": "Весь день",
+        "full_day": True,
+        "description": "Полное сопровождение свадьбы. 200+ обработанных фото, фотоальбом"
+    }
+}
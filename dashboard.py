@@ -0,0 +1,192 @@
+import asyncio
+import json
+from datetime import datetime
+from aiohttp import web
+import events
+import registry
+from appointments import store
+from config import DASHBOARD_HOST, DASHBOARD_PORT
+from scheduling import appointment_slot
+
+# Как часто отправлять пустое событие, чтобы соединение не закрыли по простою (секунды)
+SSE_PING_INTERVAL = 15
+
+_runner = None
+
+PAGE = """<!doctype html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Photo Booking Bot - записи</title>
+<style>
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+td, th { border: 1px solid #ccc; padding: 4px 10px; text-align: left; }
+tr.cancelled td { color: #999; text-decoration: line-through; }
+#status { font-size: 0.9em; color: #888; }
+#feed li { margin-bottom: 4px; }
+</style>
+</head>
+<body>
+<h1>📅 Записи на <span id="today"></span></h1>
+<p id="status">подключение...</p>
+<table>
+<thead><tr><th>#</th><th>Время</th><th>Фотограф</th><th>Клиент</th><th>Услуга</th><th>Статус</th></tr></thead>
+<tbody id="schedule"></tbody>
+</table>
+<h2>🔔 Изменения</h2>
+<ul id="feed"></ul>
+<script>
+const rows = new Map();
+let today = "";
+
+function renderSchedule() {
+  const body = document.getElementById("schedule");
+  body.replaceChildren();
+  [...rows.values()].sort((a, b) => a.slot.localeCompare(b.slot)).forEach(row => {
+    const tr = document.createElement("tr");
+    if (row.status === "cancelled") tr.className = "cancelled";
+    [row.id, row.slot, row.photographer, row.client, row.service, row.status].forEach(value => {
+      const td = document.createElement("td");
+      td.textContent = value;
+      tr.appendChild(td);
+    });
+    body.appendChild(tr);
+  });
+}
+
+function addToFeed(text) {
+  const li = document.createElement("li");
+  li.textContent = new Date().toLocaleTimeString() + " - " + text;
+  const feed = document.getElementById("feed");
+  feed.prepend(li);
+  while (feed.children.length > 50) feed.lastChild.remove();
+}
+
+const source = new EventSource("events");
+source.onopen = () => { document.getElementById("status").textContent = "онлайн"; };
+source.onerror = () => { document.getElementById("status").textContent = "переподключение..."; };
+source.addEventListener("snapshot", e => {
+  const data = JSON.parse(e.data);
+  today = data.today;
+  document.getElementById("today").textContent = today;
+  rows.clear();
+  data.schedule.forEach(row => rows.set(row.id, row));
+  renderSchedule();
+});
+source.addEventListener("appointment", e => {
+  const event = JSON.parse(e.data);
+  const row = event.data;
+  if (row.date === today) {
+    rows.set(row.id, row);
+    renderSchedule();
+  } else {
+    rows.delete(row.id);
+    renderSchedule();
+  }
+  const verb = event.action === "add" ? "🆕 Новая запись" : "✏️ Изменена запись";
+  addToFeed(`${verb} #${row.id}: ${row.date} ${row.slot}, ${row.photographer}, ${row.client} (${row.status})`);
+});
+source.addEventListener("review", e => {
+  const review = JSON.parse(e.data).data;
+  addToFeed(`⭐ Отзыв ${"★".repeat(review.rating)} от ${review.user_name}: ${review.text}`);
+});
+source.addEventListener("portfolio", e => {
+  const data = JSON.parse(e.data).data;
+  addToFeed(`📸 В портфолио ${data.photographer_id} добавлено фото: ${data.photos}`);
+});
+</script>
+</body>
+</html>
+"""
+
+
+def appointment_row(appointment: dict) -> dict:
+    """Запись в виде строки таблицы панели"""
+    service = registry.current().prices.get(appointment.get("service"), {})
+    return {
+        "id": appointment.get("id"),
+        "date": appointment.get("date", ""),
+        "slot": appointment_slot(appointment),
+        "photographer": appointment.get("photographer_name", ""),
+        "client": appointment.get("user_name", ""),
+        "service": service.get("short_name", appointment.get("service") or ""),
+        "status": appointment.get("status", "new"),
+    }
+
+
+async def send_event(response: web.StreamResponse, name: str, data: dict):
+    payload = json.dumps(data, ensure_ascii=False)
+    await response.write(f"event: {name}\ndata: {payload}\n\n".encode("utf-8"))
+
+
+async def index(request: web.Request) -> web.Response:
+    return web.Response(text=PAGE, content_type="text/html")
+
+
+async def send_snapshot(response: web.StreamResponse, today):
+    await send_event(response, "snapshot", {
+        "today": today.isoformat(),
+        "schedule": [appointment_row(a) for a in store.iter_range(today, today)],
+    })
+
+
+async def stream(request: web.Request) -> web.StreamResponse:
+    """
+    Поток Server-Sent Events: сначала расписание на сегодня, затем изменения.
+    После полуночи расписание отправляется заново - на новый день.
+    """
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    # Подписка до снимка, чтобы не потерять изменения между ними
+    queue = events.subscribe()
+    try:
+        today = datetime.now().date()
+        await send_snapshot(response, today)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                event = None
+            # Дата проверяется на каждом событии и пинге, то есть не реже SSE_PING_INTERVAL
+            if datetime.now().date() != today:
+                today = datetime.now().date()
+                await send_snapshot(response, today)
+            if event is None:
+                await response.write(b": ping\n\n")
+                continue
+            if event["kind"] == "appointment":
+                event = dict(event, data=appointment_row(event["data"]))
+            await send_event(response, event["kind"], event)
+    except ConnectionResetError:
+        # Панель закрыли
+        pass
+    finally:
+        events.unsubscribe(queue)
+    return response
+
+
+async def start():
+    """Запускает веб-панель (если задан DASHBOARD_PORT)"""
+    global _runner
+    if not DASHBOARD_PORT or _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/", index)
+    app.router.add_get("/events", stream)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, DASHBOARD_HOST, DASHBOARD_PORT).start()
+    print(f"📊 Панель записей: http://{DASHBOARD_HOST}:{DASHBOARD_PORT}/")
+
+
+async def stop():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
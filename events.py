@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+# Сколько событий может накопиться у медленного подписчика (старые отбрасываются)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Подписчики ленты изменений
+_subscribers = set()
+
+
+def publish(kind: str, action: str, data: dict):
+    """
+    Сообщает подписчикам об изменении.
+
+    Args:
+        kind: что изменилось ("appointment", "review", "portfolio")
+        action: что произошло ("add", "update", ...)
+        data: измененный объект
+    """
+    event = {"kind": kind, "action": action, "data": data, "time": time.time()}
+    for queue in _subscribers:
+        if queue.full():
+            # Подписчик не успевает - теряет самое старое событие, а не задерживает остальных
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+def subscribe() -> asyncio.Queue:
+    """Новая очередь событий; после использования нужно вызвать unsubscribe()"""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.add(queue)
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue):
+    _subscribers.discard(queue)
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import os
+from collections import OrderedDict
+from datetime import date as Date, datetime, timedelta, timezone
+from pathlib import Path
+import registry
+from appointments import store
+from scheduling import appointment_interval, format_minutes
+
+# Каталог готовых выгрузок
+EXPORT_DIR = Path("data/exports")
+
+# Сколько последних выгрузок хранить
+EXPORT_CACHE_SIZE = 20
+
+# Период по умолчанию и максимальный (дни)
+DEFAULT_EXPORT_DAYS = 30
+MAX_EXPORT_DAYS = 366
+
+CSV_COLUMNS = [
+    "id", "date", "start", "end", "photographer_id", "photographer", "service",
+    "duration", "client", "user_id", "status", "created_at"
+]
+
+# С этих символов Excel начинает формулу: такие ячейки выгружаются как текст
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Статусы записи -> STATUS события iCalendar
+ICS_STATUSES = {"new": "TENTATIVE", "confirmed": "CONFIRMED", "cancelled": "CANCELLED"}
+
+# Ключ выгрузки -> файл (в порядке последнего использования)
+_cache = OrderedDict()
+
+
+def parse_range(args: list) -> tuple:
+    """
+    Период выгрузки из аргументов команды: [с ГГГГ-ММ-ДД] [по ГГГГ-ММ-ДД].
+
+    Raises:
+        ValueError: неверная дата или слишком длинный период
+    """
+    date_from = datetime.strptime(args[0], "%Y-%m-%d").date() if args else datetime.now().date()
+    if len(args) > 1:
+        date_to = datetime.strptime(args[1], "%Y-%m-%d").date()
+    else:
+        date_to = date_from + timedelta(days=DEFAULT_EXPORT_DAYS - 1)
+    if date_to < date_from or (date_to - date_from).days >= MAX_EXPORT_DAYS:
+        raise ValueError(f"период должен быть от 1 до {MAX_EXPORT_DAYS} дней")
+    return date_from, date_to
+
+
+def appointment_times(appointment: dict) -> tuple:
+    """Начало и конец записи в минутах (None, если время не распознано)"""
+    try:
+        return appointment_interval(appointment)
+    except (KeyError, ValueError):
+        return None, None
+
+
+def csv_cell(value):
+    """
+    Значение ячейки CSV: имя клиента из Telegram вроде '=HYPERLINK(...)'
+    не должно стать формулой в таблице администратора.
+    """
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def write_csv(path: Path, appointments):
+    """Пишет записи в CSV по одной строке, не собирая их в список"""
+    # utf-8-sig - чтобы Excel правильно открыл кириллицу
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for appointment in appointments:
+            start, end = appointment_times(appointment)
+            writer.writerow(csv_cell(value) for value in (
+                appointment.get("id"),
+                appointment.get("date", ""),
+                format_minutes(start) if start is not None else appointment.get("time_slot", ""),
+                format_minutes(end) if end is not None else "",
+                appointment.get("photographer_id", ""),
+                appointment.get("photographer_name", ""),
+                appointment.get("service", ""),
+                appointment.get("duration", ""),
+                appointment.get("user_name", ""),
+                appointment.get("user_id", ""),
+                appointment.get("status", ""),
+                appointment.get("created_at", ""),
+            ))
+
+
+def ics_escape(text: str) -> str:
+    """Экранирование текста для iCalendar"""
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def ics_line(line: str) -> str:
+    """Строка iCalendar с переносом по 75 байт"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while encoded:
+        # Не разрезаем многобайтовый символ UTF-8
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74  # продолжение начинается с пробела
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def write_ics(path: Path, appointments, calendar_name: str):
+    """Пишет записи в календарь iCalendar по одному событию"""
+    prices = registry.current().prices
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for line in ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//photo-booking-bot//RU",
+                     "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{ics_escape(calendar_name)}"):
+            f.write(ics_line(line))
+        for appointment in appointments:
+            start, end = appointment_times(appointment)
+            if start is None:
+                continue
+            day = appointment["date"].replace("-", "")
+            service = prices.get(appointment.get("service"), {}).get("name", appointment.get("service") or "Фотосессия")
+            for line in (
+                "BEGIN:VEVENT",
+                f"UID:appointment-{appointment['id']}@photo-booking-bot",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{day}T{start // 60:02d}{start % 60:02d}00",
+                f"DTEND:{day}T{end // 60:02d}{end % 60:02d}00",
+                f"SUMMARY:{ics_escape(service)} - {ics_escape(appointment.get('user_name', 'Клиент'))}",
+                f"DESCRIPTION:{ics_escape('Запись #' + str(appointment['id']))}",
+                f"STATUS:{ICS_STATUSES.get(appointment.get('status'), 'TENTATIVE')}",
+                "END:VEVENT",
+            ):
+                f.write(ics_line(line))
+        f.write(ics_line("END:VCALENDAR"))
+
+
+def export_file(kind: str, date_from: Date, date_to: Date, photographer_id: str = None) -> Path:
+    """
+    Готовит файл выгрузки: "csv" (все записи) или "ics" (календарь фотографа).
+
+    Если записи за период не менялись, возвращается уже готовый файл.
+    """
+    snapshot = registry.current()
+    key = (kind, photographer_id, date_from, date_to, store.range_version(date_from, date_to), snapshot.version)
+    path = _cache.get(key)
+    if path is not None and path.exists():
+        _cache.move_to_end(key)
+        return path
+
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    name = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    path = EXPORT_DIR / f"{name}.{kind}"
+    tmp_path = path.with_suffix(f".{kind}.tmp")
+    appointments = store.iter_range(date_from, date_to, photographer_id)
+    if kind == "ics":
+        calendar_name = snapshot.photographers.get(photographer_id, {}).get("name", photographer_id)
+        write_ics(tmp_path, appointments, calendar_name)
+    else:
+        write_csv(tmp_path, appointments)
+    os.replace(tmp_path, path)
+
+    _cache[key] = path
+    while len(_cache) > EXPORT_CACHE_SIZE:
+        _, old_path = _cache.popitem(last=False)
+        old_path.unlink(missing_ok=True)
+    return path
@@ -5,6 +5,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import StateFilter, Command
 from keyboards import main_menu, services_menu
 from database import db
+import render
 # Убери импорты database/config отсюда ↓
 
 router = Router()
@@ -28,7 +29,8 @@ async def back_to_main(callback: CallbackQuery, state: FSMContext):
     Возврат в главное меню с очисткой состояния FSM.
     """
     await state.clear()
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "👋 Добро пожаловать в бот для бронирования фотосессий!\n\n"
         "Выберите действие:",
         reply_markup=get_main_menu()
@@ -50,7 +52,8 @@ async def show_services_info(callback: CallbackQuery):
         "   Полное сопровождение вашего особенного дня\n\n"
         "Выберите услугу для бронирования:"
     )
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         services_text,
         reply_markup=get_services_info_keyboard()
     )
@@ -62,7 +65,8 @@ async def start_booking(callback: CallbackQuery, state: FSMContext):
     Начало процесса бронирования - выбор услуги.
     """
     await state.set_state(BookingStates.waiting_service)
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "📸 Выберите услугу:",
         reply_markup=get_services_keyboard()
     )
@@ -95,7 +99,8 @@ async def select_service(callback: CallbackQuery, state: FSMContext):
         "свадьба": "свадебную фотосессию"
     }
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         f"✅ Выбрана услуга: {service}\n\n"
         f"📅 Введите дату в формате YYYY-MM-DD\n"
         f"(например: {datetime.now().strftime('%Y-%m-%d')}):"
@@ -200,7 +205,8 @@ async def select_time(callback: CallbackQuery, state: FSMContext):
         )
         
         await state.set_state(BookingStates.confirm)
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             confirmation_text,
             reply_markup=get_confirm_booking_keyboard(0)  # ID будет установлен после сохранения
         )
@@ -225,7 +231,8 @@ async def confirm_booking(callback: CallbackQuery, state: FSMContext, db: Databa
     if not all([service, date, time_slot]):
         await callback.answer("❌ Ошибка: не все данные заполнены", show_alert=True)
         await state.clear()
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "❌ Произошла ошибка. Попробуйте начать заново.",
             reply_markup=get_back_to_main_keyboard()
         )
@@ -263,7 +270,8 @@ async def confirm_booking(callback: CallbackQuery, state: FSMContext, db: Databa
             "Мы свяжемся с вами для подтверждения."
         )
         
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             success_text,
             reply_markup=get_back_to_main_keyboard()
         )
@@ -291,7 +299,8 @@ async def confirm_booking(callback: CallbackQuery, state: FSMContext, db: Databa
         
     except Exception as e:
         await callback.answer("❌ Ошибка при сохранении бронирования", show_alert=True)
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "❌ Произошла ошибка при сохранении. Попробуйте позже.",
             reply_markup=get_back_to_main_keyboard()
         )
@@ -305,7 +314,8 @@ async def cancel_booking(callback: CallbackQuery, state: FSMContext):
     Отмена процесса бронирования.
     """
     await state.clear()
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "❌ Бронирование отменено.",
         reply_markup=get_back_to_main_keyboard()
     )
@@ -320,7 +330,8 @@ async def back_to_services(callback: CallbackQuery, state: FSMContext):
     
     await state.update_data(service=service)
     await state.set_state(BookingStates.waiting_service)
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "📸 Выберите услугу:",
         reply_markup=get_services_keyboard()
     )
@@ -335,7 +346,8 @@ async def show_my_bookings(callback: CallbackQuery, db: Database):
     bookings = await db.get_user_bookings(user_id)
     
     if not bookings:
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "📋 У вас пока нет бронирований.\n\n"
             "Хотите записаться?",
             reply_markup=get_main_menu()
@@ -368,7 +380,8 @@ async def show_my_bookings(callback: CallbackQuery, db: Database):
             f"{status_emojis.get(booking['status'], booking['status'])}\n\n"
         )
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         bookings_text,
         reply_markup=get_back_to_main_keyboard()
     )
@@ -411,7 +424,8 @@ async def admin_refresh(callback: CallbackQuery, db: Database):
     
     bookings = await db.get_all_bookings()
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "👑 Панель администратора\n\n"
         f"Всего бронирований: {len(bookings)}",
         reply_markup=get_admin_bookings_keyboard(bookings)
@@ -451,7 +465,8 @@ async def admin_confirm_booking(callback: CallbackQuery, db: Database, bot: Any)
         
         # Обновление списка
         bookings = await db.get_all_bookings()
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "👑 Панель администратора\n\n"
             f"Всего бронирований: {len(bookings)}",
             reply_markup=get_admin_bookings_keyboard(bookings)
@@ -490,7 +505,8 @@ async def admin_cancel_booking(callback: CallbackQuery, db: Database, bot: Any):
         
         # Обновление списка
         bookings = await db.get_all_bookings()
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "👑 Панель администратора\n\n"
             f"Всего бронирований: {len(bookings)}",
             reply_markup=get_admin_bookings_keyboard(bookings)
@@ -1,50 +1,29 @@
 import asyncio
-import json
-from pathlib import Path
 from aiogram import Router, F
-from aiogram.types import Message
+from aiogram.types import FSInputFile, Message
 from aiogram.filters import Command
-from config import ADMINS, PHOTOGRAPHERS
+from config import ADMINS
+import export
+import photo_store
+import warmup
+from appointments import store
+from portfolio import update_portfolio, photo_entry
+from scheduling import appointment_slot
+from waitlist import waitlist
+from analytics import WEEKDAYS_RU, funnel
+from handlers.reviews import review_stats
+import registry
 
 router = Router()
 
 # Хранилище для ожидаемых фото (user_id: {photographer_id, caption})
 pending_photos = {}
 
-# Функция для обновления portfolio.json
-async def update_portfolio(photographer_id: str, photo_path: str, caption: str):
-    """Обновляет portfolio.json для фотографа"""
-    portfolio_path = Path(f"data/{photographer_id}/portfolio.json")
-    portfolio_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Загружаем существующий portfolio или создаем новый
-    if portfolio_path.exists():
-        with open(portfolio_path, 'r', encoding='utf-8') as f:
-            portfolio = json.load(f)
-    else:
-        portfolio = {
-            "photographer_id": photographer_id,
-            "name": PHOTOGRAPHERS.get(photographer_id, {}).get("name", "Unknown"),
-            "photos": []
-        }
-    
-    # Добавляем новое фото
-    portfolio["photos"].append({
-        "path": photo_path,
-        "caption": caption,
-        "added_at": str(asyncio.get_event_loop().time())
-    })
-    
-    # Сохраняем обновленный portfolio
-    with open(portfolio_path, 'w', encoding='utf-8') as f:
-        json.dump(portfolio, f, ensure_ascii=False, indent=2)
-    
-    return portfolio
-
 # Админ-панель: команда добавления фото
 @router.message(Command("admin_add_photo"))
 async def cmd_admin_add_photo(message: Message):
     """Команда для добавления фото фотографу"""
+    photographers = registry.current().photographers
     # Проверка прав администратора
     if message.from_user.id not in ADMINS:
         await message.answer("❌ У вас нет прав администратора!")
@@ -65,10 +44,10 @@ async def cmd_admin_add_photo(message: Message):
     caption = args[2]
     
     # Проверка существования фотографа
-    if photographer_id not in PHOTOGRAPHERS:
+    if photographer_id not in photographers:
         await message.answer(
             f"❌ Фотограф '{photographer_id}' не найден!\n\n"
-            f"Доступные фотографы: {', '.join(PHOTOGRAPHERS.keys())}"
+            f"Доступные фотографы: {', '.join(photographers.keys())}"
         )
         return
     
@@ -79,11 +58,17 @@ async def cmd_admin_add_photo(message: Message):
     }
     
     await message.answer(
-        f"📸 Готов к загрузке фото для {PHOTOGRAPHERS[photographer_id]['name']}\n"
+        f"📸 Готов к загрузке фото для {photographers[photographer_id]['name']}\n"
         f"📝 Подпись: {caption}\n\n"
-        f"Отправьте фото..."
+        f"Отправьте фото или альбом..."
     )
 
+# Сколько ждать остальные фото альбома после последнего полученного (секунды)
+ALBUM_COLLECT_DELAY = 1.0
+
+# Собираемые альбомы: (user_id, media_group_id) -> {"messages": [...], "task": Task}
+pending_albums = {}
+
 # Обработчик получения фото от админа
 @router.message(F.photo, F.from_user.id.in_(ADMINS))
 async def handle_admin_photo(message: Message):
@@ -91,58 +76,96 @@ async def handle_admin_photo(message: Message):
     if message.from_user.id not in pending_photos:
         return  # Фото не ожидается
     
-    data = pending_photos[message.from_user.id]
+    if message.media_group_id is None:
+        await ingest_photos(message, [message])
+        return
+    
+    # Фото альбома приходят отдельными сообщениями - собираем их вместе
+    key = (message.from_user.id, message.media_group_id)
+    album = pending_albums.setdefault(key, {"messages": [], "task": None})
+    album["messages"].append(message)
+    if album["task"] is not None:
+        album["task"].cancel()
+    album["task"] = asyncio.create_task(flush_album(key))
+
+# Обработка собранного альбома
+async def flush_album(key: tuple):
+    """Ждет окончания альбома и загружает все его фото"""
+    await asyncio.sleep(ALBUM_COLLECT_DELAY)
+    album = pending_albums.pop(key)
+    messages = sorted(album["messages"], key=lambda m: m.message_id)
+    await ingest_photos(messages[0], messages)
+
+# Загрузка фото в портфолио
+async def ingest_photos(message: Message, photo_messages: list):
+    """Скачивает фото параллельно (с ограничением) и добавляет их в портфолио одной записью"""
+    photographers = registry.current().photographers
+    data = pending_photos.get(message.from_user.id)
+    if data is None:
+        return
     photographer_id = data["photographer_id"]
     caption = data["caption"]
     
+    async def store(photo_message: Message):
+        photo = photo_message.photo[-1]  # Берем самое большое разрешение
+        file_info = await photo_message.bot.get_file(photo.file_id)
+        # Скачиваем в хранилище по хешу содержимого (EXIF удаляется, варианты готовятся в пуле процессов)
+        return await photo_store.store_photo(photo_message.bot, file_info.file_path)
+    
     try:
-        # Получаем файл фото
-        photo = message.photo[-1]  # Берем самое большое разрешение
-        file_info = await message.bot.get_file(photo.file_id)
-        
-        # Создаем директорию для фотографа
-        photo_dir = Path(f"data/{photographer_id}/photos")
-        photo_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Генерируем имя файла
-        file_extension = file_info.file_path.split('.')[-1]
-        photo_count = len(list(photo_dir.glob("*"))) + 1
-        photo_filename = f"photo_{photo_count}.{file_extension}"
-        photo_path = photo_dir / photo_filename
-        
-        # Скачиваем и сохраняем фото
-        await message.bot.download_file(file_info.file_path, photo_path)
-        
-        # Обновляем portfolio.json
-        relative_path = f"data/{photographer_id}/photos/{photo_filename}"
-        portfolio = await update_portfolio(photographer_id, relative_path, caption)
-        
-        # Удаляем из ожидающих
-        del pending_photos[message.from_user.id]
-        
-        await message.answer(
-            f"✅ Фото успешно добавлено!\n\n"
-            f"👤 Фотограф: {PHOTOGRAPHERS[photographer_id]['name']}\n"
-            f"📝 Подпись: {caption}\n"
-            f"📁 Путь: {relative_path}\n"
-            f"📊 Всего фото: {len(portfolio['photos'])}"
+        results = await photo_store.store_batch(
+            [lambda m=m: store(m) for m in photo_messages]
         )
+        stored = [r for r in results if not isinstance(r, BaseException)]
+        failed = len(results) - len(stored)
         
+        # Обновляем portfolio.json (в галерее показывается вариант display)
+        portfolio, added = await update_portfolio(
+            photographer_id,
+            [photo_entry(item, caption) for item in stored]
+        )
     except Exception as e:
         await message.answer(f"❌ Ошибка при сохранении фото: {e}")
-        if message.from_user.id in pending_photos:
-            del pending_photos[message.from_user.id]
-
-# Файл для хранения записей
-APPOINTMENTS_FILE = Path("data/appointments.json")
-
-# Загрузка записей
-def load_appointments():
-    """Загружает записи из JSON файла"""
-    if APPOINTMENTS_FILE.exists():
-        with open(APPOINTMENTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+        pending_photos.pop(message.from_user.id, None)
+        return
+    
+    # Удаляем из ожидающих
+    pending_photos.pop(message.from_user.id, None)
+    
+    # Заранее загружаем новые фото в служебный чат
+    if added:
+        warmup.schedule(message.bot)
+    
+    photographer_name = photographers[photographer_id]['name']
+    
+    if len(photo_messages) == 1:
+        if failed:
+            await message.answer(f"❌ Ошибка при сохранении фото: {results[0]}")
+        elif not added:
+            await message.answer(f"⚠️ Это фото уже есть в портфолио {photographer_name}")
+        else:
+            await message.answer(
+                f"✅ Фото успешно добавлено!\n\n"
+                f"👤 Фотограф: {photographer_name}\n"
+                f"📝 Подпись: {caption}\n"
+                f"🔑 Хеш: {stored[0]['hash'][:12]}"
+                f"{' (файл уже был в хранилище)' if stored[0]['duplicate'] else ''}\n"
+                f"📊 Всего фото: {len(portfolio['photos'])}"
+            )
+        return
+    
+    report = (
+        f"✅ Альбом загружен!\n\n"
+        f"👤 Фотограф: {photographer_name}\n"
+        f"📝 Подпись: {caption}\n"
+        f"📥 Добавлено: {len(added)} из {len(photo_messages)}\n"
+    )
+    if len(stored) > len(added):
+        report += f"⚠️ Уже были в портфолио: {len(stored) - len(added)}\n"
+    if failed:
+        report += f"❌ Ошибок: {failed}\n"
+    report += f"📊 Всего фото: {len(portfolio['photos'])}"
+    await message.answer(report)
 
 # Команда /admin_calendar - показать все записи
 @router.message(Command("admin_calendar"))
@@ -152,7 +175,7 @@ async def cmd_admin_calendar(message: Message):
         await message.answer("❌ У вас нет прав администратора!")
         return
     
-    appointments = load_appointments()
+    appointments = store.all()
     
     if not appointments:
         await message.answer(
@@ -178,15 +201,16 @@ async def cmd_admin_calendar(message: Message):
     days_ru = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
     
     for date_str in sorted_dates:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        day_name = days_ru[date_obj.weekday()]
-        date_display = date_obj.strftime(f"%d.%m.%Y ({day_name})")
+        # Дата уже разобрана при загрузке записи
+        first = appointments_by_date[date_str][0]
+        date_display = first.date_display
+        if first.weekday is not None:
+            date_display += f" ({days_ru[first.weekday]})"
         
         calendar_text += f"📅 {date_display}\n"
         
-        for appt in appointments_by_date[date_str]:
+        for appt in sorted(appointments_by_date[date_str], key=lambda a: a.get("time_slot", "")):
             photographer_name = appt.get("photographer_name", "Unknown")
-            time_slot = appt.get("time_slot", "")
             user_name = appt.get("user_name", "Пользователь")
             status = appt.get("status", "new")
             
@@ -196,17 +220,171 @@ async def cmd_admin_calendar(message: Message):
                 "cancelled": "❌"
             }.get(status, "❓")
             
-            time_display = {
-                "10:00": "10:00-12:00",
-                "14:00": "14:00-16:00",
-                "18:00": "18:00-20:00"
-            }.get(time_slot, time_slot)
+            time_display = appointment_slot(appt)
             
             calendar_text += (
-                f"  {status_emoji} {time_display} - {photographer_name}\n"
+                f"  {status_emoji} #{appt.get('id', '?')} {time_display} - {photographer_name}\n"
                 f"     👤 {user_name}\n"
             )
         
         calendar_text += "\n"
     
     await message.answer(calendar_text)
+
+# Команда /admin_cancel - отменить запись
+@router.message(Command("admin_cancel"))
+async def cmd_admin_cancel(message: Message):
+    """Отменяет запись и предлагает время листу ожидания"""
+    if message.from_user.id not in ADMINS:
+        await message.answer("❌ У вас нет прав администратора!")
+        return
+    
+    # Парсинг команды: /admin_cancel <id>
+    args = message.text.split()
+    if len(args) < 2 or not args[1].lstrip("#").isdigit():
+        await message.answer(
+            "📋 Использование команды:\n"
+            "/admin_cancel <id записи>\n\n"
+            "Номер записи есть в /admin_calendar"
+        )
+        return
+    
+    appointment = store.cancel(int(args[1].lstrip("#")))
+    if appointment is None:
+        await message.answer("❌ Активная запись с таким номером не найдена.")
+        return
+    
+    time_display = appointment_slot(appointment)
+    try:
+        await message.bot.send_message(
+            chat_id=appointment["user_id"],
+            text=(
+                f"❌ Ваша запись #{appointment['id']} отменена.\n\n"
+                f"📅 {appointment['date']} 🕐 {time_display}"
+            )
+        )
+    except Exception as e:
+        print(f"Ошибка уведомления об отмене: {e}")
+    
+    # Освободившееся время - первым в листе ожидания
+    await waitlist.promote(message.bot, appointment.get("photographer_id"), appointment["date"])
+    await message.answer(f"✅ Запись #{appointment['id']} ({appointment['date']} {time_display}) отменена.")
+
+# Команда /admin_api - статистика запросов к Bot API
+@router.message(Command("admin_api"))
+async def cmd_admin_api(message: Message):
+    """Показывает число вызовов, ошибок, повторов и задержки по методам Bot API"""
+    if message.from_user.id not in ADMINS:
+        await message.answer("❌ У вас нет прав администратора!")
+        return
+    
+    summary = getattr(message.bot.session, "summary", None)
+    rows = summary() if summary else []
+    if not rows:
+        await message.answer("📡 Запросов к Bot API пока не было.")
+        return
+    
+    text = "📡 Bot API (вызовы / ошибки / повторы, среднее / макс. мс)\n\n"
+    for api_method, calls, errors, retries, average, maximum in rows:
+        text += f"{api_method}: {calls} / {errors} / {retries}, {average:.0f} / {maximum:.0f}\n"
+    await message.answer(text)
+
+# Команда /stats - сводная статистика
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """Записи и выручка по фотографам, загрузка, оценки и воронка записи"""
+    if message.from_user.id not in ADMINS:
+        await message.answer("❌ У вас нет прав администратора!")
+        return
+    
+    photographers = registry.current().photographers
+    stats = store.stats()
+    # Записи без фотографа (перенесенные из старого бота) и фотографы, удаленные из справочника
+    photographer_ids = list(photographers) + sorted(
+        (pid for pid in set(stats.bookings) | set(stats.cancelled) if pid not in photographers),
+        key=lambda pid: (pid is None, str(pid))
+    )
+    
+    def photographer_label(pid) -> str:
+        if pid is None:
+            return "Без фотографа"
+        return photographers.get(pid, {}).get("name", pid)
+    
+    # Архивные месяцы в статистику не входят (их можно выгрузить через /export)
+    text = "📊 Статистика (текущий и будущие месяцы)\n\n📸 Записи по фотографам:\n"
+    for pid in photographer_ids:
+        name = photographer_label(pid)
+        text += (
+            f"  {name}: {stats.bookings[pid]} активных, {stats.cancelled[pid]} отменено, "
+            f"≈{stats.revenue[pid]}₽\n"
+        )
+    text += f"  Всего: ≈{sum(stats.revenue.values())}₽\n"
+    
+    text += "\n📅 Занятость по дням недели (часы):\n  "
+    text += ", ".join(
+        f"{WEEKDAYS_RU[weekday]} {stats.weekday_minutes[weekday] / 60:g}" for weekday in range(7)
+    ) + "\n"
+    
+    popular = [(slot, count) for slot, count in stats.slots.most_common(5) if count > 0]
+    if popular:
+        text += "\n🕐 Популярное время:\n"
+        for (weekday, hour), count in popular:
+            text += f"  {WEEKDAYS_RU[weekday]} {hour:02d}:00 - {count}\n"
+    
+    text += "\n⭐ Оценки:\n"
+    for pid in photographer_ids:
+        average = review_stats.average(pid)
+        if average is None:
+            continue
+        name = photographer_label(pid)
+        trend = ", ".join(f"{month}: {value:.1f}" for month, value, _ in review_stats.trend(pid))
+        text += f"  {name}: ★{average:.1f} ({review_stats.count[pid]})"
+        text += f" [{trend}]\n" if trend else "\n"
+    
+    text += "\n🔻 Воронка записи (с запуска бота):\n"
+    for title, count, rate in funnel.report():
+        text += f"  {title}: {count}" + (f" ({rate:.0%})" if rate is not None else "") + "\n"
+    
+    await message.answer(text)
+
+# Команда /export - выгрузка записей в CSV или календарь
+@router.message(Command("export"))
+async def cmd_export(message: Message):
+    """Отправляет записи за период файлом CSV или .ics для фотографа"""
+    photographers = registry.current().photographers
+    if message.from_user.id not in ADMINS:
+        await message.answer("❌ У вас нет прав администратора!")
+        return
+    
+    # Парсинг команды: /export csv [с] [по] или /export ics <photographer_id> [с] [по]
+    args = message.text.split()[1:]
+    kind = args[0].lower() if args else ""
+    photographer_id = None
+    if kind == "ics" and len(args) > 1:
+        photographer_id = args[1]
+        range_args = args[2:]
+    else:
+        range_args = args[1:]
+    
+    if kind not in ("csv", "ics") or (kind == "ics" and photographer_id not in photographers):
+        await message.answer(
+            "📋 Использование команды:\n"
+            "/export csv [ГГГГ-ММ-ДД] [ГГГГ-ММ-ДД]\n"
+            "/export ics <photographer_id> [ГГГГ-ММ-ДД] [ГГГГ-ММ-ДД]\n\n"
+            f"По умолчанию - {export.DEFAULT_EXPORT_DAYS} дней начиная с сегодня.\n"
+            f"Фотографы: {', '.join(photographers)}"
+        )
+        return
+    
+    try:
+        date_from, date_to = export.parse_range(range_args)
+    except ValueError as e:
+        await message.answer(f"❌ Неверный период: {e}")
+        return
+    
+    path = export.export_file(kind, date_from, date_to, photographer_id)
+    prefix = f"appointments_{photographer_id}" if photographer_id else "appointments"
+    await message.answer_document(
+        FSInputFile(path, filename=f"{prefix}_{date_from:%Y%m%d}-{date_to:%Y%m%d}.{kind}"),
+        caption=f"📤 Записи с {date_from:%d.%m.%Y} по {date_to:%d.%m.%Y}"
+    )
@@ -1,67 +1,35 @@
-import json
 from datetime import datetime, timedelta
-from pathlib import Path
+from uuid import uuid4
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Message
-from config import PHOTOGRAPHERS
+import render
+import registry
+from appointments import store
+from idempotency import actions
+from analytics import funnel
+from scheduling import (
+    SLOT_STEP, SlotUnavailable, appointment_slot, format_minutes, format_slot,
+    service_duration, to_minutes, working_hours
+)
+from waitlist import waitlist
 
 router = Router()
 
-# Файл для хранения записей
-APPOINTMENTS_FILE = Path("data/appointments.json")
-
-# Загрузка записей
-def load_appointments():
-    """Загружает записи из JSON файла"""
-    if APPOINTMENTS_FILE.exists():
-        with open(APPOINTMENTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-# Сохранение записей
-def save_appointments(appointments):
-    """Сохраняет записи в JSON файл"""
-    APPOINTMENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(APPOINTMENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(appointments, f, ensure_ascii=False, indent=2)
-
-# Добавление записи
-def add_appointment(user_id: int, user_name: str, photographer_id: str, date: str, time_slot: str):
-    """Добавляет новую запись"""
-    appointments = load_appointments()
-    appointment = {
-        "id": len(appointments) + 1,
-        "user_id": user_id,
-        "user_name": user_name,
-        "photographer_id": photographer_id,
-        "photographer_name": PHOTOGRAPHERS.get(photographer_id, {}).get("name", "Unknown"),
-        "date": date,
-        "time_slot": time_slot,
-        "status": "new",
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    appointments.append(appointment)
-    save_appointments(appointments)
-    return appointment
-
 # FSM состояния для процесса записи
 class BookingStates(StatesGroup):
     waiting_photographer = State()  # Ожидание выбора фотографа
+    waiting_service = State()       # Ожидание выбора услуги
     waiting_date = State()          # Ожидание выбора даты
     waiting_time = State()          # Ожидание выбора времени
     confirm = State()               # Подтверждение записи
 
-# Обработчик кнопки "📅 Запись"
-@router.callback_query(F.data == "booking")
-async def start_booking(callback: CallbackQuery, state: FSMContext):
-    """Начало процесса записи - выбор фотографа"""
-    await state.set_state(BookingStates.waiting_photographer)
-    
-    # Создаем кнопки с фотографами
+# Клавиатура выбора фотографа (строится один раз на версию справочника)
+def photographers_keyboard(snapshot: registry.Registry):
+    """Создает кнопки с фотографами"""
     keyboard_buttons = []
-    for photographer_id, photographer_data in PHOTOGRAPHERS.items():
+    for photographer_id, photographer_data in snapshot.photographers.items():
         keyboard_buttons.append([
             InlineKeyboardButton(
                 text=f"📸 {photographer_data['name']}",
@@ -71,9 +39,27 @@ async def start_booking(callback: CallbackQuery, state: FSMContext):
     keyboard_buttons.append([
         InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
     ])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+# Обработчик кнопки "📅 Запись"
+@router.callback_query(F.data == "booking")
+async def start_booking(callback: CallbackQuery, state: FSMContext):
+    """Начало процесса записи - выбор фотографа"""
+    # Услуга сохраняется, только если запись начата из прайса ("Перейти к записи");
+    # при возврате "🔙 Назад" ее снова можно выбрать
+    data = await state.get_data()
+    service = data.get("service") if data.get("preselected_service") else None
+    # attempt - метка этой попытки записи: повторное нажатие "Подтвердить" в ней
+    # не создает вторую запись, а новая запись на то же время - создает
+    await state.update_data(
+        reschedule_id=None, service=service, preselected_service=False, attempt=uuid4().hex
+    )
+    await state.set_state(BookingStates.waiting_photographer)
+    funnel.start(callback.from_user.id)
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text(
+    keyboard = registry.current().view("booking_photographers", photographers_keyboard)
+    await render.edit_text(
+        callback.message,
         "📅 Запись на фотосессию\n\n"
         "Выберите фотографа:",
         reply_markup=keyboard
@@ -84,22 +70,123 @@ async def start_booking(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(BookingStates.waiting_photographer, F.data.startswith("book_photographer_"))
 async def select_photographer(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора фотографа"""
+    photographers = registry.current().photographers
     photographer_id = callback.data.replace("book_photographer_", "")
     
-    if photographer_id not in PHOTOGRAPHERS:
+    if photographer_id not in photographers:
         await callback.answer("❌ Фотограф не найден!", show_alert=True)
         return
     
     # Сохраняем выбранного фотографа
     await state.update_data(photographer_id=photographer_id)
+    
+    # Услуга могла быть выбрана заранее в прайсе
+    data = await state.get_data()
+    if data.get("service") in registry.current().prices:
+        await state.set_state(BookingStates.waiting_date)
+        funnel.enter(callback.from_user.id, "waiting_service")
+        funnel.enter(callback.from_user.id, "waiting_date")
+        await show_calendar(callback, state)
+        return
+    
+    await state.set_state(BookingStates.waiting_service)
+    funnel.enter(callback.from_user.id, "waiting_service")
+    await show_services(callback, state)
+
+# Клавиатура выбора услуги (строится один раз на версию справочника)
+def services_keyboard(snapshot: registry.Registry):
+    """Создает кнопки с услугами"""
+    keyboard_buttons = []
+    for service_key, service_data in snapshot.prices.items():
+        keyboard_buttons.append([
+            InlineKeyboardButton(
+                text=f"{service_data['name']} ({service_data['price']}₽, {service_data['duration']})",
+                callback_data=f"book_svc_{service_key}"
+            )
+        ])
+    keyboard_buttons.append([
+        InlineKeyboardButton(text="🔙 Назад", callback_data="booking")
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+# Показать список услуг
+async def show_services(callback: CallbackQuery, state: FSMContext):
+    """Отображение выбора услуги"""
+    data = await state.get_data()
+    photographer_name = registry.current().photographers[data["photographer_id"]]["name"]
+    
+    await render.edit_text(
+        callback.message,
+        f"📋 Выберите услугу\n\n"
+        f"📸 Фотограф: {photographer_name}",
+        reply_markup=registry.current().view("booking_services", services_keyboard)
+    )
+    await callback.answer()
+
+# Выбор услуги
+@router.callback_query(BookingStates.waiting_service, F.data.startswith("book_svc_"))
+async def select_service(callback: CallbackQuery, state: FSMContext):
+    """Обработка выбора услуги"""
+    service_key = callback.data.replace("book_svc_", "")
+    
+    if service_key not in registry.current().prices:
+        await callback.answer("❌ Услуга не найдена", show_alert=True)
+        return
+    
+    await state.update_data(service=service_key)
     await state.set_state(BookingStates.waiting_date)
+    funnel.enter(callback.from_user.id, "waiting_date")
     
     # Генерируем календарь на неделю вперед
     await show_calendar(callback, state)
 
+# Самое раннее время начала в этот день
+def earliest_start(date_str: str):
+    """Минуты от начала суток, с которых можно записаться; None, если день уже прошел"""
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    if date_str < today:
+        return None
+    # Сегодня нельзя записаться на уже прошедшее время
+    return now.hour * 60 + now.minute if date_str == today else 0
+
+# Свободные времена начала для выбранных фотографа, услуги и даты
+def free_starts(data: dict, date_str: str) -> list:
+    """Возвращает свободные времена начала (минуты) с учетом длительности услуги"""
+    photographer_id = data["photographer_id"]
+    duration = service_duration(registry.current(), data.get("service"), photographer_id)
+    
+    not_before = earliest_start(date_str)
+    if not_before is None:
+        return []
+    
+    # При переносе собственное время записи считается свободным
+    return store.available_starts(
+        photographer_id, date_str, duration, not_before=not_before, ignore=data.get("reschedule_id")
+    )
+
+# Занятые времена начала - на них можно встать в лист ожидания
+def taken_starts(data: dict, date_str: str, free: list) -> list:
+    """Возвращает времена начала рабочей сетки, которые сейчас заняты"""
+    photographer_id = data["photographer_id"]
+    snapshot = registry.current()
+    duration = service_duration(snapshot, data.get("service"), photographer_id)
+    day_start, day_end = working_hours(snapshot, photographer_id)
+    
+    not_before = earliest_start(date_str)
+    if not_before is None:
+        return []
+    
+    free = set(free)
+    return [
+        start for start in range(day_start, day_end - duration + 1, SLOT_STEP)
+        if start >= not_before and start not in free
+    ]
+
 # Показать календарь с днями недели
 async def show_calendar(callback: CallbackQuery, state: FSMContext):
     """Отображение календаря с доступными датами"""
+    photographers = registry.current().photographers
     today = datetime.now().date()
     
     # Генерируем даты на ближайшие 7 дней
@@ -108,6 +195,8 @@ async def show_calendar(callback: CallbackQuery, state: FSMContext):
         date = today + timedelta(days=i)
         dates.append(date)
     
+    data = await state.get_data()
+    
     # Создаем кнопки с днями недели
     keyboard_buttons = []
     row = []
@@ -121,6 +210,10 @@ async def show_calendar(callback: CallbackQuery, state: FSMContext):
         date_str = date.strftime("%Y-%m-%d")
         date_display = f"{day_name} {date.day} {months_ru[date.month - 1]}"
         
+        # Дни без свободного времени помечаем замком
+        if not free_starts(data, date_str):
+            date_display = f"🔒 {date_display}"
+        
         row.append(InlineKeyboardButton(
             text=date_display,
             callback_data=f"book_date_{date_str}"
@@ -137,10 +230,10 @@ async def show_calendar(callback: CallbackQuery, state: FSMContext):
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
-    data = await state.get_data()
-    photographer_name = PHOTOGRAPHERS[data["photographer_id"]]["name"]
+    photographer_name = photographers[data["photographer_id"]]["name"]
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         f"📅 Выберите дату\n\n"
         f"📸 Фотограф: {photographer_name}\n\n"
         f"Доступные даты:",
@@ -154,34 +247,49 @@ async def select_date(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора даты"""
     date_str = callback.data.replace("book_date_", "")
     
+    # Кнопка из старого календаря: прошедший день - показываем актуальный календарь
+    if earliest_start(date_str) is None:
+        await show_calendar(callback, state)
+        return
+    
     # Сохраняем дату
     await state.update_data(date=date_str)
     await state.set_state(BookingStates.waiting_time)
+    funnel.enter(callback.from_user.id, "waiting_time")
     
     # Показываем временные слоты
     await show_time_slots(callback, state)
 
 # Показать временные слоты
-async def show_time_slots(callback: CallbackQuery, state: FSMContext):
-    """Отображение доступных временных слотов"""
+async def show_time_slots(callback: CallbackQuery, state: FSMContext, notice: str = None):
+    """Отображение доступных временных слотов (notice - предупреждение во всплывающем окне)"""
     data = await state.get_data()
     date_str = data.get("date")
     
-    # Доступные временные слоты
-    time_slots = [
-        ("10:00", "10:00-12:00"),
-        ("14:00", "14:00-16:00"),
-        ("18:00", "18:00-20:00")
-    ]
+    # Свободное время с учетом длительности услуги и рабочих часов фотографа
+    duration = service_duration(registry.current(), data.get("service"), data["photographer_id"])
+    starts = free_starts(data, date_str)
     
     keyboard_buttons = []
-    for time_value, time_display in time_slots:
-        keyboard_buttons.append([
-            InlineKeyboardButton(
-                text=time_display,
-                callback_data=f"book_time_{time_value}"
-            )
-        ])
+    row = []
+    for start in starts:
+        row.append(InlineKeyboardButton(
+            text=format_slot(start, duration),
+            callback_data=f"book_time_{format_minutes(start)}"
+        ))
+        # По 2 кнопки в ряду
+        if len(row) == 2:
+            keyboard_buttons.append(row)
+            row = []
+    if row:
+        keyboard_buttons.append(row)
+    
+    # Занятое время - можно встать в лист ожидания
+    for start in taken_starts(data, date_str, starts):
+        keyboard_buttons.append([InlineKeyboardButton(
+            text=f"🔒 {format_slot(start, duration)} — лист ожидания",
+            callback_data=f"book_wait_{format_minutes(start)}"
+        )])
     
     keyboard_buttons.append([
         InlineKeyboardButton(text="🔙 Назад к календарю", callback_data="book_back_to_calendar")
@@ -193,13 +301,17 @@ async def show_time_slots(callback: CallbackQuery, state: FSMContext):
     date_obj = datetime.strptime(date_str, "%Y-%m-%d")
     date_display = date_obj.strftime("%d.%m.%Y")
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         f"🕐 Выберите время\n\n"
         f"📅 Дата: {date_display}\n\n"
-        f"Доступные слоты:",
+        + ("Доступные слоты:" if starts else "❌ На эту дату нет свободного времени."),
         reply_markup=keyboard
     )
-    await callback.answer()
+    if notice:
+        await callback.answer(notice, show_alert=True)
+    else:
+        await callback.answer()
 
 # Выбор времени
 @router.callback_query(BookingStates.waiting_time, F.data.startswith("book_time_"))
@@ -210,10 +322,45 @@ async def select_time(callback: CallbackQuery, state: FSMContext):
     # Сохраняем время
     await state.update_data(time_slot=time_slot)
     await state.set_state(BookingStates.confirm)
+    funnel.enter(callback.from_user.id, "confirm")
     
     # Показываем подтверждение
     await show_confirmation(callback, state)
 
+# Запись в лист ожидания на занятое время
+@router.callback_query(BookingStates.waiting_time, F.data.startswith("book_wait_"))
+async def join_waitlist(callback: CallbackQuery, state: FSMContext):
+    """Ставит пользователя в очередь на занятое время"""
+    time_slot = callback.data.replace("book_wait_", "")
+    data = await state.get_data()
+    photographer_id = data["photographer_id"]
+    date_str = data.get("date")
+    service_key = data.get("service")
+    duration = service_duration(registry.current(), service_key, photographer_id)
+    user_name = callback.from_user.full_name or callback.from_user.username or "Пользователь"
+    
+    position = waitlist.join(
+        (photographer_id, date_str, time_slot), callback.from_user.id, user_name, service_key, duration
+    )
+    # Время могло освободиться, пока пользователь смотрел список
+    await waitlist.promote(callback.bot, photographer_id, date_str)
+    
+    date_display = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
+    ])
+    await render.edit_text(
+        callback.message,
+        f"⏳ Лист ожидания\n\n"
+        f"📅 Дата: {date_display}\n"
+        f"🕐 Время: {format_slot(to_minutes(time_slot), duration)}\n\n"
+        + (f"Вы {position}-й в очереди." if position else "Вы уже в очереди на это время.")
+        + "\nЕсли время освободится, мы пришлем сообщение.",
+        reply_markup=keyboard
+    )
+    await state.clear()
+    await callback.answer()
+
 # Возврат к календарю
 @router.callback_query(BookingStates.waiting_time, F.data == "book_back_to_calendar")
 async def back_to_calendar(callback: CallbackQuery, state: FSMContext):
@@ -224,10 +371,11 @@ async def back_to_calendar(callback: CallbackQuery, state: FSMContext):
 # Показать подтверждение
 async def show_confirmation(callback: CallbackQuery, state: FSMContext):
     """Отображение подтверждения записи"""
+    photographers = registry.current().photographers
     data = await state.get_data()
     
     photographer_id = data.get("photographer_id")
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
+    photographer_name = photographers[photographer_id]["name"]
     date_str = data.get("date")
     time_slot = data.get("time_slot")
     
@@ -236,11 +384,9 @@ async def show_confirmation(callback: CallbackQuery, state: FSMContext):
     date_display = date_obj.strftime("%d.%m.%Y")
     
     # Форматируем время
-    time_display = {
-        "10:00": "10:00-12:00",
-        "14:00": "14:00-16:00",
-        "18:00": "18:00-20:00"
-    }.get(time_slot, time_slot)
+    service = registry.current().prices.get(data.get("service"), {})
+    duration = service_duration(registry.current(), data.get("service"), photographer_id)
+    time_display = format_slot(to_minutes(time_slot), duration)
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -249,9 +395,11 @@ async def show_confirmation(callback: CallbackQuery, state: FSMContext):
         ]
     ])
     
-    await callback.message.edit_text(
-        f"📋 Подтвердите запись:\n\n"
+    await render.edit_text(
+        callback.message,
+        f"📋 Подтвердите {'перенос записи' if data.get('reschedule_id') else 'запись'}:\n\n"
         f"📸 Фотограф: {photographer_name}\n"
+        f"📋 Услуга: {service.get('name', '')} ({service.get('price', '')}₽)\n"
         f"📅 Дата: {date_display}\n"
         f"🕐 Время: {time_display}\n\n"
         f"Нажмите 'Подтвердить' для завершения записи.",
@@ -263,10 +411,11 @@ async def show_confirmation(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(BookingStates.confirm, F.data == "book_confirm")
 async def confirm_booking(callback: CallbackQuery, state: FSMContext):
     """Подтверждение и сохранение записи"""
+    photographers = registry.current().photographers
     data = await state.get_data()
     
     photographer_id = data.get("photographer_id")
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
+    photographer_name = photographers[photographer_id]["name"]
     date_str = data.get("date")
     time_slot = data.get("time_slot")
     
@@ -274,23 +423,58 @@ async def confirm_booking(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     user_name = callback.from_user.full_name or callback.from_user.username or "Пользователь"
     
-    appointment = add_appointment(user_id, user_name, photographer_id, date_str, time_slot)
+    service_key = data.get("service")
+    duration = service_duration(registry.current(), service_key, photographer_id)
+    
+    reschedule_id = data.get("reschedule_id")
+    old_date = (store.get(reschedule_id) or {}).get("date") if reschedule_id else None
+    
+    async def save():
+        if reschedule_id:
+            # Перенос: старое время освобождается вместе с занятием нового
+            return store.move(reschedule_id, user_id, date_str, time_slot)
+        return store.add(user_id, user_name, photographer_id, date_str, time_slot, service_key, duration)
+    
+    # Двойное нажатие "Подтвердить" в той же попытке не должно создавать вторую запись
+    action = ("book_confirm", data.get("attempt"), photographer_id, date_str, time_slot, reschedule_id)
+    try:
+        appointment, duplicate = await actions.run((user_id, callback.message.message_id, action), save)
+    except SlotUnavailable:
+        # Пока пользователь подтверждал, время успели занять
+        await state.set_state(BookingStates.waiting_time)
+        await show_time_slots(callback, state, notice="❌ Это время уже занято, выберите другое")
+        return
     
-    # Форматируем дату и время
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    date_display = date_obj.strftime("%d.%m.%Y")
-    time_display = {
-        "10:00": "10:00-12:00",
-        "14:00": "14:00-16:00",
-        "18:00": "18:00-20:00"
-    }.get(time_slot, time_slot)
+    if not duplicate and appointment is not None:
+        if reschedule_id:
+            # Освободившееся время - листу ожидания
+            await waitlist.promote(callback.bot, photographer_id, old_date)
+        else:
+            funnel.enter(user_id, "booked")
     
+    # Повтор получает тот же ответ, что и первое нажатие
+    await show_booking_result(callback, state, appointment, photographer_name, bool(reschedule_id))
+
+# Итог подтверждения записи
+async def show_booking_result(callback: CallbackQuery, state: FSMContext, appointment,
+                              photographer_name: str, rescheduled: bool):
+    """Показывает созданную или перенесенную запись"""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
     ])
     
-    await callback.message.edit_text(
-        f"✅ Запись успешно создана!\n\n"
+    if appointment is None:
+        await state.clear()
+        await render.edit_text(callback.message, "❌ Запись не найдена или уже отменена.", reply_markup=keyboard)
+        await callback.answer()
+        return
+    
+    date_display = appointment.date_display
+    time_display = appointment_slot(appointment)
+    
+    await render.edit_text(
+        callback.message,
+        f"✅ {'Запись перенесена' if rescheduled else 'Запись успешно создана'}!\n\n"
         f"📸 Фотограф: {photographer_name}\n"
         f"📅 Дата: {date_display}\n"
         f"🕐 Время: {time_display}\n\n"
@@ -299,7 +483,7 @@ async def confirm_booking(callback: CallbackQuery, state: FSMContext):
     )
     
     await state.clear()
-    await callback.answer("✅ Запись создана!")
+    await callback.answer("✅ Запись перенесена!" if rescheduled else "✅ Запись создана!")
 
 # Отмена записи
 @router.callback_query(BookingStates.confirm, F.data == "book_cancel")
@@ -311,30 +495,69 @@ async def cancel_booking(callback: CallbackQuery, state: FSMContext):
         [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
     ])
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "❌ Запись отменена.",
         reply_markup=keyboard
     )
     await callback.answer()
 
+# Клиент из листа ожидания соглашается на освободившееся время
+@router.callback_query(F.data.startswith("wl_accept_"))
+async def accept_waitlist_offer(callback: CallbackQuery):
+    """Создает запись на время, закрепленное за пользователем"""
+    hold_id = int(callback.data.replace("wl_accept_", ""))
+    try:
+        appointment = waitlist.accept(hold_id, callback.from_user.id)
+    except SlotUnavailable:
+        appointment = None
+    
+    if appointment is None:
+        await render.edit_text(callback.message, "⌛ Предложение больше не действует.")
+        await callback.answer()
+        return
+    
+    date_display = appointment.date_display
+    await render.edit_text(
+        callback.message,
+        f"✅ Запись успешно создана!\n\n"
+        f"📸 Фотограф: {appointment['photographer_name']}\n"
+        f"📅 Дата: {date_display}\n"
+        f"🕐 Время: {appointment_slot(appointment)}\n\n"
+        f"Мы свяжемся с вами для подтверждения."
+    )
+    await callback.answer("✅ Запись создана!")
+
+# Отказ от освободившегося времени
+@router.callback_query(F.data.startswith("wl_decline_"))
+async def decline_waitlist_offer(callback: CallbackQuery):
+    """Передает время следующему в очереди"""
+    hold_id = int(callback.data.replace("wl_decline_", ""))
+    await waitlist.decline(callback.bot, hold_id, callback.from_user.id)
+    await render.edit_text(callback.message, "❌ Вы отказались от предложенного времени.")
+    await callback.answer()
+
 # Обработчик "Мои записи"
 @router.callback_query(F.data == "my_bookings")
 async def show_my_bookings(callback: CallbackQuery):
     """Показывает список записей пользователя"""
     user_id = callback.from_user.id
-    appointments = load_appointments()
+    # Записи пользователя
+    user_appointments = store.user_appointments(user_id)
     
-    # Фильтруем записи пользователя
-    user_appointments = [appt for appt in appointments if appt.get("user_id") == user_id]
+    # Прошедшие месяцы в архиве и здесь не показываются
+    archive_note = "ℹ️ Записи прошлых месяцев не показываются.\n\n" if store.archived_months() else ""
     
     if not user_appointments:
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="📅 Записаться", callback_data="booking")],
             [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
         ])
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "📋 Мои записи\n\n"
             "❌ У вас пока нет записей.\n\n"
+            f"{archive_note}"
             "Хотите записаться?",
             reply_markup=keyboard
         )
@@ -342,7 +565,7 @@ async def show_my_bookings(callback: CallbackQuery):
         return
     
     # Сортируем по дате (сначала ближайшие)
-    user_appointments.sort(key=lambda x: x.get("date", ""))
+    user_appointments.sort(key=lambda x: (x.get("date", ""), x.get("time_slot", "")))
     
     # Формируем текст
     bookings_text = "📋 Мои записи:\n\n"
@@ -359,25 +582,17 @@ async def show_my_bookings(callback: CallbackQuery):
         "cancelled": "Отменено"
     }
     
+    today = datetime.now().strftime("%Y-%m-%d")
+    keyboard_buttons = []
+    
     for appt in user_appointments:
         photographer_name = appt.get("photographer_name", "Unknown")
         date_str = appt.get("date", "")
-        time_slot = appt.get("time_slot", "")
         status = appt.get("status", "new")
-        
-        # Форматируем дату
-        try:
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            date_display = date_obj.strftime("%d.%m.%Y")
-        except:
-            date_display = date_str
+        date_display = appt.date_display
         
         # Форматируем время
-        time_display = {
-            "10:00": "10:00-12:00",
-            "14:00": "14:00-16:00",
-            "18:00": "18:00-20:00"
-        }.get(time_slot, time_slot)
+        time_display = appointment_slot(appt)
         
         status_emoji = status_emojis.get(status, "❓")
         status_text = status_texts.get(status, status)
@@ -388,14 +603,84 @@ async def show_my_bookings(callback: CallbackQuery):
             f"📅 {date_display} 🕐 {time_display}\n"
             f"📊 {status_text}\n\n"
         )
+        
+        # Предстоящие записи можно перенести или отменить
+        if status != "cancelled" and date_str >= today:
+            keyboard_buttons.append([
+                InlineKeyboardButton(text=f"🔄 Перенести #{appt['id']}", callback_data=f"my_move_{appt['id']}"),
+                InlineKeyboardButton(text=f"❌ Отменить #{appt['id']}", callback_data=f"my_cancel_{appt['id']}")
+            ])
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📅 Новая запись", callback_data="booking")],
-        [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
-    ])
+    bookings_text += archive_note
+    
+    keyboard_buttons.append([InlineKeyboardButton(text="📅 Новая запись", callback_data="booking")])
+    keyboard_buttons.append([InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")])
+    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         bookings_text,
         reply_markup=keyboard
     )
     await callback.answer()
+
+# Перенос записи из "Мои записи"
+@router.callback_query(F.data.startswith("my_move_"))
+async def reschedule_booking(callback: CallbackQuery, state: FSMContext):
+    """Перенос записи - выбор новой даты и времени у того же фотографа"""
+    appointment = store.get(int(callback.data.replace("my_move_", "")))
+    if (appointment is None or appointment.get("user_id") != callback.from_user.id
+            or appointment.get("status") == "cancelled"):
+        await callback.answer("❌ Запись не найдена или уже отменена.", show_alert=True)
+        return
+    if appointment.get("photographer_id") not in registry.current().photographers:
+        await callback.answer("❌ Фотограф больше не принимает записи.", show_alert=True)
+        return
+    
+    await state.clear()
+    await state.update_data(
+        photographer_id=appointment["photographer_id"],
+        service=appointment.get("service"),
+        reschedule_id=appointment["id"],
+        attempt=uuid4().hex
+    )
+    await state.set_state(BookingStates.waiting_date)
+    await show_calendar(callback, state)
+
+# Отмена записи из "Мои записи" - запрос подтверждения
+@router.callback_query(F.data.startswith("my_cancel_"))
+async def ask_cancel_booking(callback: CallbackQuery):
+    """Спрашивает подтверждение отмены записи"""
+    appointment_id = int(callback.data.replace("my_cancel_", ""))
+    appointment = store.get(appointment_id)
+    if appointment is None or appointment.get("user_id") != callback.from_user.id:
+        await callback.answer("❌ Запись не найдена.", show_alert=True)
+        return
+    
+    date_display = appointment.date_display
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="✅ Да, отменить", callback_data=f"my_confirm_cancel_{appointment_id}"),
+            InlineKeyboardButton(text="🔙 Назад", callback_data="my_bookings")
+        ]
+    ])
+    await render.edit_text(
+        callback.message,
+        f"❓ Отменить запись #{appointment_id}?\n\n"
+        f"📸 {appointment.get('photographer_name', 'Unknown')}\n"
+        f"📅 {date_display} 🕐 {appointment_slot(appointment)}",
+        reply_markup=keyboard
+    )
+    await callback.answer()
+
+# Отмена записи из "Мои записи"
+@router.callback_query(F.data.startswith("my_confirm_cancel_"))
+async def confirm_cancel_booking(callback: CallbackQuery):
+    """Отменяет запись пользователя и предлагает время листу ожидания"""
+    appointment = store.cancel(int(callback.data.replace("my_confirm_cancel_", "")), callback.from_user.id)
+    if appointment is None:
+        await callback.answer("❌ Запись не найдена или уже отменена.", show_alert=True)
+        return
+    
+    await waitlist.promote(callback.bot, appointment.get("photographer_id"), appointment["date"])
+    await show_my_bookings(callback)
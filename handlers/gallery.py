@@ -1,17 +1,27 @@
-import json
+import asyncio
+import hashlib
 from pathlib import Path
 from aiogram import Router, F
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile, InputMediaPhoto
-from config import PHOTOGRAPHERS
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile, InputMediaPhoto, Message
+import imaging
+import render
+import warmup
+from portfolio import load_portfolio, sheet_file_ids, sheets_dir, set_file_ids
+import registry
 
 router = Router()
 
-# Обработчик callback "gallery" - выбор фотографа
-@router.callback_query(F.data == "gallery")
-async def show_gallery(callback: CallbackQuery):
-    # Создаем кнопки для каждого фотографа
+# Фото для отправки: file_id после предзагрузки (см. warmup.py) или локальный файл
+def photo_media(photo: dict):
+    """Возвращает file_id фото, если он известен, иначе FSInputFile"""
+    return photo.get("file_id") or FSInputFile(photo["path"])
+
+# Клавиатура выбора фотографа (строится один раз на версию справочника)
+def gallery_keyboard(snapshot: registry.Registry):
+    """Создает кнопки для каждого фотографа"""
     keyboard_buttons = []
-    for photographer_id, photographer_data in PHOTOGRAPHERS.items():
+    for photographer_id, photographer_data in snapshot.photographers.items():
         keyboard_buttons.append([
             InlineKeyboardButton(
                 text=f"📸 {photographer_data['name']}", 
@@ -21,9 +31,14 @@ async def show_gallery(callback: CallbackQuery):
     keyboard_buttons.append([
         InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
     ])
-    
-    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text(
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+# Обработчик callback "gallery" - выбор фотографа
+@router.callback_query(F.data == "gallery")
+async def show_gallery(callback: CallbackQuery):
+    keyboard = registry.current().view("gallery_keyboard", gallery_keyboard)
+    await render.edit_text(
+        callback.message,
         "📸 Галерея фотографий\n\nВыберите фотографа:",
         reply_markup=keyboard
     )
@@ -33,22 +48,24 @@ async def show_gallery(callback: CallbackQuery):
 @router.callback_query(F.data.startswith("gallery_"))
 async def gallery(callback: CallbackQuery):
     # Извлекаем photographer_id из callback_data
+    photographers = registry.current().photographers
     photographer_id = callback.data.replace("gallery_", "")
     
     # Проверяем существование фотографа
-    if photographer_id not in PHOTOGRAPHERS:
+    if photographer_id not in photographers:
         await callback.answer("❌ Фотограф не найден!", show_alert=True)
         return
     
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
-    portfolio_path = Path(f"data/{photographer_id}/portfolio.json")
+    photographer_name = photographers[photographer_id]["name"]
+    portfolio = load_portfolio(photographer_id)
     
     # Проверяем наличие portfolio.json
-    if not portfolio_path.exists():
+    if portfolio is None:
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")]
         ])
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             f"📸 {photographer_name}\n\n"
             f"❌ Портфолио пока пустое. Фотографии будут добавлены администратором.",
             reply_markup=keyboard
@@ -58,16 +75,14 @@ async def gallery(callback: CallbackQuery):
     
     # Загружаем portfolio
     try:
-        with open(portfolio_path, 'r', encoding='utf-8') as f:
-            portfolio = json.load(f)
-        
         photos = portfolio.get("photos", [])
         
         if not photos:
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")]
             ])
-            await callback.message.edit_text(
+            await render.edit_text(
+                callback.message,
                 f"📸 {photographer_name}\n\n"
                 f"❌ Портфолио пока пустое.",
                 reply_markup=keyboard
@@ -77,25 +92,16 @@ async def gallery(callback: CallbackQuery):
         
         # Удаляем старое сообщение
         await callback.message.delete()
+        render.forget(callback.message)
         
         # Отправляем первое фото
         first_photo = photos[0]
         photo_path = Path(first_photo["path"])
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [
-                InlineKeyboardButton(text="⬅️", callback_data=f"photo_{photographer_id}_0_prev"),
-                InlineKeyboardButton(
-                    text=f"1/{len(photos)}", 
-                    callback_data="photo_count"
-                ),
-                InlineKeyboardButton(text="➡️", callback_data=f"photo_{photographer_id}_0_next")
-            ],
-            [InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")]
-        ])
+        keyboard = photo_keyboard(photographer_id, 0, len(photos))
         
-        if photo_path.exists():
-            photo_file = FSInputFile(str(photo_path))
+        if first_photo.get("file_id") or photo_path.exists():
+            photo_file = photo_media(first_photo)
             await callback.bot.send_photo(
                 chat_id=callback.from_user.id,
                 photo=photo_file,
@@ -114,10 +120,47 @@ async def gallery(callback: CallbackQuery):
     except Exception as e:
         await callback.answer(f"❌ Ошибка загрузки портфолио: {e}", show_alert=True)
 
+# Окно объединения быстрых нажатий ⬅️/➡️ (секунды)
+NAVIGATION_DEBOUNCE = 0.35
+
+class PendingNavigation:
+    """Отложенное переключение фото в одном сообщении галереи"""
+    __slots__ = ("index", "task")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.task = None
+
+# Ожидающие переключения: (chat_id, message_id) -> PendingNavigation
+pending_navigation = {}
+
+# Клавиатура навигации по фото
+def photo_keyboard(photographer_id: str, index: int, total: int):
+    """Создает клавиатуру ⬅️ n/N ➡️ для фото с индексом index"""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [
+            InlineKeyboardButton(text="⬅️", callback_data=f"photo_{photographer_id}_{index}_prev"),
+            InlineKeyboardButton(
+                text=f"{index + 1}/{total}", 
+                callback_data="photo_count"
+            ),
+            InlineKeyboardButton(text="➡️", callback_data=f"photo_{photographer_id}_{index}_next")
+        ],
+        [
+            InlineKeyboardButton(text="🔢 Обзор", callback_data=f"overview_{photographer_id}_{index // SHEET_PAGE_SIZE}"),
+            InlineKeyboardButton(text="🗂 Альбомом", callback_data=f"album_{photographer_id}_{index}")
+        ],
+        [InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")]
+    ])
+
 # Навигация по фото (следующее/предыдущее)
 @router.callback_query(F.data.startswith("photo_"))
 async def navigate_photo(callback: CallbackQuery):
     """Навигация по фотографиям в галерее"""
+    if callback.data == "photo_count":  # Кнопка-счетчик
+        await callback.answer()
+        return
+    
     parts = callback.data.split("_")
     if len(parts) < 4:
         await callback.answer("❌ Ошибка навигации", show_alert=True)
@@ -125,47 +168,57 @@ async def navigate_photo(callback: CallbackQuery):
     
     photographer_id = parts[1]
     current_index = int(parts[2])
-    direction = parts[3]  # "next" или "prev"
+    direction = parts[3]  # "next", "prev" или "goto"
     
-    portfolio_path = Path(f"data/{photographer_id}/portfolio.json")
-    if not portfolio_path.exists():
+    portfolio = load_portfolio(photographer_id)
+    if portfolio is None:
         await callback.answer("❌ Портфолио не найдено", show_alert=True)
         return
     
-    with open(portfolio_path, 'r', encoding='utf-8') as f:
-        portfolio = json.load(f)
-    
     photos = portfolio.get("photos", [])
     if not photos:
         await callback.answer("❌ Нет фотографий", show_alert=True)
         return
     
+    # Если переключение уже ожидается, отсчитываем от его целевого индекса,
+    # а не от устаревшего индекса в кнопке
+    key = (callback.message.chat.id, callback.message.message_id)
+    pending = pending_navigation.get(key)
+    if pending is None:
+        pending = pending_navigation[key] = PendingNavigation(current_index)
+    elif pending.task is not None:
+        pending.task.cancel()
+    
     # Вычисляем новый индекс
     if direction == "next":
-        new_index = (current_index + 1) % len(photos)
+        pending.index = (pending.index + 1) % len(photos)
+    elif direction == "goto":  # переход с контактного листа
+        pending.index = current_index % len(photos)
     else:  # prev
-        new_index = (current_index - 1) % len(photos)
-    
-    photo = photos[new_index]
-    photo_path = Path(photo["path"])
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
-    
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="⬅️", callback_data=f"photo_{photographer_id}_{new_index}_prev"),
-            InlineKeyboardButton(
-                text=f"{new_index + 1}/{len(photos)}", 
-                callback_data="photo_count"
-            ),
-            InlineKeyboardButton(text="➡️", callback_data=f"photo_{photographer_id}_{new_index}_next")
-        ],
-        [InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")]
-    ])
+        pending.index = (pending.index - 1) % len(photos)
     
+    pending.task = asyncio.create_task(
+        apply_navigation(callback.message, photographer_id, photos, key, pending)
+    )
+    await callback.answer()
+
+# Отправка итогового фото после серии нажатий
+async def apply_navigation(message: Message, photographer_id: str, photos: list, key: tuple, pending: PendingNavigation):
+    """Ждет окончания серии нажатий и выполняет один edit_media"""
+    photographers = registry.current().photographers
     try:
-        if photo_path.exists():
-            photo_file = FSInputFile(str(photo_path))
-            await callback.message.edit_media(
+        await asyncio.sleep(NAVIGATION_DEBOUNCE)
+        render.forget(message)
+        
+        new_index = pending.index
+        photo = photos[new_index]
+        photo_path = Path(photo["path"])
+        photographer_name = photographers[photographer_id]["name"]
+        keyboard = photo_keyboard(photographer_id, new_index, len(photos))
+        
+        if photo.get("file_id") or photo_path.exists():
+            photo_file = photo_media(photo)
+            await message.edit_media(
                 media=InputMediaPhoto(
                     media=photo_file,
                     caption=f"📸 {photographer_name}\n\n{photo.get('caption', '')}"
@@ -173,10 +226,211 @@ async def navigate_photo(callback: CallbackQuery):
                 reply_markup=keyboard
             )
         else:
-            await callback.message.edit_caption(
+            await message.edit_caption(
                 caption=f"📸 {photographer_name}\n\n{photo.get('caption', '')}\n\n❌ Файл не найден: {photo_path}",
                 reply_markup=keyboard
             )
+    except asyncio.CancelledError:
+        # Заменено более поздним нажатием
+        raise
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            print(f"Ошибка навигации по галерее: {e}")
+    except Exception as e:
+        print(f"Ошибка навигации по галерее: {e}")
+    finally:
+        if pending_navigation.get(key) is pending and pending.task is asyncio.current_task():
+            del pending_navigation[key]
+
+# Фото на одном контактном листе
+SHEET_PAGE_SIZE = 9
+
+# Листы, которые собираются прямо сейчас: путь -> Task
+rendering_sheets = {}
+
+# Контактный лист страницы портфолио
+async def contact_sheet(photographer_id: str, photos: list, page: int) -> Path:
+    """Возвращает путь к контактному листу страницы (собирает его, если нет в кэше)"""
+    page_photos = photos[page * SHEET_PAGE_SIZE:(page + 1) * SHEET_PAGE_SIZE]
+    thumbs = [photo.get("variants", {}).get("thumb", photo["path"]) for photo in page_photos]
+    
+    # Имя файла зависит от содержимого страницы, поэтому устаревший лист не будет показан
+    digest = hashlib.sha1("\n".join(thumbs).encode("utf-8")).hexdigest()[:12]
+    sheet_path = sheets_dir(photographer_id) / f"page_{page}_{digest}.jpg"
+    if sheet_path.exists():
+        return sheet_path
+    
+    task = rendering_sheets.get(sheet_path)
+    if task is None:
+        sheet_path.parent.mkdir(parents=True, exist_ok=True)
+        task = asyncio.ensure_future(
+            imaging.render_contact_sheet(thumbs, sheet_path, page * SHEET_PAGE_SIZE + 1)
+        )
+        rendering_sheets[sheet_path] = task
+        task.add_done_callback(lambda _: rendering_sheets.pop(sheet_path, None))
+    await asyncio.shield(task)
+    return sheet_path
+
+# Режим обзора: контактный лист с номерами фото
+@router.callback_query(F.data.startswith("overview_"))
+async def show_overview(callback: CallbackQuery):
+    """Показывает страницу портфолио в виде контактного листа"""
+    photographers = registry.current().photographers
+    parts = callback.data.split("_")
+    if len(parts) < 3:
+        await callback.answer("❌ Ошибка навигации", show_alert=True)
+        return
+    
+    photographer_id = parts[1]
+    portfolio = load_portfolio(photographer_id)
+    photos = portfolio.get("photos", []) if portfolio else []
+    if not photos or photographer_id not in photographers:
+        await callback.answer("❌ Портфолио не найдено", show_alert=True)
+        return
+    
+    pages = (len(photos) + SHEET_PAGE_SIZE - 1) // SHEET_PAGE_SIZE
+    page = int(parts[2]) % pages
+    first = page * SHEET_PAGE_SIZE
+    last = min(first + SHEET_PAGE_SIZE, len(photos))
+    
+    # Кнопки с номерами фото, по 3 в ряду
+    keyboard_buttons = []
+    row = []
+    for index in range(first, last):
+        row.append(InlineKeyboardButton(
+            text=str(index + 1),
+            callback_data=f"photo_{photographer_id}_{index}_goto"
+        ))
+        if len(row) == 3:
+            keyboard_buttons.append(row)
+            row = []
+    if row:
+        keyboard_buttons.append(row)
+    if pages > 1:
+        keyboard_buttons.append([
+            InlineKeyboardButton(text="⬅️", callback_data=f"overview_{photographer_id}_{page - 1}"),
+            InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="photo_count"),
+            InlineKeyboardButton(text="➡️", callback_data=f"overview_{photographer_id}_{page + 1}")
+        ])
+    keyboard_buttons.append([
+        InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")
+    ])
+    keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    
+    try:
+        sheet_path = await contact_sheet(photographer_id, photos, page)
+        sent = await callback.message.edit_media(
+            media=InputMediaPhoto(
+                media=sheet_file_ids.get(photographer_id, {}).get(sheet_path) or FSInputFile(sheet_path),
+                caption=(
+                    f"📸 {photographers[photographer_id]['name']}\n\n"
+                    f"🔢 Фото {first + 1}–{last} из {len(photos)}. Нажмите номер, чтобы открыть фото."
+                )
+            ),
+            reply_markup=keyboard
+        )
+        render.forget(callback.message)
+        if isinstance(sent, Message) and sent.photo:
+            # Сбрасывается вместе с листами при изменении портфолио (invalidate_sheets)
+            sheet_file_ids.setdefault(photographer_id, {})[sheet_path] = sent.photo[-1].file_id
+        await callback.answer()
+    except Exception as e:
+        await callback.answer(f"❌ Ошибка: {e}", show_alert=True)
+
+# Фото в одном альбоме (ограничение Telegram для send_media_group)
+ALBUM_PAGE_SIZE = 10
+
+# Страницы альбомов, которые сейчас предзагружаются: (photographer_id, cursor)
+prefetching_pages = set()
+
+# Задачи предзагрузки: ссылка не дает сборщику мусора остановить задачу на середине
+prefetch_tasks = set()
+
+# Предзагрузка следующей страницы альбома
+async def prefetch_album_page(bot, photographer_id: str, photos: list, cursor: int):
+    """Получает file_id для фото следующей страницы, пока пользователь смотрит текущую"""
+    key = (photographer_id, cursor)
+    if key in prefetching_pages:
+        return
+    prefetching_pages.add(key)
+    try:
+        page_photos = photos[cursor:cursor + ALBUM_PAGE_SIZE]
+        await warmup.warm_up_photos(bot, photographer_id, page_photos)
+    except Exception as e:
+        print(f"Ошибка предзагрузки альбома: {e}")
+    finally:
+        prefetching_pages.discard(key)
+
+# Режим альбома: страница портфолио одним send_media_group
+@router.callback_query(F.data.startswith("album_"))
+async def show_album(callback: CallbackQuery):
+    """Отправляет до 10 фото портфолио одним альбомом, начиная с cursor"""
+    photographers = registry.current().photographers
+    parts = callback.data.split("_")
+    if len(parts) < 3:
+        await callback.answer("❌ Ошибка навигации", show_alert=True)
+        return
+    
+    photographer_id = parts[1]
+    portfolio = load_portfolio(photographer_id)
+    photos = portfolio.get("photos", []) if portfolio else []
+    if not photos or photographer_id not in photographers:
+        await callback.answer("❌ Портфолио не найдено", show_alert=True)
+        return
+    
+    cursor = int(parts[2]) % len(photos)
+    page_photos = [
+        photo for photo in photos[cursor:cursor + ALBUM_PAGE_SIZE]
+        if photo.get("file_id") or Path(photo["path"]).exists()
+    ]
+    next_cursor = cursor + ALBUM_PAGE_SIZE
+    photographer_name = photographers[photographer_id]["name"]
+    
+    # Пока пользователь смотрит эту страницу, готовим следующую
+    if next_cursor < len(photos):
+        task = asyncio.create_task(prefetch_album_page(callback.bot, photographer_id, photos, next_cursor))
+        prefetch_tasks.add(task)
+        task.add_done_callback(prefetch_tasks.discard)
+    
+    try:
+        if page_photos:
+            sent = await callback.bot.send_media_group(
+                chat_id=callback.message.chat.id,
+                media=[
+                    InputMediaPhoto(media=photo_media(photo), caption=photo.get("caption") or None)
+                    for photo in page_photos
+                ]
+            )
+            
+            # Запоминаем file_id фото, отправленных из локальных файлов
+            file_ids = {
+                photo["path"]: message.photo[-1].file_id
+                for photo, message in zip(page_photos, sent)
+                if not photo.get("file_id") and message.photo
+            }
+            if file_ids:
+                await set_file_ids(photographer_id, file_ids)
+        
+        # Кнопки листания отправляем новым сообщением под альбомом
+        keyboard_buttons = []
+        if next_cursor < len(photos):
+            keyboard_buttons.append([
+                InlineKeyboardButton(text="Ещё ➡️", callback_data=f"album_{photographer_id}_{next_cursor}")
+            ])
+        keyboard_buttons.append([
+            InlineKeyboardButton(text="🔙 Назад к галерее", callback_data="gallery")
+        ])
+        
+        # Старые кнопки листания больше не нужны
+        if callback.message.text:
+            await callback.message.delete()
+            render.forget(callback.message)
+        
+        last = min(next_cursor, len(photos))
+        await callback.message.answer(
+            f"🗂 {photographer_name}\n\nФото {cursor + 1}–{last} из {len(photos)}",
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+        )
         await callback.answer()
     except Exception as e:
         await callback.answer(f"❌ Ошибка: {e}", show_alert=True)
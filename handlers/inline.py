@@ -0,0 +1,118 @@
+import re
+import time
+from bisect import bisect_left
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultCachedPhoto
+import portfolio
+from portfolio import load_portfolio, portfolio_ids, portfolio_path
+import registry
+
+router = Router()
+
+# Результатов на одной странице ответа
+INLINE_PAGE_SIZE = 50
+
+# Сколько Telegram может кэшировать ответ (секунды)
+INLINE_CACHE_TIME = 300
+
+# Как часто проверять изменения portfolio.json другими процессами (секунды)
+INDEX_CHECK_INTERVAL = 30
+
+WORD_RE = re.compile(r"\w+")
+
+
+class CaptionIndex:
+    """Индекс фото портфолио по словам имени фотографа и подписи"""
+
+    def __init__(self):
+        self.results = []   # InlineQueryResultCachedPhoto в порядке портфолио
+        self.words = []     # Отсортированные уникальные слова
+        self.postings = []  # Для каждого слова - номера результатов
+        self.version = None
+        self.registry_version = None
+        self.signature = None
+        self.checked_at = 0.0
+
+    def build(self):
+        """Перестраивает индекс по всем portfolio.json"""
+        photographers = registry.current().photographers
+        results = []
+        postings = {}
+        for photographer_id in portfolio_ids():
+            data = load_portfolio(photographer_id) or {}
+            name = photographers.get(photographer_id, {}).get("name", data.get("name", photographer_id))
+            for index, photo in enumerate(data.get("photos", [])):
+                # В inline-режиме можно отправить только уже загруженные в Telegram фото
+                if not photo.get("file_id"):
+                    continue
+                caption = photo.get("caption", "")
+                number = len(results)
+                results.append(InlineQueryResultCachedPhoto(
+                    id=f"{photographer_id}:{index}",
+                    photo_file_id=photo["file_id"],
+                    caption=f"📸 {name}\n\n{caption}".strip()
+                ))
+                for word in set(WORD_RE.findall(f"{photographer_id} {name} {caption}".lower())):
+                    postings.setdefault(word, []).append(number)
+
+        self.results = results
+        self.words = sorted(postings)
+        self.postings = [postings[word] for word in self.words]
+
+    def refresh(self):
+        """Перестраивает индекс, если портфолио или справочник изменились"""
+        now = time.monotonic()
+        registry_version = registry.current().version
+        if (self.version == portfolio.portfolio_version and self.registry_version == registry_version
+                and now - self.checked_at < INDEX_CHECK_INTERVAL):
+            return
+        self.checked_at = now
+        signature = tuple(
+            (photographer_id, portfolio_path(photographer_id).stat().st_mtime_ns)
+            for photographer_id in portfolio_ids()
+        )
+        if (self.version != portfolio.portfolio_version or self.registry_version != registry_version
+                or signature != self.signature):
+            self.version = portfolio.portfolio_version
+            self.registry_version = registry_version
+            self.signature = signature
+            self.build()
+
+    def search(self, query: str) -> list:
+        """Номера результатов, где каждое слово запроса - начало какого-то слова"""
+        terms = WORD_RE.findall(query.lower())
+        if not terms:
+            return range(len(self.results))
+
+        matched = None
+        for term in terms:
+            numbers = set()
+            position = bisect_left(self.words, term)
+            while position < len(self.words) and self.words[position].startswith(term):
+                numbers.update(self.postings[position])
+                position += 1
+            matched = numbers if matched is None else matched & numbers
+            if not matched:
+                return []
+        return sorted(matched)
+
+
+caption_index = CaptionIndex()
+
+# Inline-режим: @бот <запрос> - поиск фото по фотографам и подписям
+@router.inline_query()
+async def inline_portfolio(inline_query: InlineQuery):
+    """Поиск фото портфолио для отправки в другие чаты"""
+    caption_index.refresh()
+    matched = caption_index.search(inline_query.query)
+    
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page = matched[offset:offset + INLINE_PAGE_SIZE]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(matched) else ""
+    
+    await inline_query.answer(
+        [caption_index.results[number] for number in page],
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=next_offset
+    )
@@ -1,37 +1,17 @@
 from aiogram import Router, F
+from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
+import render
+import registry
 
 router = Router()
 
-# Прайс-лист услуг
-PRICES = {
-    "family": {
-        "name": "👨‍👩‍👧 Семейная фотосессия",
-        "price": 5000,
-        "duration": "1-2 часа",
-        "description": "Семейная фотосессия на природе или в студии. 30+ обработанных фото"
-    },
-    "portrait": {
-        "name": "📷 Портретная фотосессия",
-        "price": 3000,
-        "duration": "1 час",
-        "description": "Индивидуальные портреты в студии или на локации. 20+ обработанных фото"
-    },
-    "wedding": {
-        "name": "💒 Свадебная фотосессия",
-        "price": 15000,
-        "duration": "Весь день",
-        "description": "Полное сопровождение свадьбы. 200+ обработанных фото, фотоальбом"
-    }
-}
-
-# Обработчик кнопки "ℹ️ Прайс" или "💵 Услуги и цены"
-@router.callback_query(F.data == "price")
-async def show_price(callback: CallbackQuery):
-    """Отображение прайс-листа"""
+# Текст и клавиатура прайса (строятся один раз на версию справочника)
+def price_view(snapshot: registry.Registry):
+    """Формирует текст прайс-листа и кнопки услуг"""
     price_text = "💵 Прайс-лист услуг\n\n"
     
-    for service_key, service_data in PRICES.items():
+    for service_key, service_data in snapshot.prices.items():
         price_text += (
             f"{service_data['name']}\n"
             f"💰 {service_data['price']}₽\n"
@@ -41,17 +21,32 @@ async def show_price(callback: CallbackQuery):
     
     price_text += "Выберите услугу для записи:"
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="👨‍👩‍👧 Семейная (5000₽)", callback_data="book_service_family"),
-            InlineKeyboardButton(text="📷 Портрет (3000₽)", callback_data="book_service_portrait")
-        ],
-        [InlineKeyboardButton(text="💒 Свадьба (15000₽)", callback_data="book_service_wedding")],
-        [InlineKeyboardButton(text="📅 Записаться", callback_data="booking")],
-        [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
-    ])
+    # Кнопки услуг по 2 в ряду
+    keyboard_buttons = []
+    row = []
+    for service_key, service_data in snapshot.prices.items():
+        row.append(InlineKeyboardButton(
+            text=f"{service_data.get('short_name', service_data['name'])} ({service_data['price']}₽)",
+            callback_data=f"book_service_{service_key}"
+        ))
+        if len(row) == 2:
+            keyboard_buttons.append(row)
+            row = []
+    if row:
+        keyboard_buttons.append(row)
+    keyboard_buttons.append([InlineKeyboardButton(text="📅 Записаться", callback_data="booking")])
+    keyboard_buttons.append([InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")])
+    
+    return price_text, InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+# Обработчик кнопки "ℹ️ Прайс" или "💵 Услуги и цены"
+@router.callback_query(F.data == "price")
+async def show_price(callback: CallbackQuery):
+    """Отображение прайс-листа"""
+    price_text, keyboard = registry.current().view("price", price_view)
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         price_text,
         reply_markup=keyboard
     )
@@ -59,13 +54,17 @@ async def show_price(callback: CallbackQuery):
 
 # Обработчик выбора услуги из прайса
 @router.callback_query(F.data.startswith("book_service_"))
-async def book_from_price(callback: CallbackQuery):
+async def book_from_price(callback: CallbackQuery, state: FSMContext):
     """Переход к записи после выбора услуги из прайса"""
     service_key = callback.data.replace("book_service_", "")
+    prices = registry.current().prices
     
-    if service_key in PRICES:
-        service = PRICES[service_key]
-        await callback.message.edit_text(
+    if service_key in prices:
+        service = prices[service_key]
+        # Запоминаем услугу, чтобы не спрашивать ее повторно при записи
+        await state.update_data(service=service_key, preselected_service=True)
+        await render.edit_text(
+            callback.message,
             f"✅ Выбрана услуга: {service['name']}\n"
             f"💰 Цена: {service['price']}₽\n\n"
             "Нажмите кнопку ниже для начала записи:",
@@ -1,4 +1,3 @@
-import json
 from pathlib import Path
 from datetime import datetime
 from aiogram import Router, F
@@ -6,7 +5,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Message
 from aiogram.filters import Command
-from config import ADMINS, PHOTOGRAPHERS
+from config import ADMINS
+import events
+import render
+import registry
+import serialization
+from idempotency import actions
+from analytics import ReviewAggregates
+from models import Review
 
 router = Router()
 
@@ -19,36 +25,37 @@ class ReviewStates(StatesGroup):
 # Файл для хранения отзывов
 REVIEWS_FILE = Path("data/reviews.json")
 
+# Средние оценки для /stats (обновляются при добавлении отзыва)
+review_stats = ReviewAggregates(REVIEWS_FILE)
+
 # Загрузка отзывов из файла
 def load_reviews():
-    """Загружает отзывы из JSON файла"""
-    if REVIEWS_FILE.exists():
-        with open(REVIEWS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    """Загружает отзывы (отзывы, не прошедшие проверку, пропускаются)"""
+    return serialization.records(serialization.read(REVIEWS_FILE, []), Review)
 
 # Сохранение отзывов в файл
 def save_reviews(reviews):
-    """Сохраняет отзывы в JSON файл"""
-    REVIEWS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(REVIEWS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(reviews, f, ensure_ascii=False, indent=2)
+    """Сохраняет отзывы в файл"""
+    serialization.write(REVIEWS_FILE, reviews)
 
 # Добавление отзыва
 def add_review(user_id: int, user_name: str, photographer_id: str, rating: int, text: str):
-    """Добавляет новый отзыв"""
+    """Добавляет новый отзыв (ValueError, если оценка или текст не проходят проверку)"""
+    review_stats.refresh()
     reviews = load_reviews()
-    review = {
-        "id": len(reviews) + 1,
+    review = Review.from_dict({
+        "id": max((r.get("id", 0) for r in reviews), default=0) + 1,
         "user_id": user_id,
         "user_name": user_name,
         "photographer_id": photographer_id,
         "rating": rating,
         "text": text,
         "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    }, strict=True)
     reviews.append(review)
     save_reviews(reviews)
+    review_stats.add(review)
+    events.publish("review", "add", review.to_dict())
     return review
 
 # Получение рейтинга фотографа
@@ -74,6 +81,7 @@ def get_latest_reviews(limit=5):
 @router.callback_query(F.data == "reviews")
 async def show_reviews(callback: CallbackQuery):
     """Отображение отзывов"""
+    photographers = registry.current().photographers
     reviews = get_latest_reviews(5)
     
     if not reviews:
@@ -81,7 +89,8 @@ async def show_reviews(callback: CallbackQuery):
             [InlineKeyboardButton(text="⭐ Оставить отзыв", callback_data="add_review")],
             [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
         ])
-        await callback.message.edit_text(
+        await render.edit_text(
+            callback.message,
             "⭐ Отзывы\n\n"
             "Пока нет отзывов. Будьте первым!",
             reply_markup=keyboard
@@ -97,7 +106,7 @@ async def show_reviews(callback: CallbackQuery):
     reviews_text = f"⭐ Отзывы\n\n★ {overall_rating:.1f} ({len(reviews)} отзывов)\n\n"
     
     for review in reviews:
-        photographer_name = PHOTOGRAPHERS.get(
+        photographer_name = photographers.get(
             review.get("photographer_id", ""), 
             {}
         ).get("name", "Неизвестный фотограф")
@@ -118,7 +127,8 @@ async def show_reviews(callback: CallbackQuery):
         [InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]
     ])
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         reviews_text,
         reply_markup=keyboard
     )
@@ -128,11 +138,12 @@ async def show_reviews(callback: CallbackQuery):
 @router.callback_query(F.data == "add_review")
 async def start_add_review(callback: CallbackQuery, state: FSMContext):
     """Начало процесса добавления отзыва"""
+    photographers = registry.current().photographers
     await state.set_state(ReviewStates.waiting_photographer)
     
     # Кнопки выбора фотографа
     keyboard_buttons = []
-    for photographer_id, photographer_data in PHOTOGRAPHERS.items():
+    for photographer_id, photographer_data in photographers.items():
         rating, count = get_photographer_rating(photographer_id)
         rating_text = f" ★{rating}" if rating > 0 else ""
         keyboard_buttons.append([
@@ -147,7 +158,8 @@ async def start_add_review(callback: CallbackQuery, state: FSMContext):
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "⭐ Оставить отзыв\n\n"
         "Выберите фотографа:",
         reply_markup=keyboard
@@ -158,9 +170,10 @@ async def start_add_review(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(ReviewStates.waiting_photographer, F.data.startswith("review_photographer_"))
 async def select_review_photographer(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора фотографа"""
+    photographers = registry.current().photographers
     photographer_id = callback.data.replace("review_photographer_", "")
     
-    if photographer_id not in PHOTOGRAPHERS:
+    if photographer_id not in photographers:
         await callback.answer("❌ Фотограф не найден!", show_alert=True)
         return
     
@@ -181,9 +194,10 @@ async def select_review_photographer(callback: CallbackQuery, state: FSMContext)
         [InlineKeyboardButton(text="🔙 Назад", callback_data="add_review")]
     ])
     
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
+    photographer_name = photographers[photographer_id]["name"]
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         f"⭐ Оцените фотографа\n\n"
         f"📸 {photographer_name}\n\n"
         f"Выберите оценку (1-5 звезд):",
@@ -197,10 +211,11 @@ async def select_rating(callback: CallbackQuery, state: FSMContext):
     """Обработка выбора рейтинга"""
     rating = int(callback.data.replace("rating_", ""))
     
-    await state.update_data(rating=rating)
+    await state.update_data(rating=rating, prompt_message_id=callback.message.message_id)
     await state.set_state(ReviewStates.waiting_text)
     
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         f"⭐ Напишите отзыв\n\n"
         f"Вы выбрали: {'⭐' * rating}\n\n"
         f"Оставьте ваш отзыв (текстом):"
@@ -211,6 +226,7 @@ async def select_rating(callback: CallbackQuery, state: FSMContext):
 @router.message(ReviewStates.waiting_text)
 async def get_review_text(message: Message, state: FSMContext):
     """Обработка текста отзыва"""
+    photographers = registry.current().photographers
     text = message.text.strip()
     
     if len(text) < 3:
@@ -228,10 +244,18 @@ async def get_review_text(message: Message, state: FSMContext):
     user_id = message.from_user.id
     user_name = message.from_user.full_name or message.from_user.username or "Пользователь"
     
-    # Сохраняем отзыв
-    review = add_review(user_id, user_name, photographer_id, rating, text)
+    # Сохраняем отзыв (повторная доставка того же текста не создает второй отзыв)
+    async def save():
+        return add_review(user_id, user_name, photographer_id, rating, text)
+    
+    prompt_message_id = data.get("prompt_message_id", message.message_id)
+    review, duplicate = await actions.run(
+        (user_id, prompt_message_id, ("review", photographer_id, rating, text)), save
+    )
+    if duplicate:
+        return
     
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
+    photographer_name = photographers[photographer_id]["name"]
     
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="⭐ Посмотреть все отзывы", callback_data="reviews")],
@@ -253,6 +277,7 @@ async def get_review_text(message: Message, state: FSMContext):
 @router.message(Command("add_review"))
 async def cmd_add_review(message: Message):
     """Команда для админа: /add_review photographer_id "текст отзыва\""""
+    photographers = registry.current().photographers
     if message.from_user.id not in ADMINS:
         await message.answer("❌ У вас нет прав администратора!")
         return
@@ -271,10 +296,10 @@ async def cmd_add_review(message: Message):
     photographer_id = args[1]
     text = args[2].strip('"\'')  # Убираем кавычки
     
-    if photographer_id not in PHOTOGRAPHERS:
+    if photographer_id not in photographers:
         await message.answer(
             f"❌ Фотограф '{photographer_id}' не найден!\n\n"
-            f"Доступные фотографы: {', '.join(PHOTOGRAPHERS.keys())}"
+            f"Доступные фотографы: {', '.join(photographers.keys())}"
         )
         return
     
@@ -294,10 +319,17 @@ async def cmd_add_review(message: Message):
     user_id = message.from_user.id
     user_name = message.from_user.full_name or "Администратор"
     
-    # Сохраняем отзыв
-    review = add_review(user_id, user_name, photographer_id, rating, text)
+    # Сохраняем отзыв (повторная доставка того же текста не создает второй отзыв)
+    async def save():
+        return add_review(user_id, user_name, photographer_id, rating, text)
+    
+    review, duplicate = await actions.run(
+        (user_id, message.message_id, ("review", photographer_id, rating, text)), save
+    )
+    if duplicate:
+        return
     
-    photographer_name = PHOTOGRAPHERS[photographer_id]["name"]
+    photographer_name = photographers[photographer_id]["name"]
     
     await message.answer(
         f"✅ Отзыв добавлен!\n\n"
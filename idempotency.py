@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable, Tuple
+
+# Сколько помнить результат действия (секунды)
+IDEMPOTENCY_TTL = 600
+
+# Максимум запомненных действий
+IDEMPOTENCY_CACHE_SIZE = 5000
+
+
+class IdempotencyCache:
+    """
+    Кэш результатов действий по ключу (user_id, message_id, действие).
+
+    Повторная доставка того же update или двойное нажатие кнопки получают
+    результат первого выполнения и не трогают хранилище второй раз.
+    Пока первое выполнение не закончилось, повтор ждет его результата.
+    """
+
+    def __init__(self, max_size: int = IDEMPOTENCY_CACHE_SIZE, ttl: float = IDEMPOTENCY_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # ключ -> (время создания, future с результатом)
+        self.entries = OrderedDict()
+
+    def evict(self, now: float):
+        """Удаляет устаревшие записи и лишние сверх лимита (самые старые)"""
+        for _ in range(len(self.entries)):
+            key, (created, future) = next(iter(self.entries.items()))
+            if now - created < self.ttl and len(self.entries) <= self.max_size:
+                break
+            if future.done():
+                del self.entries[key]
+            else:
+                # Незавершенные действия не вытесняем - иначе повтор выполнится заново
+                self.entries.move_to_end(key)
+
+    async def run(self, key: Hashable, action: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """
+        Выполняет действие один раз для ключа.
+
+        Args:
+            key: ключ действия
+            action: функция без аргументов, возвращающая корутину
+
+        Returns:
+            (результат, повтор ли это)
+        """
+        now = time.monotonic()
+        self.evict(now)
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            return await asyncio.shield(entry[1]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.entries[key] = (now, future)
+        try:
+            result = await action()
+        except BaseException as e:
+            # Неудачное действие можно повторить
+            self.entries.pop(key, None)
+            future.set_exception(e)
+            # Исключение уже передано вызывающему - ожидающих повторов может не быть
+            future.exception()
+            raise
+        future.set_result(result)
+        return result, False
+
+
+actions = IdempotencyCache()
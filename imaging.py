@@ -0,0 +1,164 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import os
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+# Размеры вариантов (по длинной стороне, пиксели)
+DISPLAY_SIZE = 1280
+THUMB_SIZE = 320
+
+# Качество JPEG
+ORIGINAL_QUALITY = 95
+DISPLAY_QUALITY = 82
+THUMB_QUALITY = 75
+
+# Контактный лист: колонки и размер ячейки (пиксели)
+SHEET_COLUMNS = 3
+SHEET_CELL = 320
+SHEET_QUALITY = 80
+
+# Число процессов для обработки изображений
+IMAGE_WORKERS = 2
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Возвращает общий пул процессов (создается при первом обращении).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown():
+    """
+    Останавливает пул процессов.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _save_variant(image: Image.Image, path: Path, size: int, quality: int):
+    """
+    Сохраняет уменьшенную копию изображения в JPEG без метаданных.
+
+    Файл пишется во временный и переименовывается, поэтому при сбое
+    на месте варианта не остается недописанного файла.
+    """
+    variant = image.copy()
+    if size:
+        variant.thumbnail((size, size), Image.LANCZOS)
+    tmp_path = f"{path}.tmp"
+    # exif/icc_profile не передаются, поэтому метаданные не сохраняются
+    variant.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def process_photo_sync(source_path: str, target_dir: str, stem: str) -> dict:
+    """
+    Обрабатывает загруженное фото (выполняется в отдельном процессе).
+
+    Поворачивает изображение по EXIF-ориентации, удаляет EXIF и сохраняет
+    три варианта: оригинал, вариант для показа и миниатюру.
+
+    Args:
+        source_path: Путь к исходному файлу
+        target_dir: Каталог для вариантов
+        stem: Базовое имя файлов
+
+    Returns:
+        Словарь с путями вариантов и размерами оригинала
+    """
+    target = Path(target_dir)
+    target.mkdir(parents=True, exist_ok=True)
+    variants = {
+        "original": target / f"{stem}.jpg",
+        "display": target / f"{stem}_display.jpg",
+        "thumb": target / f"{stem}_thumb.jpg",
+    }
+
+    with Image.open(source_path) as source:
+        image = ImageOps.exif_transpose(source).convert("RGB")
+
+    # Каждый вариант появляется целиком; photo_store считает содержимое сохраненным, когда есть все три
+    _save_variant(image, variants["original"], 0, ORIGINAL_QUALITY)
+    _save_variant(image, variants["thumb"], THUMB_SIZE, THUMB_QUALITY)
+    _save_variant(image, variants["display"], DISPLAY_SIZE, DISPLAY_QUALITY)
+
+    return {
+        "variants": {name: path.as_posix() for name, path in variants.items()},
+        "width": image.width,
+        "height": image.height,
+    }
+
+
+def read_size(path: str) -> tuple:
+    """
+    Возвращает размеры изображения (читается только заголовок файла).
+    """
+    with Image.open(path) as image:
+        return image.size
+
+
+def render_contact_sheet_sync(photo_paths: list, target_path: str, first_number: int):
+    """
+    Собирает контактный лист из миниатюр (выполняется в отдельном процессе).
+
+    Каждая ячейка подписывается номером фото, начиная с first_number.
+    Отсутствующие файлы заменяются серыми ячейками.
+    """
+    rows = (len(photo_paths) + SHEET_COLUMNS - 1) // SHEET_COLUMNS
+    sheet = Image.new("RGB", (SHEET_COLUMNS * SHEET_CELL, rows * SHEET_CELL), "white")
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default(size=SHEET_CELL // 8)
+    margin = 4
+
+    for position, path in enumerate(photo_paths):
+        left = (position % SHEET_COLUMNS) * SHEET_CELL
+        top = (position // SHEET_COLUMNS) * SHEET_CELL
+        box = SHEET_CELL - 2 * margin
+        try:
+            with Image.open(path) as source:
+                thumb = ImageOps.exif_transpose(source).convert("RGB")
+            thumb.thumbnail((box, box), Image.LANCZOS)
+            sheet.paste(thumb, (left + (SHEET_CELL - thumb.width) // 2, top + (SHEET_CELL - thumb.height) // 2))
+        except OSError:
+            draw.rectangle((left + margin, top + margin, left + SHEET_CELL - margin, top + SHEET_CELL - margin), fill="lightgray")
+
+        label = str(first_number + position)
+        label_box = draw.textbbox((0, 0), label, font=font)
+        draw.rectangle(
+            (left + margin, top + margin, left + margin + label_box[2] + 12, top + margin + label_box[3] + 8),
+            fill="black"
+        )
+        draw.text((left + margin + 6, top + margin + 2), label, fill="white", font=font)
+
+    tmp_path = f"{target_path}.tmp"
+    sheet.save(tmp_path, "JPEG", quality=SHEET_QUALITY, optimize=True)
+    os.replace(tmp_path, target_path)
+
+
+async def render_contact_sheet(photo_paths: list, target_path, first_number: int):
+    """
+    Собирает контактный лист в пуле процессов.
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        get_executor(), render_contact_sheet_sync, [str(p) for p in photo_paths], str(target_path), first_number
+    )
+
+
+async def process_photo(source_path, target_dir, stem: str) -> dict:
+    """
+    Обрабатывает фото в пуле процессов, не блокируя event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), process_photo_sync, str(source_path), str(target_dir), stem
+    )
@@ -0,0 +1,77 @@
+"""
+Пакетный импорт фото из локального каталога в портфолио фотографа.
+
+Использование:
+    python import_photos.py <photographer_id> <каталог> [--caption ПОДПИСЬ] [--concurrency N]
+"""
+import argparse
+import asyncio
+from pathlib import Path
+import imaging
+import photo_store
+from portfolio import update_portfolio, photo_entry
+import registry
+
+# Расширения файлов, которые считаются фотографиями
+PHOTO_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp"}
+
+
+async def import_directory(photographer_id: str, directory: Path, caption: str, concurrency: int):
+    """Импортирует все фото каталога и записывает портфолио один раз"""
+    files = sorted(
+        path for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in PHOTO_EXTENSIONS
+    )
+    if not files:
+        print(f"❌ В каталоге {directory} нет фотографий")
+        return
+    
+    print(f"📥 Найдено фото: {len(files)}, обработка...")
+    results = await photo_store.store_batch(
+        [lambda path=path: photo_store.store_local_photo(path) for path in files],
+        limit=concurrency
+    )
+    
+    entries = []
+    for path, result in zip(files, results):
+        if isinstance(result, BaseException):
+            print(f"❌ {path.name}: {result}")
+        else:
+            entries.append(photo_entry(result, caption or path.stem))
+    
+    portfolio, added = await update_portfolio(photographer_id, entries)
+    
+    print(
+        f"✅ Добавлено: {len(added)} из {len(files)}\n"
+        f"⚠️ Уже были в портфолио: {len(entries) - len(added)}\n"
+        f"📊 Всего фото: {len(portfolio['photos'])}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт фото из каталога в портфолио")
+    parser.add_argument("photographer_id", help="ID фотографа, например anna")
+    parser.add_argument("directory", type=Path, help="Каталог с фотографиями")
+    parser.add_argument("--caption", default="", help="Подпись (по умолчанию - имя файла)")
+    parser.add_argument("--concurrency", type=int, default=photo_store.INGEST_CONCURRENCY,
+                        help="Сколько фото обрабатывать одновременно")
+    args = parser.parse_args()
+    registry.check()
+    photographers = registry.current().photographers
+    
+    if args.photographer_id not in photographers:
+        parser.error(
+            f"фотограф '{args.photographer_id}' не найден, "
+            f"доступные: {', '.join(photographers.keys())}"
+        )
+    if not args.directory.is_dir():
+        parser.error(f"каталог {args.directory} не найден")
+    
+    try:
+        asyncio.run(import_directory(args.photographer_id, args.directory, args.caption, args.concurrency))
+    finally:
+        imaging.shutdown()
+
+
+if __name__ == "__main__":
+    main()
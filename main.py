@@ -4,8 +4,16 @@ from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from config import BOT_TOKEN
-from handlers import gallery, admin, booking, price, reviews
-from config import ADMINS, PHOTOGRAPHERS
+from handlers import gallery, admin, booking, price, reviews, inline
+from session import InstrumentedSession
+from middleware import ChatQueueMiddleware, ThrottlingMiddleware
+import render
+import imaging
+import warmup
+import dashboard
+import appointments
+import registry
+from waitlist import waitlist
 
 # Проверка токена
 if not BOT_TOKEN:
@@ -22,7 +30,8 @@ if "xxxxx" in BOT_TOKEN or len(BOT_TOKEN) < 40:
 
 # Инициализация бота и диспетчера
 try:
-    bot = Bot(token=BOT_TOKEN)
+    # Пул соединений, таймауты, повторы и счетчики запросов к Bot API
+    bot = Bot(token=BOT_TOKEN, session=InstrumentedSession())
     dp = Dispatcher(storage=MemoryStorage())
 except Exception as e:
     print(f"❌ Ошибка инициализации бота: {e}")
@@ -56,23 +65,57 @@ async def back_to_main(callback):
         [InlineKeyboardButton(text="📋 Мои записи", callback_data="my_bookings")],
         [InlineKeyboardButton(text="📸 Галерея", callback_data="gallery")]
     ])
-    await callback.message.edit_text(
+    await render.edit_text(
+        callback.message,
         "🎉 Photo Booking Bot готов!\n📸 Фотограф Тверь",
         reply_markup=keyboard
     )
     await callback.answer()
 
+# События одного чата - по очереди, разные чаты - параллельно (с общим лимитом)
+dp.update.outer_middleware(ChatQueueMiddleware())
+
+# Защита от флуда
+throttling = ThrottlingMiddleware()
+dp.message.outer_middleware(throttling)
+dp.callback_query.outer_middleware(throttling)
+
 # Регистрация роутеров
 dp.include_router(booking.router)
 dp.include_router(gallery.router)
 dp.include_router(admin.router)
 dp.include_router(price.router)
 dp.include_router(reviews.router)
+dp.include_router(inline.router)
+
+# Предзагрузка фото портфолио при старте
+@dp.startup()
+async def on_startup(bot: Bot):
+    # Справочник фотографов и услуг: загрузка и слежение за изменениями
+    registry.start_watching()
+    warmup.schedule(bot)
+    # Время, освободившееся пока бот был выключен, - листу ожидания
+    await waitlist.resume(bot)
+    # Прошедшие месяцы - в архив
+    appointments.start_archiver()
+    # Веб-панель записей (DASHBOARD_PORT)
+    await dashboard.start()
+
+@dp.shutdown()
+async def on_shutdown():
+    await dashboard.stop()
 
 # Запуск бота
 async def main():
+    # Записи меняет только один процесс: второй бот или migrate.py затрут изменения
+    if not appointments.store.lock():
+        print("❌ ОШИБКА: хранилище записей занято другим процессом (бот уже запущен или идет migrate.py)")
+        return
     print("✅ Бот запущен!")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        imaging.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
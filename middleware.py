@@ -1,6 +1,10 @@
-from typing import Callable, Dict, Any, Awaitable
+import asyncio
+import heapq
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable, Tuple
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.types import TelegramObject, CallbackQuery, Update
 from database import Database
 
 
@@ -37,3 +41,377 @@ class DatabaseMiddleware(BaseMiddleware):
         """
         data["db"] = self.db
         return await handler(event, data)
+
+
+class TokenBucket:
+    """
+    Корзина токенов: пополняется с постоянной скоростью до ёмкости.
+    """
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, capacity: float, rate: float, now: float) -> bool:
+        """
+        Пополняет корзину за прошедшее время, ничего не списывая.
+
+        Args:
+            capacity: Максимальное число токенов
+            rate: Скорость пополнения (токенов в секунду)
+            now: Текущее время (time.monotonic())
+
+        Returns:
+            True, если есть хотя бы один токен
+        """
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        return self.tokens >= 1
+
+    def consume(self, capacity: float, rate: float, now: float) -> bool:
+        """
+        Списывает один токен, если он есть (аргументы как у refill).
+
+        Returns:
+            True, если токен списан, иначе False
+        """
+        if self.refill(capacity, rate, now):
+            self.tokens -= 1
+            return True
+        return False
+
+
+# Лимиты по классам событий: (ёмкость, пополнение в секунду)
+THROTTLE_RATES = {
+    "user": (20, 4.0),      # Общий лимит на пользователя
+    "photo": (6, 2.0),      # Листание галереи
+    "reviews": (3, 0.5),    # Просмотр отзывов
+    "message": (5, 1.0),    # Текстовые сообщения
+    "callback": (10, 3.0),  # Остальные кнопки
+}
+
+# Префиксы callback_data -> класс лимита
+CALLBACK_CLASSES = (
+    ("photo_", "photo"),
+    ("reviews", "reviews"),
+)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Middleware для защиты от флуда: токен-корзины на пользователя
+    и на класс callback-запросов.
+    """
+
+    def __init__(self, rates: Dict[str, Tuple[float, float]] = None, idle_ttl: float = 60.0):
+        """
+        Инициализация middleware.
+
+        Args:
+            rates: Лимиты по классам событий (по умолчанию THROTTLE_RATES)
+            idle_ttl: Через сколько секунд бездействия корзина удаляется
+        """
+        self.rates = rates or THROTTLE_RATES
+        self.idle_ttl = idle_ttl
+        # (user_id, класс) -> TokenBucket, в порядке последнего обращения
+        self.buckets: "OrderedDict[Tuple[int, str], TokenBucket]" = OrderedDict()
+
+    @staticmethod
+    def get_event_class(event: TelegramObject) -> str:
+        """
+        Определяет класс лимита для события.
+        """
+        if isinstance(event, CallbackQuery):
+            data = event.data or ""
+            for prefix, event_class in CALLBACK_CLASSES:
+                if data.startswith(prefix):
+                    return event_class
+            return "callback"
+        return "message"
+
+    def evict_idle(self, now: float):
+        """
+        Удаляет корзины, к которым давно не обращались (они уже полные).
+        """
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now - bucket.updated < self.idle_ttl:
+                break
+            del self.buckets[key]
+
+    def allow(self, user_id: int, event_class: str, now: float) -> bool:
+        """
+        Проверяет общий лимит пользователя и лимит класса события.
+
+        Токены списываются, только если пропускают оба лимита: отброшенное
+        событие не расходует ни одну из корзин.
+        """
+        buckets = []
+        for key_class in ("user", event_class):
+            capacity, rate = self.rates[key_class]
+            key = (user_id, key_class)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(capacity, now)
+            else:
+                self.buckets.move_to_end(key)
+            if not bucket.refill(capacity, rate, now):
+                return False
+            buckets.append(bucket)
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return True
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Пропускает событие к обработчику или отбрасывает его при превышении лимита.
+
+        Args:
+            handler: Обработчик события
+            event: Событие Telegram
+            data: Словарь с данными для обработчика
+
+        Returns:
+            Результат выполнения обработчика или None, если событие отброшено
+        """
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        self.evict_idle(now)
+
+        if self.allow(user.id, self.get_event_class(event), now):
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Не так быстро!")
+        return None
+
+
+# Сколько обновлений (из разных чатов) обрабатывается одновременно
+MAX_CONCURRENT_UPDATES = 32
+
+# Приоритеты обновлений (меньше - важнее)
+PRIORITY_HIGH = 0    # Запись, перенос, отмена
+PRIORITY_NORMAL = 1  # Сообщения и остальные кнопки
+PRIORITY_LOW = 2     # Просмотр галереи, отзывов, прайса
+
+# Префиксы callback_data -> приоритет
+CALLBACK_PRIORITIES = (
+    ("book", PRIORITY_HIGH),
+    ("my_", PRIORITY_HIGH),
+    ("wl_", PRIORITY_HIGH),
+    ("photo_", PRIORITY_LOW),
+    ("gallery", PRIORITY_LOW),
+    ("overview_", PRIORITY_LOW),
+    ("album_", PRIORITY_LOW),
+    ("reviews", PRIORITY_LOW),
+    ("price", PRIORITY_LOW),
+)
+
+# Перегрузка: столько обновлений ждут общего лимита...
+SHED_QUEUE_DEPTH = 64
+# ...или цикл событий опаздывает на столько секунд
+SHED_LOOP_LAG = 0.5
+
+SHED_TEXT = "⏳ Сейчас много запросов, попробуйте позже"
+
+
+class LoopLagMonitor:
+    """
+    Измеряет задержку цикла событий: насколько позже положенного просыпается
+    периодическая задача. Пики затухают постепенно.
+    """
+
+    def __init__(self, interval: float = 0.1, decay: float = 0.8):
+        self.interval = interval
+        self.decay = decay
+        self.lag = 0.0
+        self.task = None
+
+    def start(self):
+        """Запускает измерение (нужен работающий цикл событий)"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            overshoot = loop.time() - started - self.interval
+            self.lag = max(overshoot, self.lag * self.decay)
+
+
+class PriorityLimiter:
+    """
+    Семафор, который при освобождении места пропускает сначала
+    ожидающих с более высоким приоритетом (внутри приоритета - по порядку).
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.seq = 0
+        # Куча (приоритет, порядковый номер, future)
+        self.waiters = []
+
+    async def acquire(self, priority: int):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, self.seq, future))
+        self.seq += 1
+        self.waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Место уже передали, но задачу отменили - отдаем место следующему
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        # Место передается следующему ожидающему, счетчик занятых не меняется
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class ChatQueueMiddleware(BaseMiddleware):
+    """
+    Middleware для упорядоченной обработки обновлений: события одного чата
+    обрабатываются строго по очереди, разные чаты - параллельно,
+    но не больше max_concurrency одновременно.
+
+    При свободных местах первыми проходят записи на фотосессию, а при
+    перегрузке (длинная очередь или задержка цикла событий) просмотр
+    галереи и отзывов отклоняется с просьбой попробовать позже.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_UPDATES,
+                 shed_queue_depth: int = SHED_QUEUE_DEPTH, shed_loop_lag: float = SHED_LOOP_LAG):
+        """
+        Инициализация middleware.
+
+        Args:
+            max_concurrency: Максимум одновременно обрабатываемых обновлений
+            shed_queue_depth: Длина очереди, с которой отклоняются неважные обновления
+            shed_loop_lag: Задержка цикла событий (секунды), с которой они отклоняются
+        """
+        self.max_concurrency = max_concurrency
+        self.shed_queue_depth = shed_queue_depth
+        self.shed_loop_lag = shed_loop_lag
+        self.limiter = PriorityLimiter(max_concurrency)
+        self.lag_monitor = LoopLagMonitor()
+        # chat_id -> [Lock, число событий в очереди]; удаляется, когда очередь пуста
+        self.queues: Dict[int, list] = {}
+        # Счетчик отклоненных обновлений
+        self.shed_count = 0
+
+    @staticmethod
+    def get_queue_key(data: Dict[str, Any]):
+        """
+        Ключ очереди: чат события, а для событий без чата (inline-запросы) - пользователь.
+        """
+        chat = data.get("event_chat")
+        if chat is not None:
+            return chat.id
+        user = data.get("event_from_user")
+        if user is not None:
+            return user.id
+        return None
+
+    @staticmethod
+    def get_priority(event: TelegramObject) -> int:
+        """
+        Определяет приоритет обновления.
+        """
+        if isinstance(event, Update):
+            if event.callback_query is not None:
+                callback_data = event.callback_query.data or ""
+                for prefix, priority in CALLBACK_PRIORITIES:
+                    if callback_data.startswith(prefix):
+                        return priority
+            elif event.inline_query is not None:
+                return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    def overloaded(self) -> bool:
+        """
+        Перегружен ли бот.
+        """
+        return (self.limiter.waiting >= self.shed_queue_depth
+                or self.lag_monitor.lag >= self.shed_loop_lag)
+
+    async def shed(self, event: TelegramObject, data: Dict[str, Any]):
+        """
+        Отклоняет обновление, ответив пользователю, чтобы у него не висели "часики".
+        """
+        self.shed_count += 1
+        if isinstance(event, Update) and event.callback_query is not None:
+            try:
+                await data["bot"].answer_callback_query(event.callback_query.id, text=SHED_TEXT)
+            except Exception as e:
+                print(f"Ошибка ответа при перегрузке: {e}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Ставит событие в очередь его чата и обрабатывает, когда подойдет очередь.
+
+        Args:
+            handler: Обработчик события
+            event: Событие Telegram
+            data: Словарь с данными для обработчика
+
+        Returns:
+            Результат выполнения обработчика или None, если обновление отклонено
+        """
+        self.lag_monitor.start()
+        priority = self.get_priority(event)
+        if priority == PRIORITY_LOW and self.overloaded():
+            return await self.shed(event, data)
+
+        key = self.get_queue_key(data)
+        if key is None:
+            return await self.run(handler, event, data, priority)
+
+        entry = self.queues.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            # Сначала очередь чата, потом общий лимит: ожидающие в очереди не занимают мест
+            async with entry[0]:
+                return await self.run(handler, event, data, priority)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.queues[key]
+
+    async def run(self, handler, event: TelegramObject, data: Dict[str, Any], priority: int) -> Any:
+        """
+        Выполняет обработчик, заняв место в общем лимите.
+        """
+        await self.limiter.acquire(priority)
+        try:
+            return await handler(event, data)
+        finally:
+            self.limiter.release()
@@ -0,0 +1,158 @@
+"""
+Перенос бронирований старого бота в хранилище записей, с которым работает бот.
+
+Использование:
+    python migrate.py --photographer ID [--db ПУТЬ] [--batch N]
+        бронирования из таблицы bookings (старый бот: handlers.py, database.py)
+        -> data/appointments.json; в старом боте не было выбора фотографа,
+        поэтому все бронирования относятся к фотографу ID
+
+Бот должен быть остановлен: перенос переписывает файл записей целиком и занимает
+хранилище (AppointmentStore.lock), пока бот запущен - перенос не начнется.
+
+Бронирования переносятся пакетами, по одной записи файла на пакет. Перенесенные
+отмечены полем legacy_booking_id, поэтому прерванный перенос продолжается с
+первого еще не перенесенного бронирования. После переноса сверяются число
+бронирований и контрольная сумма.
+
+Отзывы и портфолио старый бот не хранил - они уже в data/ и не переносятся.
+"""
+import argparse
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+import aiosqlite
+import registry
+import serialization
+from appointments import store
+from models import Appointment
+
+# Файл базы старого бота (см. bot.py)
+DEFAULT_DB = "bookings.db"
+
+# Сколько бронирований записывать одной записью файла
+BATCH_SIZE = 1000
+
+# Услуги старого бота -> ключи прайса
+LEGACY_SERVICES = {"семейная": "family", "портрет": "portrait", "свадьба": "wedding"}
+
+
+def booking_row(booking_id, user_id, user_name, service, date, time_slot, status) -> list:
+    """Бронирование в том виде, в каком оно попадает в запись"""
+    return [booking_id, user_id, user_name, LEGACY_SERVICES.get(service, service),
+            date, time_slot, status or "new"]
+
+
+def appointment_row(appointment: Appointment) -> list:
+    """То же для перенесенной записи"""
+    return [appointment["legacy_booking_id"], appointment.user_id, appointment.user_name,
+            appointment.service, appointment.date, appointment.time_slot, appointment.status]
+
+
+def checksum(rows) -> str:
+    """Контрольная сумма строк (порядок важен)"""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(serialization.dumps(row))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+async def read_bookings(db_path: Path):
+    """Бронирования старого бота по порядку id; None, если базы или таблицы нет"""
+    if not db_path.exists():
+        print(f"❌ База {db_path} не найдена")
+        return None
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bookings'"
+        ) as cursor:
+            if await cursor.fetchone() is None:
+                print(f"❌ В базе {db_path} нет таблицы bookings")
+                return None
+        async with db.execute(
+            "SELECT id, user_id, user_name, service, date, time_slot, status FROM bookings ORDER BY id"
+        ) as cursor:
+            return [booking_row(*row) for row in await cursor.fetchall()]
+
+
+async def migrate(db_path: Path, photographer_id: str, batch_size: int) -> bool:
+    """Переносит бронирования старого бота в хранилище записей; False, если проверка не прошла"""
+    bookings = await read_bookings(db_path)
+    if bookings is None:
+        return False
+
+    # Уже перенесенные бронирования отмечены полем legacy_booking_id - повторный запуск их пропускает
+    migrated = {a.get("legacy_booking_id") for a in store.history()} - {None}
+    next_id = store.next_id()
+    photographer_name = registry.current().photographers[photographer_id]["name"]
+    written = 0
+    batch = []
+    for booking_id, user_id, user_name, service, date, time_slot, status in bookings:
+        if booking_id in migrated:
+            continue
+        try:
+            batch.append(Appointment.from_dict({
+                "id": next_id,
+                "user_id": user_id,
+                "user_name": user_name,
+                "photographer_id": photographer_id,
+                "photographer_name": photographer_name,
+                "service": service,
+                "date": date,
+                "time_slot": time_slot,
+                "status": status,
+                "legacy_booking_id": booking_id,
+            }))
+        except ValueError as e:
+            print(f"⚠️ Пропущено бронирование {booking_id}: {e}")
+            continue
+        next_id += 1
+        if len(batch) >= batch_size:
+            store.import_records(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        store.import_records(batch)
+        written += len(batch)
+
+    stored = sorted(
+        (appointment_row(a) for a in store.history() if "legacy_booking_id" in a),
+        key=lambda row: row[0]
+    )
+    if len(stored) != len(bookings):
+        print(f"❌ bookings: перенесено {len(stored)} из {len(bookings)}")
+        return False
+    if checksum(stored) != checksum(bookings):
+        print("❌ bookings: контрольная сумма не совпадает (бронирования менялись после прошлого запуска?)")
+        return False
+    print(f"✅ bookings: {len(bookings)} бронирований (перенесено сейчас: {written})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Перенос бронирований старого бота (таблица bookings) в data/appointments.json",
+        epilog="Бот должен быть остановлен: пока он запущен, хранилище записей занято и перенос не начнется."
+    )
+    parser.add_argument("--photographer",
+                        help="ID фотографа, к которому относятся бронирования старого бота")
+    parser.add_argument("--db", type=Path, default=Path(DEFAULT_DB), help="Файл базы старого бота")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Бронирований в одной записи файла")
+    args = parser.parse_args()
+    if args.batch < 1:
+        parser.error("--batch должен быть больше 0")
+    registry.check()
+    photographers = registry.current().photographers
+    if args.photographer not in photographers:
+        parser.error(f"нужен --photographer, доступные: {', '.join(photographers.keys())}")
+    if not store.lock():
+        parser.exit(1, "❌ Хранилище записей занято: остановите бота и запустите перенос снова\n")
+
+    ok = asyncio.run(migrate(args.db, args.photographer, args.batch))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
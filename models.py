@@ -0,0 +1,219 @@
+import sys
+from datetime import date as Date
+from scheduling import DEFAULT_DURATION, to_minutes
+
+
+def intern(value):
+    """Одна копия повторяющейся строки на весь процесс"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    """
+    Компактная запись: поля хранятся в __slots__, повторяющиеся строки интернированы.
+
+    Поддерживает чтение как словарь (record["date"], record.get("date")),
+    поэтому код, написанный для словарей из JSON, работает без изменений.
+    Неизвестные поля сохраняются в extra и не теряются при записи в файл.
+    """
+    __slots__ = ("extra",)
+
+    # Поля файла по порядку
+    FIELDS = ()
+    # Поля с часто повторяющимися значениями
+    INTERNED = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: dict, strict: bool = False):
+        """
+        Создает запись из словаря JSON.
+
+        Args:
+            data: словарь из файла или новая запись
+            strict: для новых записей - ошибка, если поля не разбираются
+
+        Raises:
+            ValueError: запись не проходит проверку
+        """
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            value = data.get(field)
+            setattr(record, field, intern(value) if field in cls.INTERNED else value)
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        record.extra = extra or None
+        record.validate(strict)
+        return record
+
+    @classmethod
+    def row_reader(cls, fields: list):
+        """
+        Функция, создающая записи из строк таблицы (компактный формат файлов,
+        см. serialization.py) без промежуточного словаря. Схема таблицы
+        сопоставляется с полями модели один раз, а не для каждой строки.
+
+        Функция выбрасывает ValueError, если запись не проходит проверку.
+        """
+        fields = tuple(fields)
+        width = len(cls.FIELDS)
+        if fields[:width] == cls.FIELDS:
+            # Обычный случай: таблица записана этой же моделью
+            columns = cls.FIELDS
+            extra_fields = fields[width:]
+        else:
+            columns = ()
+            extra_fields = fields
+            width = 0
+        interned = [field in cls.INTERNED for field in columns]
+        remapped = [(field, field in cls.FIELDS, field in cls.INTERNED) for field in extra_fields]
+
+        def read(row: list):
+            record = cls.__new__(cls)
+            values = row[:width]
+            if len(values) < width:
+                values = values + [None] * (width - len(values))
+            for field, intern_value, value in zip(columns, interned, values):
+                setattr(record, field, intern(value) if intern_value else value)
+            if not width:
+                for field in cls.FIELDS:
+                    setattr(record, field, None)
+            record.extra = None
+            for (field, known, intern_value), value in zip(remapped, row[width:]):
+                if value is None:
+                    continue
+                if known:
+                    setattr(record, field, intern(value) if intern_value else value)
+                else:
+                    if record.extra is None:
+                        record.extra = {}
+                    record.extra[field] = value
+            record.validate(False)
+            return record
+        return read
+
+    def validate(self, strict: bool):
+        """Проверка полей и разбор производных значений"""
+
+    def to_dict(self) -> dict:
+        """Словарь для записи в JSON (пустые поля не пишутся)"""
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def update(self, fields: dict, strict: bool = False):
+        """Изменяет поля и заново проверяет запись"""
+        for key, value in fields.items():
+            if key in self.FIELDS:
+                setattr(self, key, intern(value) if key in self.INTERNED else value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+        self.validate(strict)
+
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        self.update({key: value})
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Appointment(Record):
+    """
+    Запись на фотосессию. Дата и время разбираются один раз при загрузке:
+    day - порядковый номер дня (date.toordinal()), start - минуты от начала суток.
+    """
+    FIELDS = (
+        "id", "user_id", "user_name", "photographer_id", "photographer_name", "date",
+        "time_slot", "service", "duration", "status", "created_at", "rescheduled_at"
+    )
+    INTERNED = frozenset({
+        "user_name", "photographer_id", "photographer_name", "date", "time_slot", "service", "status"
+    })
+    __slots__ = FIELDS + ("day", "start")
+
+    def validate(self, strict: bool):
+        if not isinstance(self.id, int):
+            raise ValueError(f"неверный id записи: {self.id!r}")
+        if self.status is None:
+            self.status = "new"
+        try:
+            self.day = Date.fromisoformat(self.date).toordinal()
+        except (TypeError, ValueError):
+            if strict:
+                raise ValueError(f"неверная дата записи: {self.date!r}")
+            self.day = None
+        try:
+            self.start = to_minutes(self.time_slot)
+        except (AttributeError, TypeError, ValueError):
+            if strict:
+                raise ValueError(f"неверное время записи: {self.time_slot!r}")
+            self.start = None
+        if self.duration is not None and (not isinstance(self.duration, int) or self.duration <= 0):
+            raise ValueError(f"неверная длительность записи: {self.duration!r}")
+
+    @property
+    def interval(self) -> tuple:
+        """(начало, конец) в минутах; ValueError, если время не разобрано"""
+        if self.start is None:
+            raise ValueError(f"неверное время записи: {self.time_slot!r}")
+        return self.start, self.start + (self.duration or DEFAULT_DURATION)
+
+    @property
+    def weekday(self):
+        """День недели (0 - понедельник) или None"""
+        return Date.fromordinal(self.day).weekday() if self.day is not None else None
+
+    @property
+    def date_display(self) -> str:
+        """Дата для отображения: 'ДД.ММ.ГГГГ'"""
+        return Date.fromordinal(self.day).strftime("%d.%m.%Y") if self.day is not None else (self.date or "")
+
+
+class Review(Record):
+    """Отзыв о фотографе"""
+    FIELDS = ("id", "user_id", "user_name", "photographer_id", "rating", "text", "date")
+    INTERNED = frozenset({"user_name", "photographer_id"})
+    __slots__ = FIELDS
+
+    def validate(self, strict: bool):
+        if not isinstance(self.rating, int) or not 1 <= self.rating <= 5:
+            raise ValueError(f"неверная оценка: {self.rating!r}")
+        if strict and not (self.photographer_id and self.text):
+            raise ValueError("в отзыве нет фотографа или текста")
+
+
+class PortfolioPhoto(Record):
+    """Фото в portfolio.json"""
+    FIELDS = ("path", "caption", "added_at", "hash", "variants", "width", "height", "file_id")
+    __slots__ = FIELDS
+
+    def validate(self, strict: bool):
+        if not isinstance(self.path, str) or not self.path:
+            raise ValueError(f"нет пути к фото: {self.path!r}")
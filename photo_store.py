@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import uuid
+from pathlib import Path
+from aiogram import Bot
+import imaging
+
+# Общее хранилище фото всех фотографов: data/media/<ab>/<hash>*.jpg
+MEDIA_DIR = Path("data/media")
+TMP_DIR = MEDIA_DIR / "tmp"
+
+# Сколько фото обрабатывать одновременно при пакетной загрузке
+INGEST_CONCURRENCY = 4
+
+# Размер блока при копировании локальных файлов
+CHUNK_SIZE = 65536
+
+# Блокировки на время обработки одного и того же содержимого: хеш -> [Lock, число ожидающих]
+_hash_locks = {}
+
+
+class HashingWriter:
+    """
+    Файл для записи, который одновременно считает SHA-256 содержимого.
+    """
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.digest = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> int:
+        self.digest.update(chunk)
+        return self.file.write(chunk)
+
+    def close(self):
+        self.file.close()
+
+
+def content_dir(content_hash: str) -> Path:
+    """
+    Каталог хранения для хеша содержимого.
+    """
+    return MEDIA_DIR / content_hash[:2]
+
+
+def stored_variants(content_hash: str) -> dict:
+    """
+    Пути вариантов фото с указанным хешем.
+    """
+    directory = content_dir(content_hash)
+    return {
+        "original": (directory / f"{content_hash}.jpg").as_posix(),
+        "display": (directory / f"{content_hash}_display.jpg").as_posix(),
+        "thumb": (directory / f"{content_hash}_thumb.jpg").as_posix(),
+    }
+
+
+async def download_photo(bot: Bot, file_path: str) -> tuple:
+    """
+    Скачивает файл Telegram во временный файл, вычисляя хеш по ходу загрузки.
+
+    Returns:
+        (хеш содержимого, путь к временному файлу)
+    """
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = TMP_DIR / f"{uuid.uuid4().hex}.part"
+    writer = HashingWriter(tmp_path)
+    try:
+        await bot.download_file(file_path, writer, seek=False)
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    writer.close()
+    return writer.digest.hexdigest(), tmp_path
+
+
+async def store_file(source_path: Path, content_hash: str) -> dict:
+    """
+    Помещает файл в хранилище под его хешем и готовит варианты.
+
+    Исходный файл удаляется. Если такое содержимое уже хранится,
+    повторная обработка не выполняется.
+
+    Returns:
+        Словарь с полями hash, variants, width, height, duplicate
+    """
+    entry = _hash_locks.setdefault(content_hash, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            variants = stored_variants(content_hash)
+            # Содержимое уже хранится, только если готовы все варианты
+            # (после сбоя во время обработки части файлов может не быть)
+            duplicate = all(Path(path).exists() for path in variants.values())
+            if duplicate:
+                width, height = await asyncio.to_thread(imaging.read_size, variants["original"])
+            else:
+                processed = await imaging.process_photo(source_path, content_dir(content_hash), content_hash)
+                width, height = processed["width"], processed["height"]
+    finally:
+        Path(source_path).unlink(missing_ok=True)
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _hash_locks[content_hash]
+
+    return {
+        "hash": content_hash,
+        "variants": variants,
+        "width": width,
+        "height": height,
+        "duplicate": duplicate,
+    }
+
+
+async def store_photo(bot: Bot, file_path: str) -> dict:
+    """
+    Скачивает фото из Telegram в хранилище по хешу содержимого.
+    """
+    content_hash, tmp_path = await download_photo(bot, file_path)
+    return await store_file(tmp_path, content_hash)
+
+
+def copy_local_file(path: Path) -> tuple:
+    """
+    Копирует локальный файл во временный, вычисляя хеш по ходу копирования.
+
+    Returns:
+        (хеш содержимого, путь к временному файлу)
+    """
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = TMP_DIR / f"{uuid.uuid4().hex}.part"
+    writer = HashingWriter(tmp_path)
+    try:
+        with open(path, "rb") as source:
+            while chunk := source.read(CHUNK_SIZE):
+                writer.write(chunk)
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    writer.close()
+    return writer.digest.hexdigest(), tmp_path
+
+
+async def store_local_photo(path: Path) -> dict:
+    """
+    Помещает локальный файл в хранилище (исходный файл не изменяется).
+    """
+    content_hash, tmp_path = await asyncio.to_thread(copy_local_file, path)
+    return await store_file(tmp_path, content_hash)
+
+
+async def store_batch(jobs: list, limit: int = INGEST_CONCURRENCY) -> list:
+    """
+    Выполняет задачи загрузки с ограничением числа одновременных.
+
+    Args:
+        jobs: Функции без аргументов, возвращающие корутину (например, store_photo)
+        limit: Максимум одновременно выполняемых задач
+
+    Returns:
+        Результаты в порядке jobs; для неудачных задач - исключение
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(job):
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
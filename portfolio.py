@@ -0,0 +1,143 @@
+import asyncio
+import shutil
+from datetime import datetime
+from pathlib import Path
+import events
+import registry
+import serialization
+from models import PortfolioPhoto
+
+# Номер изменения портфолио в этом процессе (для сброса производных кэшей)
+portfolio_version = 0
+
+# Блокировки портфолио на время чтения-изменения-записи: photographer_id -> Lock
+_locks = {}
+
+# Разобранные portfolio.json: photographer_id -> (подпись файла, portfolio)
+_cache = {}
+
+# file_id отправленных контактных листов: photographer_id -> {путь: file_id}
+sheet_file_ids = {}
+
+
+def portfolio_path(photographer_id: str) -> Path:
+    """Путь к portfolio.json фотографа"""
+    return Path(f"data/{photographer_id}/portfolio.json")
+
+
+def load_portfolio(photographer_id: str):
+    """
+    Загружает portfolio.json фотографа (None, если файла нет).
+
+    Файл разбирается заново, только если изменился; фото без пути пропускаются.
+    """
+    path = portfolio_path(photographer_id)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        _cache.pop(photographer_id, None)
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(photographer_id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    portfolio = serialization.read(path)
+    portfolio["photos"] = serialization.records(portfolio.get("photos", []), PortfolioPhoto)
+    _cache[photographer_id] = (signature, portfolio)
+    return portfolio
+
+
+def save_portfolio(photographer_id: str, portfolio: dict):
+    """Атомарно сохраняет portfolio.json (через временный файл)"""
+    global portfolio_version
+    serialization.write(portfolio_path(photographer_id), portfolio)
+    _cache.pop(photographer_id, None)
+    portfolio_version += 1
+
+
+def sheets_dir(photographer_id: str) -> Path:
+    """Каталог кэша контактных листов фотографа"""
+    return Path(f"data/{photographer_id}/sheets")
+
+
+def invalidate_sheets(photographer_id: str):
+    """Удаляет кэш контактных листов после изменения портфолио"""
+    shutil.rmtree(sheets_dir(photographer_id), ignore_errors=True)
+    sheet_file_ids.pop(photographer_id, None)
+
+
+def portfolio_lock(photographer_id: str) -> asyncio.Lock:
+    """Блокировка портфолио фотографа"""
+    lock = _locks.get(photographer_id)
+    if lock is None:
+        lock = _locks[photographer_id] = asyncio.Lock()
+    return lock
+
+
+def photo_entry(stored: dict, caption: str) -> PortfolioPhoto:
+    """Запись portfolio.json для фото из хранилища (см. photo_store.store_file)"""
+    return PortfolioPhoto.from_dict({
+        "path": stored["variants"]["display"],
+        "caption": caption,
+        "added_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "hash": stored["hash"],
+        "variants": stored["variants"],
+        "width": stored["width"],
+        "height": stored["height"]
+    }, strict=True)
+
+
+async def update_portfolio(photographer_id: str, entries: list):
+    """
+    Добавляет фото в portfolio.json одной записью файла.
+
+    Фото, хеш которых уже есть в портфолио, пропускаются.
+
+    Returns:
+        (обновленный portfolio, список добавленных записей)
+    """
+    photographers = registry.current().photographers
+    async with portfolio_lock(photographer_id):
+        portfolio = load_portfolio(photographer_id) or {
+            "photographer_id": photographer_id,
+            "name": photographers.get(photographer_id, {}).get("name", "Unknown"),
+            "photos": []
+        }
+        
+        known_hashes = {p["hash"] for p in portfolio["photos"] if p.get("hash")}
+        added = []
+        for entry in entries:
+            content_hash = entry.get("hash")
+            if content_hash and content_hash in known_hashes:
+                continue
+            known_hashes.add(content_hash)
+            added.append(entry)
+        
+        if added:
+            portfolio["photos"].extend(added)
+            save_portfolio(photographer_id, portfolio)
+            invalidate_sheets(photographer_id)
+            events.publish("portfolio", "add", {"photographer_id": photographer_id, "photos": len(added)})
+    
+    return portfolio, added
+
+
+def portfolio_ids() -> list:
+    """ID фотографов, у которых есть portfolio.json"""
+    return sorted(path.parent.name for path in Path("data").glob("*/portfolio.json"))
+
+
+async def set_file_ids(photographer_id: str, file_ids: dict):
+    """Сохраняет file_id Telegram для фото портфолио (file_ids: путь -> file_id)"""
+    async with portfolio_lock(photographer_id):
+        portfolio = load_portfolio(photographer_id)
+        if portfolio is None:
+            return
+        changed = False
+        for photo in portfolio["photos"]:
+            file_id = file_ids.get(photo["path"])
+            if file_id and photo.get("file_id") != file_id:
+                photo["file_id"] = file_id
+                changed = True
+        if changed:
+            save_portfolio(photographer_id, portfolio)
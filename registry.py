@@ -0,0 +1,164 @@
+import asyncio
+import json
+from pathlib import Path
+from types import MappingProxyType
+from config import PHOTOGRAPHERS, PRICES
+
+# Файл справочника фотографов и услуг
+REGISTRY_FILE = Path("data/registry.json")
+
+# Как часто проверять изменение файла (секунды)
+POLL_INTERVAL = 5.0
+
+
+def freeze(value):
+    """
+    Рекурсивно превращает dict/list в неизменяемые MappingProxyType/tuple.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Registry:
+    """
+    Неизменяемый снимок справочника: фотографы и прайс.
+
+    Обработчик берет снимок один раз (registry.current()) и работает с ним,
+    поэтому никогда не видит частично обновленные данные.
+    """
+    __slots__ = ("photographers", "prices", "version", "_views")
+
+    def __init__(self, photographers: dict, prices: dict, version: int):
+        self.photographers = freeze(photographers)
+        self.prices = freeze(prices)
+        self.version = version
+        self._views = {}
+
+    def view(self, name: str, build):
+        """
+        Производное значение снимка (клавиатура, текст прайса).
+
+        Вычисляется один раз на снимок: build(registry) вызывается при первом обращении.
+        """
+        try:
+            return self._views[name]
+        except KeyError:
+            value = self._views[name] = build(self)
+            return value
+
+
+def valid_hours(hours) -> bool:
+    """working_hours: два времени 'HH:MM', начало раньше конца"""
+    if not isinstance(hours, list) or len(hours) != 2:
+        return False
+    minutes = []
+    for value in hours:
+        if not isinstance(value, str) or len(value) != 5 or value[2] != ":":
+            return False
+        hh, mm = value[:2], value[3:]
+        if not (hh.isdigit() and mm.isdigit()) or int(hh) > 24 or int(mm) > 59:
+            return False
+        minutes.append(int(hh) * 60 + int(mm))
+    return minutes[0] < minutes[1] <= 24 * 60
+
+
+def validate(data: dict):
+    """
+    Проверяет структуру справочника, при ошибке бросает ValueError.
+    """
+    photographers = data.get("photographers")
+    prices = data.get("prices")
+    if not isinstance(photographers, dict) or not isinstance(prices, dict):
+        raise ValueError("нужны разделы photographers и prices")
+    for photographer_id, photographer in photographers.items():
+        if "_" in photographer_id or not photographer.get("name"):
+            raise ValueError(f"фотограф {photographer_id}: нужен name, в ID нельзя '_'")
+        if "working_hours" in photographer and not valid_hours(photographer["working_hours"]):
+            raise ValueError(
+                f"фотограф {photographer_id}: working_hours - два времени [\"HH:MM\", \"HH:MM\"], начало раньше конца"
+            )
+    for service_key, service in prices.items():
+        if "_" in service_key or not service.get("name") or not isinstance(service.get("price"), int):
+            raise ValueError(f"услуга {service_key}: нужны name и целая price, в ключе нельзя '_'")
+        # Прайс и выбор услуги при записи показывают эти поля без проверки
+        for field in ("duration", "description"):
+            if not isinstance(service.get(field), str) or not service[field]:
+                raise ValueError(f"услуга {service_key}: нужно текстовое поле {field}")
+        duration = service.get("duration_minutes")
+        if "duration_minutes" in service and (
+                not isinstance(duration, int) or isinstance(duration, bool) or duration <= 0):
+            raise ValueError(f"услуга {service_key}: duration_minutes - целое число минут больше 0")
+
+
+_current = Registry(PHOTOGRAPHERS, PRICES, 0)
+_signature = None
+
+
+def current() -> Registry:
+    """
+    Текущий снимок справочника.
+    """
+    return _current
+
+
+def reload() -> bool:
+    """
+    Перечитывает файл справочника, если он изменился.
+
+    Returns:
+        True, если загружен новый снимок
+    """
+    global _current, _signature
+    try:
+        stat = REGISTRY_FILE.stat()
+    except FileNotFoundError:
+        return False
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if signature == _signature:
+        return False
+    _signature = signature
+
+    with open(REGISTRY_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    validate(data)
+
+    # Одно присваивание - атомарная замена снимка
+    _current = Registry(data["photographers"], data["prices"], _current.version + 1)
+    return True
+
+
+def check():
+    """
+    Перечитывает справочник, если файл изменился; ошибки только выводятся.
+    """
+    try:
+        if reload():
+            print(f"🔄 Справочник обновлен (версия {_current.version})")
+    except Exception as e:
+        print(f"❌ Ошибка загрузки {REGISTRY_FILE}, оставлена прежняя версия: {e}")
+
+
+async def watch(interval: float = POLL_INTERVAL):
+    """
+    Фоновая проверка изменений файла справочника по mtime.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        check()
+
+
+_watcher = None
+
+
+def start_watching():
+    """
+    Загружает справочник и запускает фоновое слежение за файлом.
+    """
+    global _watcher
+    check()
+    if _watcher is None:
+        _watcher = asyncio.create_task(watch())
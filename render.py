@@ -0,0 +1,75 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InlineKeyboardMarkup
+
+# Сколько сообщений помнить
+RENDER_CACHE_SIZE = 10000
+
+# Последнее отображение сообщений: (chat_id, message_id) -> отпечаток текста и клавиатуры
+rendered_views: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+
+def fingerprint(text: str, reply_markup: Optional[InlineKeyboardMarkup] = None, **kwargs) -> bytes:
+    """
+    Вычисляет отпечаток текста, клавиатуры и остальных параметров
+    отображения сообщения (parse_mode, предпросмотр ссылок).
+    """
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16)
+    if reply_markup is not None:
+        digest.update(reply_markup.model_dump_json(exclude_none=True).encode("utf-8"))
+    for name in sorted(kwargs):
+        value = kwargs[name]
+        if hasattr(value, "model_dump"):
+            # В параметрах aiogram бывают значения Default, JSON их не сериализует
+            value = value.model_dump(exclude_none=True)
+        digest.update(f"\0{name}={value!r}".encode("utf-8"))
+    return digest.digest()
+
+
+def remember(message: Message, view: bytes):
+    """
+    Запоминает отпечаток отображения сообщения.
+    """
+    key = (message.chat.id, message.message_id)
+    rendered_views[key] = view
+    rendered_views.move_to_end(key)
+    if len(rendered_views) > RENDER_CACHE_SIZE:
+        rendered_views.popitem(last=False)
+
+
+def forget(message: Message):
+    """
+    Сбрасывает отпечаток сообщения, измененного в обход edit_text
+    (edit_media, edit_caption, удаление).
+    """
+    rendered_views.pop((message.chat.id, message.message_id), None)
+
+
+async def edit_text(message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None, **kwargs) -> bool:
+    """
+    Редактирует текст сообщения, если он или клавиатура изменились.
+
+    Args:
+        message: Редактируемое сообщение
+        text: Новый текст
+        reply_markup: Новая клавиатура
+        **kwargs: Остальные параметры Message.edit_text
+
+    Returns:
+        True, если запрос к Telegram был отправлен, False если отображение не изменилось
+    """
+    view = fingerprint(text, reply_markup, **kwargs)
+    key = (message.chat.id, message.message_id)
+    if rendered_views.get(key) == view:
+        rendered_views.move_to_end(key)
+        return False
+
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    remember(message, view)
+    return True
@@ -0,0 +1,177 @@
+from bisect import bisect_left, bisect_right, insort
+
+# Рабочее время по умолчанию, если у фотографа не указано working_hours
+DEFAULT_WORKING_HOURS = ("10:00", "20:00")
+
+# Длительность записей без поля duration (раньше все слоты были по 2 часа), минуты
+DEFAULT_DURATION = 120
+
+# Шаг времени начала сессии, минуты
+SLOT_STEP = 60
+
+
+class SlotUnavailable(Exception):
+    """Запрошенное время пересекается с другой записью или вне рабочего времени"""
+
+
+def to_minutes(time_str: str) -> int:
+    """'HH:MM' -> минуты от начала суток"""
+    hours, minutes = time_str.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes: int) -> str:
+    """Минуты от начала суток -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_slot(start: int, duration: int) -> str:
+    """Интервал для отображения: '10:00-12:00'"""
+    return f"{format_minutes(start)}-{format_minutes(start + duration)}"
+
+
+def working_hours(snapshot, photographer_id: str) -> tuple:
+    """Рабочее время фотографа в минутах: (начало, конец)"""
+    hours = snapshot.photographers.get(photographer_id, {}).get("working_hours") or DEFAULT_WORKING_HOURS
+    return to_minutes(hours[0]), to_minutes(hours[1])
+
+
+def service_duration(snapshot, service_key: str, photographer_id: str) -> int:
+    """Длительность услуги в минутах ('Весь день' - весь рабочий день фотографа)"""
+    service = snapshot.prices.get(service_key, {})
+    if service.get("full_day"):
+        day_start, day_end = working_hours(snapshot, photographer_id)
+        return day_end - day_start
+    return service.get("duration_minutes") or DEFAULT_DURATION
+
+
+def appointment_interval(appointment: dict) -> tuple:
+    """Интервал записи в минутах: (начало, конец)"""
+    interval = getattr(appointment, "interval", None)
+    if interval is not None:
+        # Запись из models.Appointment: время уже разобрано
+        return interval
+    start = to_minutes(appointment["time_slot"])
+    return start, start + (appointment.get("duration") or DEFAULT_DURATION)
+
+
+def appointment_slot(appointment: dict) -> str:
+    """Время записи для отображения: '10:00-12:00'"""
+    try:
+        start, end = appointment_interval(appointment)
+    except (KeyError, ValueError):
+        return appointment.get("time_slot", "")
+    return format_slot(start, end - start)
+
+
+class IntervalIndex:
+    """
+    Интервалы занятости одного дня, отсортированные по началу.
+
+    Хранит префиксный максимум концов, поэтому проверка пересечения -
+    один бинарный поиск: O(log n). Вставка и удаление - O(n) для одного дня.
+    """
+    __slots__ = ("starts", "entries", "max_ends")
+
+    def __init__(self):
+        self.starts = []     # Начала интервалов
+        self.entries = []    # (начало, конец, ключ) в том же порядке
+        self.max_ends = []   # max(конец) по entries[:i + 1]
+
+    def _rebuild_max_ends(self, position: int):
+        max_end = self.max_ends[position - 1] if position else -1
+        del self.max_ends[position:]
+        for _, end, _ in self.entries[position:]:
+            max_end = max(max_end, end)
+            self.max_ends.append(max_end)
+
+    def add(self, start: int, end: int, key):
+        """Добавляет интервал [start, end)"""
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.entries.insert(position, (start, end, key))
+        self._rebuild_max_ends(position)
+
+    def remove(self, key) -> bool:
+        """Удаляет интервал по ключу"""
+        for position, entry in enumerate(self.entries):
+            if entry[2] == key:
+                del self.starts[position]
+                del self.entries[position]
+                self._rebuild_max_ends(position)
+                return True
+        return False
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Есть ли интервал, пересекающийся с [start, end)"""
+        # Все интервалы, начинающиеся раньше end, лежат левее position
+        position = bisect_left(self.starts, end)
+        return position > 0 and self.max_ends[position - 1] > start
+
+    def free_windows(self, day_start: int, day_end: int) -> list:
+        """Свободные промежутки внутри [day_start, day_end)"""
+        windows = []
+        cursor = day_start
+        for start, end, _ in self.entries:
+            if start >= day_end:
+                break
+            if start > cursor:
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < day_end:
+            windows.append((cursor, day_end))
+        return windows
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Schedule:
+    """
+    Занятость всех фотографов: (photographer_id, дата) -> IntervalIndex.
+    """
+
+    def __init__(self):
+        self.days = {}
+
+    def add(self, photographer_id: str, date: str, start: int, end: int, key):
+        """Отмечает интервал занятым"""
+        day = self.days.get((photographer_id, date))
+        if day is None:
+            day = self.days[(photographer_id, date)] = IntervalIndex()
+        day.add(start, end, key)
+
+    def remove(self, photographer_id: str, date: str, key):
+        """Освобождает интервал"""
+        day = self.days.get((photographer_id, date))
+        if day is not None:
+            day.remove(key)
+            if not day:
+                del self.days[(photographer_id, date)]
+
+    def is_free(self, photographer_id: str, date: str, start: int, end: int) -> bool:
+        """Свободен ли интервал [start, end)"""
+        day = self.days.get((photographer_id, date))
+        return day is None or not day.overlaps(start, end)
+
+    def free_windows(self, photographer_id: str, date: str, day_start: int, day_end: int) -> list:
+        """Свободные промежутки рабочего дня"""
+        day = self.days.get((photographer_id, date))
+        if day is None:
+            return [(day_start, day_end)] if day_start < day_end else []
+        return day.free_windows(day_start, day_end)
+
+    def available_starts(self, photographer_id: str, date: str, duration: int,
+                         day_start: int, day_end: int, step: int = SLOT_STEP,
+                         not_before: int = 0) -> list:
+        """Времена начала (кратные step от начала дня), с которых помещается сессия длительностью duration"""
+        starts = []
+        for window_start, window_end in self.free_windows(photographer_id, date, day_start, day_end):
+            window_start = max(window_start, not_before)
+            # Выравниваем по сетке от начала рабочего дня
+            offset = (window_start - day_start) % step
+            start = window_start + (step - offset if offset else 0)
+            while start + duration <= window_end:
+                starts.append(start)
+                start += step
+        return starts
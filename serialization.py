@@ -0,0 +1,116 @@
+import json
+import os
+from pathlib import Path
+from config import DATA_FORMAT
+
+try:
+    import orjson
+except ImportError:
+    # Без orjson файлы те же, только кодирование медленнее
+    orjson = None
+
+# Список записей в компактном формате: {"$fields": [имена полей], "rows": [[значения], ...]}
+TABLE_KEY = "$fields"
+
+
+def dumps(value, pretty: bool = False) -> bytes:
+    """JSON в UTF-8: в одну строку или с отступами (для отладки)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(value, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Разбирает JSON (ValueError, если строка повреждена или недописана)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def table(records: list) -> dict:
+    """
+    Таблица из списка записей models.Record: имена полей пишутся один раз,
+    пустые значения в конце строки не пишутся.
+    """
+    model = type(records[0])
+    extras = []
+    for record in records:
+        if record.extra:
+            extras.extend(key for key in record.extra if key not in extras)
+    rows = []
+    for record in records:
+        row = [getattr(record, field) for field in model.FIELDS]
+        if extras:
+            extra = record.extra or {}
+            row.extend(extra.get(key) for key in extras)
+        while row and row[-1] is None:
+            row.pop()
+        rows.append(row)
+    return {TABLE_KEY: list(model.FIELDS) + extras, "rows": rows}
+
+
+def prepare(value, pretty: bool):
+    """Заменяет списки записей models.Record на таблицы или словари (в том числе внутри словаря)"""
+    if isinstance(value, dict):
+        return {key: prepare(item, pretty) for key, item in value.items()}
+    if isinstance(value, list) and value and hasattr(value[0], "to_dict"):
+        return [record.to_dict() for record in value] if pretty else table(value)
+    return value
+
+
+def records(value, model=None) -> list:
+    """
+    Список записей из файла любого формата: таблица или список словарей.
+
+    Args:
+        value: значение из read()
+        model: класс из models.py (без него - словари)
+    """
+    if isinstance(value, dict) and TABLE_KEY in value:
+        fields = value[TABLE_KEY]
+        if model is None:
+            return [
+                {field: item for field, item in zip(fields, row) if item is not None}
+                for row in value["rows"]
+            ]
+        items = value["rows"]
+        make = model.row_reader(fields)
+    else:
+        if model is None:
+            return value
+        items = value
+        make = model.from_dict
+    result = []
+    for item in items:
+        try:
+            result.append(make(item))
+        except ValueError as e:
+            print(f"Пропущена запись {model.__name__}: {e}")
+    return result
+
+
+def read(path: Path, default=None):
+    """Читает файл данных (формат определяется по содержимому); default, если файла нет"""
+    try:
+        with open(path, 'rb') as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return default
+
+
+def write(path: Path, value, pretty: bool = None):
+    """
+    Атомарно записывает файл данных (через временный файл).
+
+    Args:
+        pretty: JSON с отступами; по умолчанию - по настройке DATA_FORMAT
+    """
+    if pretty is None:
+        pretty = DATA_FORMAT == "pretty"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(prepare(value, pretty), pretty))
+    os.replace(tmp_path, path)
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+
+# Соединений с Bot API одновременно
+CONNECTION_LIMIT = 50
+
+# Сколько держать простаивающее соединение открытым (секунды)
+KEEPALIVE_TIMEOUT = 60
+
+# Таймауты по методам (секунды); остальные - DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = 15
+METHOD_TIMEOUTS = {
+    "answerCallbackQuery": 5,
+    "answerInlineQuery": 10,
+    "editMessageText": 10,
+    "editMessageMedia": 60,
+    "sendPhoto": 60,
+    "sendMediaGroup": 120,
+}
+
+# Повторы при перегрузке и временных сбоях
+MAX_RETRIES = 3
+# Ожидание перед повтором: случайное от 0 до BACKOFF_BASE * 2^попытка, но не больше BACKOFF_MAX
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+# Если Telegram просит подождать дольше, ошибка передается обработчику
+MAX_RETRY_AFTER = 30
+
+
+class MethodStats:
+    """Счетчики вызовов одного метода Bot API"""
+    __slots__ = ("calls", "errors", "retries", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed: float, failed: bool):
+        self.calls += 1
+        self.errors += failed
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+
+def resend_is_safe(api_method: str) -> bool:
+    """
+    Можно ли повторить запрос после сетевой ошибки.
+
+    Отправка сообщений могла дойти до Telegram до обрыва соединения,
+    повтор создал бы дубликат.
+    """
+    return not api_method.startswith(("send", "forward", "copy"))
+
+
+class InstrumentedSession(AiohttpSession):
+    """
+    Сессия Bot API с пулом соединений, таймаутами по методам,
+    единой обработкой TelegramRetryAfter и временных сбоев и счетчиками задержек.
+    """
+
+    def __init__(self, limit: int = CONNECTION_LIMIT, **kwargs):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init["keepalive_timeout"] = KEEPALIVE_TIMEOUT
+        # Метод Bot API -> MethodStats
+        self.stats = {}
+
+    def backoff(self, attempt: int) -> float:
+        """Случайная пауза перед повтором (full jitter)"""
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int = None):
+        api_method = method.__api_method__
+        if timeout is None:
+            timeout = METHOD_TIMEOUTS.get(api_method, DEFAULT_TIMEOUT)
+        stats = self.stats.get(api_method)
+        if stats is None:
+            stats = self.stats[api_method] = MethodStats()
+
+        # getUpdates повторяет сам диспетчер
+        retries = 0 if api_method == "getUpdates" else MAX_RETRIES
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                result = await super().make_request(bot, method, timeout=timeout)
+            except TelegramRetryAfter as e:
+                stats.record(time.monotonic() - started, True)
+                if attempt >= retries or e.retry_after > MAX_RETRY_AFTER:
+                    raise
+                delay = e.retry_after + random.uniform(0, 1)
+            except (TelegramServerError, TelegramNetworkError) as e:
+                stats.record(time.monotonic() - started, True)
+                if attempt >= retries or (isinstance(e, TelegramNetworkError) and not resend_is_safe(api_method)):
+                    raise
+                delay = self.backoff(attempt)
+            except Exception:
+                stats.record(time.monotonic() - started, True)
+                raise
+            else:
+                stats.record(time.monotonic() - started, False)
+                return result
+
+            attempt += 1
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def summary(self) -> list:
+        """
+        Сводка по методам для отображения.
+
+        Returns:
+            Список (метод, вызовы, ошибки, повторы, среднее мс, максимум мс) по убыванию числа вызовов
+        """
+        rows = []
+        for api_method, stats in self.stats.items():
+            average = stats.total_time / stats.calls * 1000 if stats.calls else 0.0
+            rows.append((api_method, stats.calls, stats.errors, stats.retries, average, stats.max_time * 1000))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+from analytics import ReviewAggregates
+from appointments import AppointmentStore
+from handlers import admin
+from models import Appointment
+
+
+class FakeMessage:
+    def __init__(self, text: str):
+        self.text = text
+        self.from_user = SimpleNamespace(id=admin.ADMINS[0])
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+def test_stats_lists_appointments_without_photographer(tmp_path, monkeypatch):
+    store = AppointmentStore(tmp_path / "appointments.json")
+    store.import_records([
+        # Перенесено из старого бота без фотографа
+        Appointment.from_dict({"id": 1, "user_id": 1, "date": "2099-01-05", "time_slot": "10:00",
+                               "service": "portrait"}),
+        # Фотограф удален из справочника
+        Appointment.from_dict({"id": 2, "user_id": 1, "photographer_id": "ghost", "date": "2099-01-05",
+                               "time_slot": "12:00", "service": "portrait"}),
+    ])
+    monkeypatch.setattr(admin, "store", store)
+    monkeypatch.setattr(admin, "review_stats", ReviewAggregates(tmp_path / "reviews.json"))
+
+    message = FakeMessage("/stats")
+    asyncio.run(admin.cmd_stats(message))
+
+    text = message.answers[0]
+    assert "ghost: 1 активных" in text
+    assert "Без фотографа: 1 активных" in text
+    assert text.index("ghost") < text.index("Без фотографа")
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+import pytest
+from appointments import AppointmentStore
+from scheduling import SlotUnavailable
+
+
+def test_unterminated_journal_line_is_not_glued_to_next_operation(tmp_path):
+    path = tmp_path / "appointments.json"
+    store = AppointmentStore(path)
+    first = store.add(1, "Клиент", "anna", "2099-01-05", "10:00", "portrait", 60)
+    # Сбой после записи операции, но до перевода строки: строка разбирается, но недописана
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op":"update","id":%d,"fields":{"time_slot":"12:00"}}' % first.id)
+
+    restored = AppointmentStore(path)
+    second = restored.add(2, "Второй", "anna", "2099-01-05", "14:00", "portrait", 60)
+
+    reloaded = AppointmentStore(path)
+    assert [(a.id, a.time_slot) for a in reloaded.all()] == [(first.id, "10:00"), (second.id, "14:00")]
+
+
+def test_store_is_locked_by_one_process(tmp_path):
+    path = tmp_path / "appointments.json"
+    bot = AppointmentStore(path)
+    assert bot.lock()
+    # Второй процесс (migrate.py при запущенном боте) хранилище не получает
+    assert not AppointmentStore(path).lock()
+
+
+def test_past_dates_are_rejected(tmp_path):
+    store = AppointmentStore(tmp_path / "appointments.json")
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    with pytest.raises(SlotUnavailable):
+        store.add(1, "Клиент", "anna", yesterday, "10:00", "portrait", 60)
+
+    appointment = store.add(1, "Клиент", "anna", "2099-01-05", "10:00", "portrait", 60)
+    # Перенос по кнопке из старого календаря
+    with pytest.raises(SlotUnavailable):
+        store.move(appointment.id, 1, yesterday, "10:00")
+    assert (store.get(appointment.id).date, store.get(appointment.id).time_slot) == ("2099-01-05", "10:00")
+
+
+def test_archived_months_leave_user_appointments(tmp_path):
+    store = AppointmentStore(tmp_path / "appointments.json")
+    old = store.add(1, "Клиент", "anna", "2099-01-05", "10:00", "portrait", 60)
+    new = store.add(1, "Клиент", "anna", "2099-02-05", "10:00", "portrait", 60)
+
+    assert store.archive(before=date(2099, 2, 1)) == 1
+    assert store.archived_months() == ["2099-01"]
+    assert [a.id for a in store.user_appointments(1)] == [new.id]
+    assert [a.id for a in store.history()] == [old.id, new.id]
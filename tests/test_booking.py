@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from appointments import AppointmentStore
+from handlers import booking
+from idempotency import IdempotencyCache
+
+USER_ID = 42
+
+
+class FakeMessage:
+    def __init__(self):
+        self.chat = SimpleNamespace(id=USER_ID)
+        self.message_id = 100
+        self.text = ""
+
+    async def edit_text(self, text, **kwargs):
+        # Запрос к Telegram: пока он идет, успевает прийти повторное нажатие
+        await asyncio.sleep(0)
+        self.text = text
+
+
+class FakeCallback:
+    def __init__(self, message: FakeMessage, data: str = "book_confirm"):
+        self.from_user = SimpleNamespace(id=USER_ID, full_name="Клиент", username=None)
+        self.message = message
+        self.data = data
+        self.bot = None
+        self.answers = []
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+async def book(state: FSMContext, message: FakeMessage, date: str, time_slot: str):
+    """Проходит запись с начала (один и тот же экран, как в боте) и дважды нажимает «Подтвердить»"""
+    await booking.start_booking(FakeCallback(message, "booking"), state)
+    await state.update_data(photographer_id="anna", service="portrait", date=date, time_slot=time_slot)
+    await state.set_state(booking.BookingStates.confirm)
+    first, second = FakeCallback(message), FakeCallback(message)
+    await asyncio.gather(booking.confirm_booking(first, state), booking.confirm_booking(second, state))
+    return first, second
+
+
+def test_rebooking_cancelled_slot_creates_new_appointment(tmp_path, monkeypatch):
+    store = AppointmentStore(tmp_path / "appointments.json")
+    monkeypatch.setattr(booking, "store", store)
+    monkeypatch.setattr(booking, "actions", IdempotencyCache())
+
+    async def scenario():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=USER_ID, user_id=USER_ID))
+        message = FakeMessage()
+
+        first, second = await book(state, message, "2099-01-05", "10:00")
+        assert len(store.all()) == 1
+        # Повторное нажатие получает тот же ответ, а не пустой
+        assert second.answers == first.answers == ["✅ Запись создана!"]
+
+        store.cancel(store.all()[0].id, USER_ID)
+        message.text = ""
+        first, _ = await book(state, message, "2099-01-05", "10:00")
+        assert [a.status for a in store.all()] == ["cancelled", "new"]
+        assert first.answers == ["✅ Запись создана!"]
+        assert message.text.startswith("✅ Запись успешно создана")
+        assert await state.get_state() is None
+
+    asyncio.run(scenario())
+
+
+def test_service_from_price_is_kept_only_for_one_pass():
+    from handlers import price
+
+    async def scenario():
+        state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=USER_ID, user_id=USER_ID))
+        message = FakeMessage()
+
+        await price.book_from_price(FakeCallback(message, "book_service_portrait"), state)
+        await booking.start_booking(FakeCallback(message, "booking"), state)
+        await booking.select_photographer(FakeCallback(message, "book_photographer_anna"), state)
+        # Услуга из прайса: сразу выбор даты
+        assert await state.get_state() == booking.BookingStates.waiting_date.state
+
+        # "🔙 Назад" ведет в начало записи - услугу снова можно выбрать
+        await booking.start_booking(FakeCallback(message, "booking"), state)
+        await booking.select_photographer(FakeCallback(message, "book_photographer_anna"), state)
+        assert await state.get_state() == booking.BookingStates.waiting_service.state
+
+    asyncio.run(scenario())
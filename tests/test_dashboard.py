@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+import dashboard
+from appointments import AppointmentStore
+
+
+class FakeResponse:
+    def __init__(self, headers=None):
+        self.writes = []
+
+    async def prepare(self, request):
+        pass
+
+    async def write(self, data: bytes):
+        self.writes.append(data.decode("utf-8"))
+        if sum("event: snapshot" in w for w in self.writes) == 2 or len(self.writes) > 5:
+            # Панель закрыли
+            raise ConnectionResetError
+
+
+def test_snapshot_is_resent_after_midnight(tmp_path, monkeypatch):
+    clock = [datetime(2099, 1, 5, 23, 59, 59)]
+
+    class FakeDatetime:
+        @staticmethod
+        def now():
+            return clock[0]
+
+    async def ping_then_midnight(get, timeout):
+        get.close()
+        clock[0] = datetime(2099, 1, 6, 0, 0, 1)
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(dashboard, "datetime", FakeDatetime)
+    monkeypatch.setattr(dashboard.asyncio, "wait_for", ping_then_midnight)
+    monkeypatch.setattr(dashboard.web, "StreamResponse", FakeResponse)
+    monkeypatch.setattr(dashboard, "store", AppointmentStore(tmp_path / "appointments.json"))
+
+    response = asyncio.run(dashboard.stream(None))
+    snapshots = [w for w in response.writes if w.startswith("event: snapshot")]
+    assert len(snapshots) == 2
+    assert '"today": "2099-01-05"' in snapshots[0]
+    assert '"today": "2099-01-06"' in snapshots[1]
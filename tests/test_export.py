@@ -0,0 +1,19 @@
+import csv
+import export
+from models import Appointment
+
+
+def test_csv_cells_do_not_become_formulas(tmp_path):
+    path = tmp_path / "export.csv"
+    export.write_csv(path, [Appointment.from_dict({
+        "id": 1, "user_id": 7, "user_name": '=HYPERLINK("http://evil","x")', "photographer_id": "anna",
+        "photographer_name": "@anna", "date": "2099-01-05", "time_slot": "10:00", "service": "-portrait",
+    })])
+
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        row = dict(zip(*csv.reader(f)))
+    assert row["client"] == '\'=HYPERLINK("http://evil","x")'
+    assert row["photographer"] == "'@anna"
+    assert row["service"] == "'-portrait"
+    assert row["start"] == "10:00"
+    assert row["id"] == "1"
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+from aiogram.types import Update
+from middleware import (
+    PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, SHED_TEXT, ChatQueueMiddleware, PriorityLimiter,
+    ThrottlingMiddleware, TokenBucket
+)
+
+RATES = {"user": (3, 1.0), "photo": (2, 1.0), "message": (10, 1.0)}
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(2, now=0.0)
+    assert bucket.consume(2, 1.0, 0.0)
+    assert bucket.consume(2, 1.0, 0.0)
+    assert not bucket.consume(2, 1.0, 0.5)
+    assert bucket.consume(2, 1.0, 1.0)
+    # Долгий простой не дает накопить больше ёмкости
+    bucket.refill(2, 1.0, 100.0)
+    assert bucket.tokens == 2
+
+
+def test_denied_event_does_not_drain_other_bucket():
+    throttling = ThrottlingMiddleware(RATES)
+    assert throttling.allow(1, "photo", 0.0)
+    assert throttling.allow(1, "photo", 0.0)
+    # Лимит листания исчерпан - общий лимит пользователя не тратится
+    for _ in range(5):
+        assert not throttling.allow(1, "photo", 0.0)
+    assert throttling.allow(1, "message", 0.0)
+    assert not throttling.allow(1, "message", 0.0)
+    # Лимиты разных пользователей не связаны
+    assert throttling.allow(2, "photo", 0.0)
+
+
+def test_chat_updates_run_in_order_under_global_limit():
+    middleware = ChatQueueMiddleware(max_concurrency=2)
+    log = []
+    running = [0, 0]  # сейчас, максимум
+
+    def handler_for(name):
+        async def handler(event, data):
+            running[0] += 1
+            running[1] = max(running)
+            log.append(("start", name))
+            await asyncio.sleep(0.01)
+            log.append(("end", name))
+            running[0] -= 1
+        return handler
+
+    async def scenario():
+        updates = [(chat_id, n) for n in range(3) for chat_id in (1, 2, 3)]
+        await asyncio.gather(*(
+            middleware(handler_for((chat_id, n)), object(), {"event_chat": SimpleNamespace(id=chat_id)})
+            for chat_id, n in updates
+        ))
+        middleware.lag_monitor.task.cancel()
+
+    asyncio.run(scenario())
+    # Не больше двух обновлений одновременно
+    assert running[1] == 2
+    # Внутри чата - строго по очереди: следующее начинается после конца предыдущего
+    for chat_id in (1, 2, 3):
+        chat_log = [(kind, n) for kind, (chat, n) in log if chat == chat_id]
+        assert chat_log == [(kind, n) for n in range(3) for kind in ("start", "end")]
+    assert middleware.queues == {}
+
+
+def test_priority_limiter_wakes_bookings_first():
+    limiter = PriorityLimiter(1)
+    order = []
+
+    async def worker(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def scenario():
+        await limiter.acquire(PRIORITY_NORMAL)
+        tasks = [asyncio.create_task(worker(name, priority)) for name, priority in [
+            ("gallery", PRIORITY_LOW), ("message", PRIORITY_NORMAL),
+            ("booking", PRIORITY_HIGH), ("gallery2", PRIORITY_LOW),
+        ]]
+        await asyncio.sleep(0)
+        assert limiter.waiting == 4
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # Внутри приоритета - по порядку прихода
+    assert order == ["booking", "message", "gallery", "gallery2"]
+    assert limiter.active == 0
+
+
+def test_browsing_is_shed_under_overload():
+    middleware = ChatQueueMiddleware(max_concurrency=1, shed_queue_depth=1)
+    answered = []
+    handled = []
+
+    async def answer_callback_query(callback_query_id, text):
+        answered.append((callback_query_id, text))
+
+    def update(callback_data: str) -> Update:
+        return Update.model_validate({"update_id": 1, "callback_query": {
+            "id": callback_data, "chat_instance": "1", "data": callback_data,
+            "from": {"id": 1, "is_bot": False, "first_name": "Клиент"},
+        }})
+
+    async def handler(event, data):
+        handled.append(event.callback_query.data)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        data = {"bot": SimpleNamespace(answer_callback_query=answer_callback_query)}
+        busy = asyncio.create_task(middleware(handler, update("booking"), dict(data)))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(middleware(handler, update("book_confirm"), dict(data)))
+        await asyncio.sleep(0)
+        # Одно обновление ждет места - перегрузка: галерея отклоняется, запись ждет
+        assert middleware.overloaded()
+        await middleware(handler, update("gallery_anna"), dict(data))
+        await asyncio.gather(busy, waiting)
+        middleware.lag_monitor.task.cancel()
+
+    asyncio.run(scenario())
+    assert handled == ["booking", "book_confirm"]
+    assert answered == [("gallery_anna", SHED_TEXT)]
+    assert middleware.shed_count == 1
@@ -0,0 +1,69 @@
+import pytest
+from models import Appointment, PortfolioPhoto, Review
+
+DATA = {
+    "id": 1, "user_id": 7, "user_name": "Клиент", "photographer_id": "anna", "date": "2099-01-05",
+    "time_slot": "10:00", "service": "portrait", "duration": 90, "legacy_booking_id": 3,
+}
+
+
+def test_appointment_parses_date_and_time_once():
+    appointment = Appointment.from_dict(DATA)
+    assert appointment.interval == (600, 690)
+    assert appointment.date_display == "05.01.2099"
+    assert appointment.weekday == 0
+    # Поле по умолчанию и неизвестное поле
+    assert appointment["status"] == "new"
+    assert appointment.extra == {"legacy_booking_id": 3}
+    assert appointment.to_dict() == dict(DATA, status="new")
+
+    appointment.update({"date": "2099-01-06", "time_slot": "12:30"})
+    assert (appointment.weekday, appointment.interval) == (1, (750, 840))
+
+
+def test_dict_access():
+    appointment = Appointment.from_dict(DATA)
+    assert appointment["legacy_booking_id"] == 3
+    assert "photographer_name" not in appointment
+    assert appointment.get("photographer_name", "Unknown") == "Unknown"
+    with pytest.raises(KeyError):
+        appointment["photographer_name"]
+    appointment["note"] = "у окна"
+    assert appointment.extra["note"] == "у окна"
+
+
+def test_validation():
+    # Старые записи с нераспознанным временем читаются, новые - нет
+    loose = Appointment.from_dict(dict(DATA, time_slot="утро"))
+    assert loose.start is None
+    with pytest.raises(ValueError):
+        loose.interval
+    with pytest.raises(ValueError):
+        Appointment.from_dict(dict(DATA, time_slot="утро"), strict=True)
+    with pytest.raises(ValueError):
+        Appointment.from_dict(dict(DATA, date="05.01.2099"), strict=True)
+    for bad in ({"id": "1"}, {"duration": 0}):
+        with pytest.raises(ValueError):
+            Appointment.from_dict(dict(DATA, **bad))
+
+    with pytest.raises(ValueError):
+        Review.from_dict({"id": 1, "photographer_id": "anna", "text": "Спасибо", "rating": 6})
+    with pytest.raises(ValueError):
+        Review.from_dict({"id": 1, "rating": 5}, strict=True)
+    with pytest.raises(ValueError):
+        PortfolioPhoto.from_dict({"caption": "без пути"})
+
+
+def test_row_reader_handles_reordered_and_extra_columns():
+    same = Appointment.row_reader(list(Appointment.FIELDS) + ["legacy_booking_id"])
+    appointment = same([1, 7, None, "anna", None, "2099-01-05", "10:00", None, None, None, None, None, 3])
+    assert appointment.interval == (600, 720)
+    assert appointment.extra == {"legacy_booking_id": 3}
+
+    # Таблица, записанная другой версией модели: столбцы в другом порядке
+    other = Appointment.row_reader(["time_slot", "date", "id", "note"])
+    appointment = other(["11:00", "2099-01-05", 2, "у окна"])
+    assert (appointment.id, appointment.start, appointment.day) == (2, 660, Appointment.from_dict(DATA).day)
+    assert appointment.extra == {"note": "у окна"}
+    with pytest.raises(ValueError):
+        other(["11:00", "2099-01-05", None])
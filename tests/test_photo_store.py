@@ -0,0 +1,27 @@
+import asyncio
+from pathlib import Path
+from PIL import Image
+import imaging
+import photo_store
+
+
+def test_partial_variants_are_processed_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(photo_store, "content_dir", lambda content_hash: tmp_path / content_hash[:2])
+    monkeypatch.setattr(imaging, "process_photo", lambda source, target, stem: asyncio.to_thread(
+        imaging.process_photo_sync, str(source), str(target), stem
+    ))
+    content_hash = "ab" * 16
+    variants = photo_store.stored_variants(content_hash)
+
+    # Сбой после записи оригинала и display, до миниатюры
+    Path(variants["display"]).parent.mkdir(parents=True)
+    Image.new("RGB", (40, 30)).save(variants["original"])
+    Image.new("RGB", (40, 30)).save(variants["display"])
+
+    source = tmp_path / "upload.jpg"
+    Image.new("RGB", (40, 30), "red").save(source)
+    result = asyncio.run(photo_store.store_file(source, content_hash))
+
+    assert not result["duplicate"]
+    assert all(Path(path).exists() for path in variants.values())
+    assert not list(Path(variants["display"]).parent.glob("*.tmp"))
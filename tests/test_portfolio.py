@@ -0,0 +1,16 @@
+import portfolio
+
+
+def test_invalidate_sheets_forgets_sent_sheets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sheet = portfolio.sheets_dir("anna") / "page_0_abc.jpg"
+    sheet.parent.mkdir(parents=True)
+    sheet.write_bytes(b"jpeg")
+    monkeypatch.setitem(portfolio.sheet_file_ids, "anna", {sheet: "file-anna"})
+    monkeypatch.setitem(portfolio.sheet_file_ids, "ivan", {"page_0.jpg": "file-ivan"})
+
+    portfolio.invalidate_sheets("anna")
+
+    assert not sheet.exists()
+    assert "anna" not in portfolio.sheet_file_ids
+    assert portfolio.sheet_file_ids["ivan"] == {"page_0.jpg": "file-ivan"}
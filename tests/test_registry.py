@@ -0,0 +1,34 @@
+import json
+import registry
+
+PORTRAIT = {"name": "Портрет", "price": 3000, "duration": "1 час", "description": "Портреты в студии",
+            "duration_minutes": 60}
+
+
+def test_bad_working_hours_keep_previous_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "registry.json"
+    monkeypatch.setattr(registry, "REGISTRY_FILE", path)
+    monkeypatch.setattr(registry, "_signature", None)
+    monkeypatch.setattr(registry, "_current", registry.current())
+    data = {
+        "photographers": {"anna": {"name": "Анна", "working_hours": ["10:00", "20:00"]}},
+        "prices": {"portrait": PORTRAIT},
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+    registry.check()
+    good = registry.current()
+    assert good.photographers["anna"]["working_hours"] == ("10:00", "20:00")
+
+    for photographer, service in [
+        ({"name": "Анна", "working_hours": ["10:00"]}, PORTRAIT),
+        ({"name": "Анна", "working_hours": ["20:00", "10:00"]}, PORTRAIT),
+        ({"name": "Анна"}, {**PORTRAIT, "duration_minutes": "час"}),
+        # Без этих полей прайс и выбор услуги падают с KeyError
+        ({"name": "Анна"}, {"name": "Портрет", "price": 3000, "description": "Портреты в студии"}),
+        ({"name": "Анна"}, {"name": "Портрет", "price": 3000, "duration": "1 час"}),
+    ]:
+        data = {"photographers": {"anna": photographer}, "prices": {"portrait": service}}
+        path.write_text(json.dumps(data), encoding="utf-8")
+        monkeypatch.setattr(registry, "_signature", None)
+        registry.check()
+        assert registry.current() is good
@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+from aiogram.types import LinkPreviewOptions
+import render
+
+
+class FakeMessage:
+    def __init__(self):
+        self.chat = SimpleNamespace(id=1)
+        self.message_id = 10
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((text, kwargs))
+
+
+def test_edit_is_skipped_only_when_nothing_changed(monkeypatch):
+    monkeypatch.setattr(render, "rendered_views", type(render.rendered_views)())
+    message = FakeMessage()
+
+    async def scenario():
+        assert await render.edit_text(message, "Текст")
+        assert not await render.edit_text(message, "Текст")
+        # Меняются только параметры отображения - сообщение все равно редактируется
+        assert await render.edit_text(message, "Текст", parse_mode="HTML")
+        assert not await render.edit_text(message, "Текст", parse_mode="HTML")
+        no_preview = LinkPreviewOptions(is_disabled=True)
+        assert await render.edit_text(message, "Текст", parse_mode="HTML", link_preview_options=no_preview)
+        assert not await render.edit_text(
+            message, "Текст", link_preview_options=LinkPreviewOptions(is_disabled=True), parse_mode="HTML"
+        )
+
+    asyncio.run(scenario())
+    assert len(message.edits) == 3
@@ -0,0 +1,31 @@
+import asyncio
+from types import SimpleNamespace
+from analytics import ReviewAggregates
+from handlers import reviews
+
+
+class FakeMessage:
+    def __init__(self, text: str, message_id: int = 1):
+        self.text = text
+        self.message_id = message_id
+        self.from_user = SimpleNamespace(id=reviews.ADMINS[0], full_name="Админ")
+        self.answers = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+
+def test_cmd_add_review_saves_review_once(tmp_path, monkeypatch):
+    reviews_file = tmp_path / "reviews.json"
+    monkeypatch.setattr(reviews, "REVIEWS_FILE", reviews_file)
+    monkeypatch.setattr(reviews, "review_stats", ReviewAggregates(reviews_file))
+
+    message = FakeMessage('/add_review anna "Огонь! 5⭐"')
+    asyncio.run(reviews.cmd_add_review(message))
+    # Повторная доставка того же сообщения не создает второй отзыв
+    asyncio.run(reviews.cmd_add_review(message))
+
+    saved = reviews.load_reviews()
+    assert [(r.photographer_id, r.rating, r.text) for r in saved] == [("anna", 5, "Огонь! 5⭐")]
+    assert len(message.answers) == 1
+    assert message.answers[0].startswith("✅ Отзыв добавлен!")
@@ -0,0 +1,51 @@
+import random
+from scheduling import IntervalIndex, Schedule, to_minutes
+
+
+def test_overlaps_matches_brute_force():
+    rng = random.Random(7)
+    index = IntervalIndex()
+    intervals = {}
+    for key in range(60):
+        start = rng.randrange(0, 1400, 15)
+        intervals[key] = (start, start + rng.choice([15, 60, 120, 300]))
+        index.add(*intervals[key], key)
+    for key in rng.sample(sorted(intervals), 20):
+        assert index.remove(key)
+        del intervals[key]
+    assert not index.remove("нет такого")
+
+    for start in range(0, 1440, 5):
+        for length in (1, 30, 90):
+            expected = any(s < start + length and start < e for s, e in intervals.values())
+            assert index.overlaps(start, start + length) == expected
+
+
+def test_touching_intervals_do_not_overlap():
+    index = IntervalIndex()
+    index.add(600, 720, "a")
+    # Длинный интервал, начавшийся раньше, закрывает короткие после него
+    index.add(480, 900, "b")
+    index.add(700, 710, "c")
+    assert not index.overlaps(900, 960)
+    assert not index.overlaps(420, 480)
+    assert index.overlaps(850, 960)
+    index.remove("b")
+    assert not index.overlaps(720, 900)
+    assert index.free_windows(600, 1200) == [(720, 1200)]
+
+
+def test_available_starts_fit_duration_between_bookings():
+    schedule = Schedule()
+    day_start, day_end = to_minutes("10:00"), to_minutes("20:00")
+    schedule.add("anna", "2099-01-05", to_minutes("12:00"), to_minutes("13:30"), 1)
+    schedule.add("anna", "2099-01-05", to_minutes("16:00"), to_minutes("17:00"), 2)
+
+    starts = schedule.available_starts("anna", "2099-01-05", 120, day_start, day_end)
+    assert [f"{s // 60}:{s % 60:02d}" for s in starts] == ["10:00", "14:00", "17:00", "18:00"]
+    assert schedule.available_starts("anna", "2099-01-05", 120, day_start, day_end,
+                                     not_before=to_minutes("17:30")) == [to_minutes("18:00")]
+
+    schedule.remove("anna", "2099-01-05", 1)
+    schedule.remove("anna", "2099-01-05", 2)
+    assert schedule.days == {}
@@ -0,0 +1,56 @@
+import json
+import pytest
+import serialization
+from models import Appointment, PortfolioPhoto, Review
+
+APPOINTMENTS = [
+    {"id": 1, "user_id": 7, "user_name": "Клиент", "photographer_id": "anna", "date": "2099-01-05",
+     "time_slot": "10:00", "status": "new"},
+    {"id": 2, "user_id": 8, "user_name": "Второй", "photographer_id": "anna", "date": "2099-01-05",
+     "time_slot": "12:00", "service": "portrait", "duration": 60, "status": "cancelled",
+     "legacy_booking_id": 5},
+]
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_round_trip(tmp_path, monkeypatch, pretty, use_orjson):
+    if not use_orjson:
+        # Без orjson - стандартный json, файлы те же
+        monkeypatch.setattr(serialization, "orjson", None)
+    path = tmp_path / "appointments.json"
+    records = [Appointment.from_dict(data) for data in APPOINTMENTS]
+    serialization.write(path, records, pretty=pretty)
+
+    value = serialization.read(path)
+    if pretty:
+        assert value == APPOINTMENTS
+    else:
+        assert value[serialization.TABLE_KEY] == list(Appointment.FIELDS) + ["legacy_booking_id"]
+        # Пустые поля в конце строки не пишутся
+        assert len(value["rows"][0]) == Appointment.FIELDS.index("status") + 1
+    assert [a.to_dict() for a in serialization.records(value, Appointment)] == APPOINTMENTS
+    assert serialization.records(value) == APPOINTMENTS
+
+
+def test_nested_records_and_missing_file(tmp_path):
+    path = tmp_path / "portfolio.json"
+    photos = [PortfolioPhoto.from_dict({"path": "a.jpg", "variants": {"thumb": "a_thumb.jpg"}})]
+    serialization.write(path, {"photographer_id": "anna", "photos": photos})
+
+    value = serialization.read(path)
+    assert value["photographer_id"] == "anna"
+    assert [p.to_dict() for p in serialization.records(value["photos"], PortfolioPhoto)] == [
+        {"path": "a.jpg", "variants": {"thumb": "a_thumb.jpg"}}
+    ]
+    assert serialization.read(tmp_path / "нет.json", []) == []
+    assert not path.with_suffix(".json.tmp").exists()
+
+
+def test_invalid_records_are_skipped_and_torn_lines_raise():
+    value = {serialization.TABLE_KEY: ["id", "rating"], "rows": [[1, 5], [2, 9]]}
+    assert [r.id for r in serialization.records(value, Review)] == [1]
+    line = serialization.dumps({"op": "add", "текст": "ё"})
+    assert json.loads(line) == {"op": "add", "текст": "ё"}
+    with pytest.raises(ValueError):
+        serialization.loads(line[:-3])
@@ -0,0 +1,37 @@
+from waitlist import Waitlist
+
+KEY = ("anna", "2099-01-05", "10:00")
+
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    path = tmp_path / "waitlist.jsonl"
+    waitlist = Waitlist(path)
+    waitlist.join(KEY, 1, "Первый", "portrait", 60)
+    waitlist.join(KEY, 2, "Второй", "portrait", 60)
+    # Сбой во время записи третьей операции
+    with open(path, 'ab') as f:
+        f.write(b'{"op":"join","key":["anna"')
+
+    restored = Waitlist(path)
+    assert restored.join(KEY, 3, "Третий", "portrait", 60) == 3
+
+    # Операции после битой строки тоже восстанавливаются
+    reloaded = Waitlist(path)
+    reloaded.load()
+    assert sorted(user_id for _, user_id in reloaded.members) == [1, 2, 3]
+
+
+def test_unterminated_journal_line_is_not_glued_to_next_operation(tmp_path):
+    path = tmp_path / "waitlist.jsonl"
+    waitlist = Waitlist(path)
+    waitlist.join(KEY, 1, "Первый", "portrait", 60)
+    # Сбой после записи операции, но до перевода строки
+    with open(path, 'ab') as f:
+        f.write(b'{"op":"leave","key":["anna","2099-01-05","10:00"],"user_id":1}')
+
+    restored = Waitlist(path)
+    assert restored.join(KEY, 2, "Второй", "portrait", 60) == 2
+
+    reloaded = Waitlist(path)
+    reloaded.load()
+    assert sorted(user_id for _, user_id in reloaded.members) == [1, 2]
@@ -0,0 +1,293 @@
+import asyncio
+import heapq
+import os
+import time
+from pathlib import Path
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+import serialization
+from appointments import store
+from scheduling import SlotUnavailable, format_slot, to_minutes
+
+# Журнал листа ожидания (одна операция на строку)
+WAITLIST_FILE = Path("data/waitlist.jsonl")
+
+# Сколько держать освободившееся время за клиентом из листа ожидания (минуты)
+HOLD_MINUTES = 30
+
+# Журнал переписывается, когда в нем в 2 раза больше строк, чем живых записей (но не меньше)
+COMPACT_MIN_LINES = 1000
+
+
+class WaitEntry:
+    """Клиент в очереди на время"""
+    __slots__ = ("joined_at", "seq", "user_id", "user_name", "service", "duration", "active")
+
+    def __init__(self, joined_at: float, seq: int, user_id: int, user_name: str, service: str, duration: int):
+        self.joined_at = joined_at
+        self.seq = seq
+        self.user_id = user_id
+        self.user_name = user_name
+        self.service = service
+        self.duration = duration
+        self.active = True
+
+    def __lt__(self, other):
+        return (self.joined_at, self.seq) < (other.joined_at, other.seq)
+
+
+class Hold:
+    """Время, предложенное клиенту из очереди"""
+    __slots__ = ("hold_id", "key", "entry", "task")
+
+    def __init__(self, hold_id: int, key: tuple, entry: WaitEntry):
+        self.hold_id = hold_id
+        self.key = key
+        self.entry = entry
+        self.task = None
+
+
+class Waitlist:
+    """
+    Лист ожидания: очередь с приоритетом (кто раньше встал) на каждое время
+    (photographer_id, дата, время начала).
+
+    Вставка и извлечение - O(log n) через heapq; уход из очереди помечает запись
+    неактивной и она удаляется из кучи при следующем извлечении.
+    Все изменения дописываются в журнал, при старте он проигрывается заново.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.queues = {}     # ключ -> куча WaitEntry
+        self.members = {}    # (ключ, user_id) -> WaitEntry
+        self.sizes = {}      # ключ -> число активных записей
+        self.by_day = {}     # (photographer_id, дата) -> множество времен с очередью
+        self.holds = {}      # hold_id -> Hold
+        self.held_keys = {}  # ключ -> hold_id
+        self.seq = 0
+        self.next_hold_id = 1
+        self.journal_lines = 0
+        self.loaded = False
+
+    def _insert(self, key: tuple, entry: WaitEntry):
+        heapq.heappush(self.queues.setdefault(key, []), entry)
+        self.members[(key, entry.user_id)] = entry
+        self.sizes[key] = self.sizes.get(key, 0) + 1
+        self.by_day.setdefault(key[:2], set()).add(key[2])
+        self.seq = max(self.seq, entry.seq + 1)
+
+    def _remove(self, key: tuple, user_id: int) -> bool:
+        entry = self.members.pop((key, user_id), None)
+        if entry is None:
+            return False
+        entry.active = False
+        self.sizes[key] -= 1
+        if not self.sizes[key]:
+            del self.sizes[key]
+            del self.queues[key]
+            times = self.by_day[key[:2]]
+            times.discard(key[2])
+            if not times:
+                del self.by_day[key[:2]]
+        return True
+
+    def load(self):
+        """Восстанавливает очереди из журнала"""
+        if self.loaded:
+            return
+        records = []
+        if self.path.exists():
+            with open(self.path, 'rb') as f:
+                valid_size = 0
+                for line in f:
+                    # Строка без перевода строки недописана, даже если разбирается:
+                    # следующая операция приклеилась бы к ней
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = serialization.loads(line) if line.strip() else None
+                    except ValueError:
+                        # Недописанная строка (сбой во время записи) - операции не было
+                        break
+                    valid_size += len(line)
+                    if record is not None:
+                        records.append(record)
+            if valid_size < self.path.stat().st_size:
+                # Обрезаем хвост, иначе следующие операции окажутся после битой строки
+                print(f"Журнал листа ожидания обрезан до последней целой строки: {self.path}")
+                os.truncate(self.path, valid_size)
+        for record in records:
+            key = tuple(record["key"])
+            self.journal_lines += 1
+            if record["op"] == "join":
+                self._insert(key, WaitEntry(
+                    record["joined_at"], record["seq"], record["user_id"],
+                    record["user_name"], record["service"], record["duration"]
+                ))
+            else:  # leave
+                self._remove(key, record["user_id"])
+        self.loaded = True
+
+    def _append(self, record: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(serialization.dumps(record) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_lines += 1
+        if self.journal_lines > max(COMPACT_MIN_LINES, 2 * len(self.members)):
+            self._compact()
+
+    def _compact(self):
+        """Переписывает журнал, оставляя только живые записи"""
+        tmp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'wb') as f:
+            for (key, user_id), entry in self.members.items():
+                f.write(serialization.dumps({
+                    "op": "join", "key": list(key), "user_id": user_id, "user_name": entry.user_name,
+                    "service": entry.service, "duration": entry.duration,
+                    "joined_at": entry.joined_at, "seq": entry.seq
+                }) + b"\n")
+        os.replace(tmp_path, self.path)
+        self.journal_lines = len(self.members)
+
+    def join(self, key: tuple, user_id: int, user_name: str, service: str, duration: int):
+        """
+        Ставит клиента в очередь на время.
+
+        Returns:
+            Размер очереди (место клиента) или None, если он уже в очереди
+        """
+        self.load()
+        if (key, user_id) in self.members:
+            return None
+        entry = WaitEntry(time.time(), self.seq, user_id, user_name, service, duration)
+        self._insert(key, entry)
+        self._append({
+            "op": "join", "key": list(key), "user_id": user_id, "user_name": user_name,
+            "service": service, "duration": duration, "joined_at": entry.joined_at, "seq": entry.seq
+        })
+        return self.sizes[key]
+
+    def leave(self, key: tuple, user_id: int) -> bool:
+        """Убирает клиента из очереди"""
+        self.load()
+        if not self._remove(key, user_id):
+            return False
+        self._append({"op": "leave", "key": list(key), "user_id": user_id})
+        return True
+
+    def head(self, key: tuple):
+        """Первый в очереди (None, если очередь пуста)"""
+        queue = self.queues.get(key)
+        while queue and not queue[0].active:
+            heapq.heappop(queue)
+        return queue[0] if queue else None
+
+    async def promote(self, bot: Bot, photographer_id: str, date: str):
+        """Предлагает освободившееся время первым в очередях на этот день"""
+        self.load()
+        for time_slot in sorted(self.by_day.get((photographer_id, date), ())):
+            key = (photographer_id, date, time_slot)
+            while key not in self.held_keys:
+                entry = self.head(key)
+                if entry is None:
+                    break
+                start = to_minutes(time_slot)
+                if not store.is_free(photographer_id, date, start, start + entry.duration):
+                    break
+                if await self.offer(bot, key, entry):
+                    break
+
+    async def offer(self, bot: Bot, key: tuple, entry: WaitEntry) -> bool:
+        """Временно бронирует время за клиентом и присылает ему предложение"""
+        hold = Hold(self.next_hold_id, key, entry)
+        self.next_hold_id += 1
+        start = to_minutes(key[2])
+        try:
+            store.hold(("hold", hold.hold_id), key[0], key[1], start, start + entry.duration)
+        except SlotUnavailable:
+            return False
+        self.holds[hold.hold_id] = hold
+        self.held_keys[key] = hold.hold_id
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [
+                InlineKeyboardButton(text="✅ Записаться", callback_data=f"wl_accept_{hold.hold_id}"),
+                InlineKeyboardButton(text="❌ Отказаться", callback_data=f"wl_decline_{hold.hold_id}")
+            ]
+        ])
+        try:
+            await bot.send_message(
+                chat_id=entry.user_id,
+                text=(
+                    f"🎉 Освободилось время, которого вы ждали!\n\n"
+                    f"📅 Дата: {key[1]}\n"
+                    f"🕐 Время: {format_slot(start, entry.duration)}\n\n"
+                    f"Время закреплено за вами на {HOLD_MINUTES} минут."
+                ),
+                reply_markup=keyboard
+            )
+        except Exception as e:
+            # Клиент недоступен (например, заблокировал бота) - переходим к следующему
+            print(f"Ошибка отправки предложения из листа ожидания: {e}")
+            self.resolve(hold.hold_id)
+            return False
+
+        hold.task = asyncio.create_task(self._expire(bot, hold.hold_id))
+        return True
+
+    async def _expire(self, bot: Bot, hold_id: int):
+        await asyncio.sleep(HOLD_MINUTES * 60)
+        hold = self.resolve(hold_id)
+        if hold is not None:
+            await self.promote(bot, hold.key[0], hold.key[1])
+
+    def resolve(self, hold_id: int):
+        """Снимает бронь и убирает клиента из очереди"""
+        hold = self.holds.pop(hold_id, None)
+        if hold is None:
+            return None
+        self.held_keys.pop(hold.key, None)
+        store.release_hold(("hold", hold_id))
+        self.leave(hold.key, hold.entry.user_id)
+        if hold.task is not None and hold.task is not asyncio.current_task():
+            hold.task.cancel()
+        return hold
+
+    def accept(self, hold_id: int, user_id: int):
+        """
+        Превращает бронь в запись.
+
+        Returns:
+            Созданная запись или None, если бронь истекла или чужая
+        """
+        hold = self.holds.get(hold_id)
+        if hold is None or hold.entry.user_id != user_id:
+            return None
+        # Снятие брони и создание записи без await между ними - время никто не перехватит
+        self.resolve(hold_id)
+        photographer_id, date, time_slot = hold.key
+        return store.add(
+            user_id, hold.entry.user_name, photographer_id, date, time_slot,
+            hold.entry.service, hold.entry.duration
+        )
+
+    async def decline(self, bot: Bot, hold_id: int, user_id: int) -> bool:
+        """Отказ от предложенного времени - оно предлагается следующему"""
+        hold = self.holds.get(hold_id)
+        if hold is None or hold.entry.user_id != user_id:
+            return False
+        self.resolve(hold_id)
+        await self.promote(bot, hold.key[0], hold.key[1])
+        return True
+
+    async def resume(self, bot: Bot):
+        """Проверяет все очереди после запуска бота"""
+        self.load()
+        for photographer_id, date in list(self.by_day):
+            await self.promote(bot, photographer_id, date)
+
+
+waitlist = Waitlist(WAITLIST_FILE)
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from pathlib import Path
+from aiogram import Bot
+from aiogram.types import FSInputFile
+from config import STORAGE_CHAT_ID
+from portfolio import load_portfolio, portfolio_ids, set_file_ids
+
+# Минимальный интервал между загрузками (секунды)
+WARMUP_INTERVAL = 1.0
+
+# Сколько фото загружать одновременно
+WARMUP_CONCURRENCY = 2
+
+_task = None
+_rerun = False
+
+
+class Pacer:
+    """
+    Выдает разрешения на запросы не чаще одного раза в interval секунд.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_slot = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def upload_photo(bot: Bot, path: str) -> str:
+    """
+    Загружает фото в служебный чат и возвращает его file_id.
+    """
+    message = await bot.send_photo(
+        chat_id=STORAGE_CHAT_ID,
+        photo=FSInputFile(path),
+        disable_notification=True
+    )
+    return message.photo[-1].file_id
+
+
+async def upload_missing(bot: Bot, photos: list, known: dict, pacer: Pacer, semaphore: asyncio.Semaphore) -> dict:
+    """
+    Загружает фото без file_id (known - уже известные file_id: путь -> file_id).
+
+    Returns:
+        Новые file_id: путь -> file_id
+    """
+    async def upload(path: str):
+        async with semaphore:
+            await pacer.wait()
+            try:
+                known[path] = await upload_photo(bot, path)
+            except Exception as e:
+                print(f"Ошибка предзагрузки {path}: {e}")
+
+    paths = {
+        photo["path"] for photo in photos
+        if not photo.get("file_id") and photo["path"] not in known and Path(photo["path"]).exists()
+    }
+    await asyncio.gather(*(upload(path) for path in paths))
+    return {photo["path"]: known[photo["path"]] for photo in photos
+            if not photo.get("file_id") and photo["path"] in known}
+
+
+async def warm_up(bot: Bot):
+    """
+    Загружает в служебный чат все фото портфолио, для которых еще нет file_id.
+    """
+    portfolios = {}
+    known = {}
+    for photographer_id in portfolio_ids():
+        portfolio = load_portfolio(photographer_id)
+        if portfolio:
+            portfolios[photographer_id] = portfolio["photos"]
+            # Один и тот же файл может быть в нескольких портфолио
+            for photo in portfolio["photos"]:
+                if photo.get("file_id"):
+                    known[photo["path"]] = photo["file_id"]
+
+    pacer = Pacer(WARMUP_INTERVAL)
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+    for photographer_id, photos in portfolios.items():
+        file_ids = await upload_missing(bot, photos, known, pacer, semaphore)
+        if file_ids:
+            await set_file_ids(photographer_id, file_ids)
+            print(f"🔥 Предзагружено фото {photographer_id}: {len(file_ids)}")
+
+
+async def warm_up_photos(bot: Bot, photographer_id: str, photos: list):
+    """
+    Загружает в служебный чат указанные фото одного портфолио
+    (например, следующую страницу альбома).
+    """
+    if not STORAGE_CHAT_ID:
+        return
+    file_ids = await upload_missing(
+        bot, photos, {}, Pacer(WARMUP_INTERVAL), asyncio.Semaphore(WARMUP_CONCURRENCY)
+    )
+    if file_ids:
+        await set_file_ids(photographer_id, file_ids)
+
+
+async def _run(bot: Bot):
+    global _task, _rerun
+    try:
+        while True:
+            _rerun = False
+            try:
+                await warm_up(bot)
+            except Exception as e:
+                print(f"Ошибка предзагрузки портфолио: {e}")
+            if not _rerun:
+                break
+    finally:
+        _task = None
+
+
+def schedule(bot: Bot):
+    """
+    Запускает предзагрузку в фоне (при старте бота и после загрузки фото).
+
+    Если предзагрузка уже идет, она будет повторена после завершения.
+    """
+    global _task, _rerun
+    if not STORAGE_CHAT_ID:
+        return
+    if _task is not None:
+        _rerun = True
+        return
+    _task = asyncio.create_task(_run(bot))